@@ -1,13 +1,34 @@
 # app.py
+from concurrent.futures import ThreadPoolExecutor
 from flask import Flask, request, jsonify
 from flask_cors import CORS
-from db import query_all, get_connection
+from db import query_all, query_many, get_connection, pool_stats
 from auth import auth_bp 
-from nosql import nosql_bp
+from pymongo.errors import PyMongoError
+from nosql import nosql_bp, review_summary, ensure_indexes as ensure_mongo_indexes
+from export import export_bp
+import http_opt
+import metrics
+from search import title_index
+from pagination import read_page_args, page_response
+from genre_stats import find_genre, get_stats
+from genres import genre_bit, decode_mask
+from cache import cached, cache_stats
+from titles import title_cards, get_title_cards, BATCH_CONFIG
+from catalog import title_catalog
+from filmography import FILMOGRAPHY_SORTS, filmography, collaborators
 app = Flask(__name__)
 CORS(app)  # allow all origins (you can restrict later)
 app.register_blueprint(auth_bp)
 app.register_blueprint(nosql_bp)
+app.register_blueprint(export_bp)
+metrics.init_app(app)   # Server-Timing, /metrics, slow-query log
+http_opt.init_app(app)  # ETags, 304s and gzip/brotli for every response
+try:
+    ensure_mongo_indexes()  # TTL / unique / sort indexes the Mongo endpoints need
+except PyMongoError as e:
+    # the SQL endpoints work without Mongo; indexes are created on the next start
+    app.logger.warning("could not create Mongo indexes: %s", e)
 
 
 # ==========================
@@ -22,46 +43,121 @@ def get_movies():
       year_start - integer
       year_end   - integer
       min_rating - float
+      type       - titleType (movie, tvSeries, short, ...)
+      limit      - page size (enables paging, max 200)
+      cursor     - next_cursor from the previous page
+
+    Without limit/cursor this returns a plain list (first 200 rows).
+    With them it returns {"items", "limit", "next_cursor"}.
     """
+    try:
+        paged, limit, cursor = read_page_args(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
     q = (request.args.get("q") or "").strip()
     genre = (request.args.get("genre") or "").strip()
     year_start = request.args.get("year_start", type=int)
     year_end = request.args.get("year_end", type=int)
     min_rating = request.args.get("min_rating", type=float)
+    title_type = (request.args.get("type") or "").strip() or None
+
+    if cursor:
+        # keyset: rows strictly after (startYear DESC NULLS LAST, primaryTitle, tconst)
+        try:
+            c_year, c_title, c_tconst = cursor
+        except ValueError:
+            return jsonify({"error": "invalid cursor"}), 400
+
+    # trigram index (search.py) narrows q to a handful of tconsts;
+    # None means it can't answer yet, so fall back to the LIKE scan
+    matches = title_index.candidates(q) if q else None
+    if q and matches is not None and not matches:
+        return jsonify(page_response([], limit, None) if paged else [])
+
+    bit = None
+    if genre:
+        bit = genre_bit(genre)
+        if bit is None:
+            return jsonify(page_response([], limit, None) if paged else [])
+
+    size = limit if paged else 200
+
+    # fast path: the columnar catalog (catalog.py) picks the page in memory and
+    # only that page is hydrated; None means it can't answer, so use SQL
+    page = None
+    if not q or matches is not None:
+        page = title_catalog.page(
+            size,
+            genre_bit=bit,
+            year_start=year_start,
+            year_end=year_end,
+            min_rating=min_rating,
+            title_type=title_type,
+            tconsts=matches,
+            after=c_tconst if cursor else None,
+        )
+
+    if page is not None:
+        # "more" comes from the catalog's candidates, not the hydrated cards
+        cards, more = page
+        movies = [
+            {
+                "tconst": c["tconst"],
+                "title": c["title"],
+                "originalTitle": c["originalTitle"],
+                "year": c["year"],
+                "genres": c["genres"],
+                "ratingAvg": c["rating"],
+                "numVotes": c["numVotes"],
+            }
+            for c in cards
+        ]
+    else:
+        # one extra row tells us whether there is a next page
+        movies = _movies_from_sql(matches, q, bit, year_start, year_end, min_rating,
+                                  title_type, cursor, size + 1 if paged else size)
+        more = len(movies) > size
+        movies = movies[:size]
+
+    next_key = None
+    if paged and more and movies:
+        last = movies[-1]
+        next_key = [last["year"], last["title"], last["tconst"]]
+
+    if paged:
+        return jsonify(page_response(movies, limit, next_key))
+    return jsonify(movies)
+
 
+def _movies_from_sql(matches, q, bit, year_start, year_end, min_rating,
+                     title_type, cursor, fetch):
     sql = """
     SELECT
       t.tconst,
       t.primaryTitle,
       t.originalTitle,
       t.startYear,
-      GROUP_CONCAT(DISTINCT g.genreName ORDER BY g.genreName) AS genres,
+      t.genre_mask,
       t.averageRating,
       t.numVotes
     FROM Title t
-    LEFT JOIN HasGenre hg ON hg.tconst = t.tconst
-    LEFT JOIN Genre g     ON g.genreID = hg.genreID
     WHERE 1=1
     """
     params = []
 
-    if q:
+    if matches is not None:
+        sql += f" AND t.tconst IN ({','.join(['%s'] * len(matches))})"
+        params.extend(sorted(matches))
+    elif q:
         sql += " AND (LOWER(t.primaryTitle) LIKE %s OR LOWER(t.originalTitle) LIKE %s)"
         like = f"%{q.lower()}%"
         params.extend([like, like])
 
-    if genre:
-        # filter titles that have this genre
-        sql += """
-        AND EXISTS (
-            SELECT 1
-            FROM HasGenre hg2
-            JOIN Genre g2 ON g2.genreID = hg2.genreID
-            WHERE hg2.tconst = t.tconst
-              AND LOWER(g2.genreName) = %s
-        )
-        """
-        params.append(genre.lower())
+    if bit is not None:
+        # filter titles that have this genre (bit test on the denormalized mask)
+        sql += " AND (t.genre_mask & %s) <> 0"
+        params.append(bit)
 
     if year_start is not None and year_end is not None:
         sql += " AND t.startYear BETWEEN %s AND %s"
@@ -77,27 +173,45 @@ def get_movies():
         sql += " AND t.averageRating IS NOT NULL AND t.averageRating >= %s"
         params.append(min_rating)
 
+    if title_type is not None:
+        sql += " AND t.titleType = %s"
+        params.append(title_type)
+
+    if cursor:
+        c_year, c_title, c_tconst = cursor
+        if c_year is None:
+            sql += """
+            AND t.startYear IS NULL
+            AND (t.primaryTitle > %s OR (t.primaryTitle = %s AND t.tconst > %s))
+            """
+            params.extend([c_title, c_title, c_tconst])
+        else:
+            sql += """
+            AND (t.startYear < %s OR t.startYear IS NULL
+                 OR (t.startYear = %s
+                     AND (t.primaryTitle > %s
+                          OR (t.primaryTitle = %s AND t.tconst > %s))))
+            """
+            params.extend([c_year, c_year, c_title, c_title, c_tconst])
+
     sql += """
-    GROUP BY t.tconst
-    ORDER BY t.startYear DESC, t.primaryTitle
-    LIMIT 200
+    ORDER BY t.startYear DESC, t.primaryTitle, t.tconst
+    LIMIT %s
     """
+    params.append(fetch)
 
-    rows = query_all(sql, params)
-
-    movies = []
-    for r in rows:
-        genres_list = r["genres"].split(",") if r["genres"] else []
-        movies.append({
+    return [
+        {
             "tconst": r["tconst"],
             "title": r["primaryTitle"],
             "originalTitle": r["originalTitle"],
             "year": r["startYear"],
-            "genres": genres_list,
+            "genres": decode_mask(r["genre_mask"]),
             "ratingAvg": r["averageRating"],
             "numVotes": r["numVotes"],
-        })
-    return jsonify(movies)
+        }
+        for r in query_all(sql, params)
+    ]
 
 @app.route("/api/movies/above_genre_avg", methods=["GET"])
 def get_movies_above_genre_average():
@@ -106,6 +220,9 @@ def get_movies_above_genre_average():
       genre      - genreName (required, case-insensitive)
       min_votes  - optional, minimum numVotes to filter tiny/noisy titles (default 50)
 
+    The genre average (plus count and p25/p50/p75/p90) is read from the
+    precomputed genre_stats table; see genre_stats.py.
+
     Returns:
       {
         "genre": "Biography",
@@ -120,6 +237,17 @@ def get_movies_above_genre_average():
     if not genre:
         return jsonify({"error": "genre is required"}), 400
 
+    g = find_genre(genre)
+    if not g:
+        return jsonify({"genre": genre, "genreAvg": None, "count": 0, "movies": []}), 200
+
+    # genre average comes from the materialized genre_stats table
+    stats = get_stats(g["genreID"], min_votes)
+    genre_avg = stats["avgRating"]
+    if genre_avg is None:
+        return jsonify({"genre": genre, "genreAvg": None, "count": 0, "movies": []}), 200
+
+    # top rows are a range scan on genre_title_rating(genreID, averageRating, numVotes)
     sql = """
     SELECT
       t.tconst,
@@ -128,71 +256,128 @@ def get_movies_above_genre_average():
       t.startYear,
       t.averageRating,
       t.numVotes,
-      GROUP_CONCAT(DISTINCT g.genreName ORDER BY g.genreName) AS genres
-    FROM Title t
-    JOIN HasGenre hg  ON hg.tconst = t.tconst
-    JOIN Genre    g   ON g.genreID = hg.genreID
-    WHERE LOWER(g.genreName) = %s
-      AND t.averageRating IS NOT NULL
-      AND t.numVotes >= %s
-      AND t.averageRating >= (
-          SELECT AVG(t2.averageRating)
-          FROM Title t2
-          JOIN HasGenre hg2 ON hg2.tconst = t2.tconst
-          JOIN Genre    g2  ON g2.genreID = hg2.genreID
-          WHERE LOWER(g2.genreName) = %s
-            AND t2.averageRating IS NOT NULL
-            AND t2.numVotes >= %s
-      )
-    GROUP BY t.tconst, t.primaryTitle, t.originalTitle,
-             t.startYear, t.averageRating, t.numVotes
+      t.genre_mask
+    FROM (
+      SELECT tconst, averageRating, numVotes
+      FROM genre_title_rating
+      WHERE genreID = %s
+        AND averageRating >= %s
+        AND numVotes >= %s
+      ORDER BY averageRating DESC, numVotes DESC
+      LIMIT 200
+    ) top
+    JOIN Title t ON t.tconst = top.tconst
     ORDER BY t.averageRating DESC, t.numVotes DESC
-    LIMIT 200
     """
 
-    rows = query_all(sql, [genre.lower(), min_votes, genre.lower(), min_votes])
+    rows = query_all(sql, [g["genreID"], genre_avg, min_votes])
 
     movies = []
     for r in rows:
-        genres_list = r["genres"].split(",") if r["genres"] else []
         movies.append({
             "tconst": r["tconst"],
             "title": r["primaryTitle"],
             "originalTitle": r["originalTitle"],
             "year": r["startYear"],
-            "genres": genres_list,
+            "genres": decode_mask(r["genre_mask"]),
             "ratingAvg": r["averageRating"],
             "numVotes": r["numVotes"],
         })
 
-    avg_sql = """
-    SELECT AVG(t2.averageRating) AS genreAvg
-    FROM Title t2
-    JOIN HasGenre hg2 ON hg2.tconst = t2.tconst
-    JOIN Genre    g2  ON g2.genreID = hg2.genreID
-    WHERE LOWER(g2.genreName) = %s
-      AND t2.averageRating IS NOT NULL
-      AND t2.numVotes >= %s
-    """
-    avg_rows = query_all(avg_sql, [genre.lower(), min_votes])
-    genre_avg = (
-        avg_rows[0]["genreAvg"]
-        if avg_rows and avg_rows[0]["genreAvg"] is not None
-        else None
-    )
-
     return jsonify({
         "genre": genre,
         "genreAvg": genre_avg,
+        "genreStats": stats,
         "count": len(movies),
         "movies": movies,
     }), 200
 
+@app.route("/api/search/titles", methods=["GET"])
+def search_titles():
+    """
+    Typeahead over titles and AKAs, served from the in-memory trigram index.
+    Query params:
+      q     - search string (3+ characters)
+      limit - max results (default 10, max 50)
+
+    Ranking: exact match, then prefix, then word-prefix, then substring;
+    ties broken by numVotes. Returns 503 while the index is still building.
+    """
+    q = (request.args.get("q") or "").strip()
+    limit = min(max(request.args.get("limit", default=10, type=int), 1), 50)
+
+    results = title_index.search(q, limit=limit)
+    if results is None:
+        return jsonify({"error": "search index is still building"}), 503
+    return jsonify(results)
+
+@app.route("/api/titles/batch", methods=["POST"])
+def get_titles_batch():
+    """
+    Compact cards for many titles in one call.
+    Body: {"tconsts": ["tt0000001", ...]}  (up to BATCH_CONFIG["max_batch"]),
+    or just the list.
+
+    Returns {"items": [...], "missing": [...]}; items keep the request order.
+    """
+    data = request.get_json() or {}
+    if isinstance(data, list):
+        data = {"tconsts": data}
+    if not isinstance(data, dict):
+        return jsonify({"error": 'body must be {"tconsts": [...]}'}), 400
+    tconsts = data.get("tconsts") or []
+    if not isinstance(tconsts, list) or not all(isinstance(t, str) for t in tconsts):
+        return jsonify({"error": "tconsts must be a list of strings"}), 400
+    tconsts = [t.strip() for t in tconsts if t.strip()]
+    if len(tconsts) > BATCH_CONFIG["max_batch"]:
+        return jsonify({"error": f"at most {BATCH_CONFIG['max_batch']} tconsts per batch"}), 400
+
+    items = title_cards(tconsts)
+    found = {c["tconst"] for c in items}
+    missing = [t for t in dict.fromkeys(tconsts) if t not in found]
+    return jsonify({"items": items, "missing": missing})
+
 # ==========================
 #  MOVIE DETAILS
 # ==========================
+TITLE_SECTIONS = ("principals", "akas", "reviews")
+DEFAULT_TITLE_FIELDS = ("principals", "akas")
+
+# runs the Mongo part of /api/title in parallel with the SQL part
+_io_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="title-io")
+
+
+def _title_fields():
+    raw = (request.args.get("fields") or "").strip()
+    if not raw:
+        return set(DEFAULT_TITLE_FIELDS)
+    return {f.strip() for f in raw.split(",") if f.strip() in TITLE_SECTIONS}
+
+
+def _title_cache_tags(tconst):
+    tags = [f"title:{tconst}"]
+    if "reviews" in _title_fields():
+        tags.append(f"reviews:{tconst}")
+    return tags
+
+
 @app.route("/api/title/<tconst>", methods=["GET"])
+@cached(ttl=300, tags=_title_cache_tags)
 def get_title_details(tconst):
+    """
+    Title details. All SQL sections are fetched over one pooled connection.
+
+    Query params:
+      fields - comma list of extra sections: principals, akas, reviews
+               (default "principals,akas"; "reviews" embeds a Mongo review
+               summary, fetched in parallel with the SQL queries)
+    """
+    fields = _title_fields()
+
+    reviews_future = None
+    if "reviews" in fields:
+        reviews_future = metrics.run_in_context(_io_pool, review_summary, tconst)
+
     # Basic title + ratings + genres
     title_sql = """
     SELECT
@@ -206,51 +391,55 @@ def get_title_details(tconst):
       t.isAdult,
       t.averageRating,
       t.numVotes,
-      GROUP_CONCAT(DISTINCT g.genreName ORDER BY g.genreName) AS genres
+      t.genre_mask
     FROM Title t
-    LEFT JOIN HasGenre hg ON hg.tconst = t.tconst
-    LEFT JOIN Genre g     ON g.genreID = hg.genreID
     WHERE t.tconst = %s
-    GROUP BY t.tconst
     """
-    rows = query_all(title_sql, [tconst])
-    if not rows:
-        return jsonify({"error": "Title not found"}), 404
-    t = rows[0]
+    statements = [(title_sql, [tconst])]
 
     # Principals (cast/crew)
-    principal_sql = """
-    SELECT
-      h.ordering,
-      h.category,
-      h.job,
-      h.characterName,
-      h.nconst,
-      p.primaryName
-    FROM HasPrincipal h
-    LEFT JOIN Person p ON p.nconst = h.nconst
-    WHERE h.tconst = %s
-    ORDER BY h.ordering
-    """
-    principals = query_all(principal_sql, [tconst])
+    if "principals" in fields:
+        principal_sql = """
+        SELECT
+          h.ordering,
+          h.category,
+          h.job,
+          h.characterName,
+          h.nconst,
+          p.primaryName
+        FROM HasPrincipal h
+        LEFT JOIN Person p ON p.nconst = h.nconst
+        WHERE h.tconst = %s
+        ORDER BY h.ordering
+        """
+        statements.append((principal_sql, [tconst]))
 
     # AKAs
-    akas_sql = """
-    SELECT
-      ordering,
-      title,
-      region,
-      language,
-      types,
-      attributes,
-      isOriginalTitle
-    FROM TitleAkas
-    WHERE titleId = %s
-    ORDER BY ordering
-    """
-    akas = query_all(akas_sql, [tconst])
+    if "akas" in fields:
+        akas_sql = """
+        SELECT
+          ordering,
+          title,
+          region,
+          language,
+          types,
+          attributes,
+          isOriginalTitle
+        FROM TitleAkas
+        WHERE titleId = %s
+        ORDER BY ordering
+        """
+        statements.append((akas_sql, [tconst]))
 
-    return jsonify({
+    results = iter(query_many(statements))
+    rows = next(results)
+    if not rows:
+        if reviews_future:
+            reviews_future.cancel()
+        return jsonify({"error": "Title not found"}), 404
+    t = rows[0]
+
+    out = {
         "tconst": t["tconst"],
         "primaryTitle": t["primaryTitle"],
         "originalTitle": t["originalTitle"],
@@ -259,12 +448,18 @@ def get_title_details(tconst):
         "endYear": t["endYear"],
         "runtimeMinutes": t["runtimeMinutes"],
         "isAdult": t["isAdult"],
-        "genres": t["genres"].split(",") if t["genres"] else [],
+        "genres": decode_mask(t["genre_mask"]),
         "ratingAvg": t["averageRating"],
         "numVotes": t["numVotes"],
-        "principals": principals,
-        "akas": akas,
-    })
+    }
+    if "principals" in fields:
+        out["principals"] = next(results)
+    if "akas" in fields:
+        out["akas"] = next(results)
+    if reviews_future:
+        out["reviews"] = reviews_future.result()
+
+    return jsonify(out)
 
 
 # ==========================
@@ -274,36 +469,64 @@ def get_title_details(tconst):
 def get_actors():
     """
     Simple list of people + professions.
-    You can add search later with ?q=
+    Query params:
+      q      - substring of primaryName
+      limit  - page size (enables paging, max 200)
+      cursor - next_cursor from the previous page
     """
+    try:
+        paged, limit, cursor = read_page_args(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
     q = (request.args.get("q") or "").strip()
 
-    sql = """
+    where = ""
+    params = []
+
+    if q:
+        # primaryName's collation is case-insensitive, so no LOWER() needed
+        where += " AND p.primaryName LIKE %s"
+        params.append(f"%{q}%")
+
+    if cursor:
+        try:
+            c_name, c_nconst = cursor
+        except ValueError:
+            return jsonify({"error": "invalid cursor"}), 400
+        where += " AND (p.primaryName > %s OR (p.primaryName = %s AND p.nconst > %s))"
+        params.extend([c_name, c_name, c_nconst])
+
+    params.append(limit + 1 if paged else 200)
+
+    # page people first (walks idx_person_name in order, see
+    # migrations/0003_query_indexes.sql), then attach professions to that page
+    sql = f"""
     SELECT
       p.nconst,
       p.primaryName,
       p.birthYear,
       p.deathYear,
       GROUP_CONCAT(DISTINCT pr.professionName ORDER BY pr.professionName) AS professions
-    FROM Person p
+    FROM (
+      SELECT p.nconst, p.primaryName, p.birthYear, p.deathYear
+      FROM Person p
+      WHERE 1=1 {where}
+      ORDER BY p.primaryName, p.nconst
+      LIMIT %s
+    ) p
     LEFT JOIN HasProfession hp ON hp.nconst = p.nconst
     LEFT JOIN Profession pr    ON pr.professionID = hp.professionID
-    WHERE 1=1
-    """
-    params = []
-
-    if q:
-        sql += " AND LOWER(p.primaryName) LIKE %s"
-        params.append(f"%{q.lower()}%")
-
-    sql += """
-    GROUP BY p.nconst
-    ORDER BY p.primaryName
-    LIMIT 200
+    GROUP BY p.nconst, p.primaryName, p.birthYear, p.deathYear
+    ORDER BY p.primaryName, p.nconst
     """
-
     rows = query_all(sql, params)
 
+    next_key = None
+    if paged and len(rows) > limit:
+        rows = rows[:limit]
+        next_key = [rows[-1]["primaryName"], rows[-1]["nconst"]]
+
     actors = []
     for r in rows:
         profs = r["professions"].split(",") if r["professions"] else []
@@ -314,6 +537,8 @@ def get_actors():
             "deathYear": r["deathYear"],
             "professions": profs,
         })
+    if paged:
+        return jsonify(page_response(actors, limit, next_key))
     return jsonify(actors)
 
 
@@ -321,6 +546,7 @@ def get_actors():
 #  PERSON DETAILS
 # ==========================
 @app.route("/api/person/<nconst>", methods=["GET"])
+@cached(ttl=300, tags=lambda nconst: [f"person:{nconst}", "people"])
 def get_person_details(nconst):
     person_sql = """
     SELECT
@@ -364,10 +590,67 @@ def get_person_details(nconst):
     })
 
 
+@app.route("/api/person/<nconst>/filmography", methods=["GET"])
+@cached(ttl=300, tags=lambda nconst: [f"person:{nconst}", "people"])
+def get_person_filmography(nconst):
+    """
+    Every title a person is a principal on, from the person_title adjacency
+    table (filmography.py). Always paged.
+
+    Query params:
+      category   - e.g. actor, director, writer (any of the person's categories)
+      year_start / year_end - startYear range
+      sort       - year (default, newest first) or rating (highest first)
+      limit      - page size (default 50, max 200)
+      cursor     - next_cursor from the previous page
+    """
+    sort = request.args.get("sort", "year")
+    if sort not in FILMOGRAPHY_SORTS:
+        return jsonify({"error": f"sort must be one of {', '.join(FILMOGRAPHY_SORTS)}"}), 400
+    try:
+        _paged, limit, cursor = read_page_args(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if cursor is not None and len(cursor) != 2:
+        return jsonify({"error": "invalid cursor"}), 400
+
+    rows, next_key = filmography(
+        nconst,
+        category=(request.args.get("category") or "").strip() or None,
+        year_start=request.args.get("year_start", type=int),
+        year_end=request.args.get("year_end", type=int),
+        sort=sort,
+        limit=limit,
+        cursor=cursor,
+    )
+    cards = get_title_cards([r["tconst"] for r in rows])
+    items = [
+        {**cards[r["tconst"]], "categories": r["categories"]}
+        for r in rows
+        if r["tconst"] in cards
+    ]
+    return jsonify(page_response(items, limit, next_key))
+
+
+@app.route("/api/person/<nconst>/collaborators", methods=["GET"])
+@cached(ttl=300, tags=lambda nconst: [f"person:{nconst}", "people"])
+def get_person_collaborators(nconst):
+    """
+    People who share the most titles with this person (precomputed in
+    person_collab, see filmography.py).
+
+    Query params:
+      limit - how many (default 20, max 100)
+    """
+    limit = max(1, min(request.args.get("limit", type=int) or 20, 100))
+    return jsonify(collaborators(nconst, limit))
+
+
 # ==========================
 #  GENRES
 # ==========================
 @app.route("/api/genres", methods=["GET"])
+@cached(ttl=3600, tags=lambda: ["genres"])
 def get_genres():
     sql = "SELECT genreID, genreName FROM Genre ORDER BY genreName"
     rows = query_all(sql)
@@ -377,6 +660,32 @@ def get_genres():
     ])
 
 
+# ==========================
+#  METRICS
+# ==========================
+@app.route("/api/metrics/db_pool", methods=["GET"])
+def get_db_pool_metrics():
+    """MySQL connection pool counters (wait / checkout times, sizes)."""
+    return jsonify(pool_stats())
+
+
+@app.route("/api/metrics/cache", methods=["GET"])
+def get_cache_metrics():
+    """Response cache hit/miss counters per route + backend size."""
+    return jsonify(cache_stats())
+
+
+@app.route("/api/metrics/search_index", methods=["GET"])
+def get_search_index_metrics():
+    return jsonify(title_index.stats())
+
+
+@app.route("/api/metrics/catalog", methods=["GET"])
+def get_catalog_metrics():
+    """Columnar title catalog: rows, build time and memory per column."""
+    return jsonify(title_catalog.stats())
+
+
 # ==========================
 #  MAIN ENTRYPOINT
 # ==========================
@@ -1,18 +1,20 @@
 # auth.py
-from flask import Blueprint, request, jsonify
-from werkzeug.security import generate_password_hash, check_password_hash
-import mysql.connector
+from flask import Blueprint, current_app, request, jsonify
+from db import get_connection
+from passwords import PasswordBusy, check_password, hash_password, needs_rehash
+from pagination import read_page_args, page_response
+from tokens import TokenError, issue_tokens, require_admin, require_user, revoke, verify_refresh
 
 auth_bp = Blueprint("auth", __name__)
 
+@auth_bp.errorhandler(PasswordBusy)
+def password_busy(_e):
+    # the password hashing pool is saturated (see passwords.py)
+    return jsonify({"error": "too many login attempts in progress, try again shortly"}), 503
+
 def get_db():
-    # adapt this to whatever you're already using
-    return mysql.connector.connect(
-        host="localhost",
-        user="root",
-        password="12345678",
-        database="project2",
-    )
+    # pooled connection from db.py; conn.close() returns it to the pool
+    return get_connection()
 
 def row_to_user(row):
     # row order must match your SELECT
@@ -37,21 +39,31 @@ def register():
     if not username or not email or not password:
         return jsonify({"error": "username, email, and password are required"}), 400
 
-    pw_hash = generate_password_hash(password)
-
     conn = get_db()
     cur = conn.cursor()
 
-    # check if username / email taken
+    # check if username / email taken (one branch per unique index)
     cur.execute(
-        "SELECT user_id FROM users WHERE username = %s OR email = %s",
+        """
+        (SELECT user_id FROM users WHERE username = %s)
+        UNION ALL
+        (SELECT user_id FROM users WHERE email = %s)
+        LIMIT 1
+        """,
         (username, email),
     )
-    if cur.fetchone():
-        cur.close()
-        conn.close()
+    taken = cur.fetchone()
+    cur.close()
+    conn.close()
+    if taken:
         return jsonify({"error": "username or email already in use"}), 409
 
+    # hash without holding a pooled connection
+    pw_hash = hash_password(password)
+
+    conn = get_db()
+    cur = conn.cursor()
+
     cur.execute(
         """
         INSERT INTO users (username, email, password_hash, display_name)
@@ -73,7 +85,8 @@ def register():
     cur.close()
     conn.close()
 
-    return jsonify(row_to_user(row)), 201
+    user = row_to_user(row)
+    return jsonify({**user, **issue_tokens(user)}), 201
 
 @auth_bp.post("/api/login")
 def login():
@@ -84,14 +97,20 @@ def login():
     if not identifier or not password:
         return jsonify({"error": "username/email and password are required"}), 400
 
+    # username match wins over email match; each branch uses its unique index
     conn = get_db()
     cur = conn.cursor()
     cur.execute(
         """
-        SELECT user_id, username, email, display_name, bio, is_admin,
-               is_active, password_hash
-        FROM users
-        WHERE (username = %s OR email = %s)
+        (SELECT 0 AS pref, user_id, username, email, display_name, bio,
+                is_admin, is_active, password_hash
+         FROM users WHERE username = %s)
+        UNION ALL
+        (SELECT 1 AS pref, user_id, username, email, display_name, bio,
+                is_admin, is_active, password_hash
+         FROM users WHERE email = %s)
+        ORDER BY pref
+        LIMIT 1
         """,
         (identifier, identifier),
     )
@@ -100,16 +119,38 @@ def login():
     conn.close()
 
     if not row:
+        # same hashing cost as a real check, so unknown users aren't faster
+        check_password(None, password)
         return jsonify({"error": "invalid credentials"}), 401
 
-    user_id, username, email, display_name, bio, is_admin, is_active, pw_hash = row
+    _pref, user_id, username, email, display_name, bio, is_admin, is_active, pw_hash = row
 
     if not is_active:
         return jsonify({"error": "account is disabled"}), 403
 
-    if not check_password_hash(pw_hash, password):
+    if not check_password(pw_hash, password):
         return jsonify({"error": "invalid credentials"}), 401
 
+    if needs_rehash(pw_hash):
+        # hashing parameters changed since this hash was made; upgrade it now
+        # that we have the plain password (best effort, the login succeeds anyway)
+        try:
+            new_hash = hash_password(password)
+            conn = get_db()
+            try:
+                cur = conn.cursor()
+                cur.execute(
+                    "UPDATE users SET password_hash = %s WHERE user_id = %s AND password_hash = %s",
+                    (new_hash, user_id, pw_hash),
+                )
+                conn.commit()
+                cur.close()
+            finally:
+                conn.close()
+        except Exception:
+            # the login itself succeeded; the old hash keeps working
+            current_app.logger.exception("password rehash for user %s failed", user_id)
+
     user = {
         "user_id": user_id,
         "username": username,
@@ -119,15 +160,46 @@ def login():
         "is_admin": bool(is_admin),
         "is_active": bool(is_active),
     }
-    return jsonify(user), 200
+    return jsonify({**user, **issue_tokens(user)}), 200
+
+@auth_bp.post("/api/token/refresh")
+def refresh_token():
+    """Trade a refresh token for a new token pair. Re-reads the user row, so
+       admin / active changes and deletions take effect here."""
+    data = request.get_json() or {}
+    try:
+        user_id = verify_refresh(data.get("refresh_token") or "")
+    except TokenError as e:
+        return jsonify({"error": str(e)}), 401
+
+    conn = get_db()
+    cur = conn.cursor()
+    cur.execute(
+        """
+        SELECT user_id, username, email, display_name, bio, is_admin, is_active
+        FROM users
+        WHERE user_id = %s
+        """,
+        (user_id,),
+    )
+    row = cur.fetchone()
+    cur.close()
+    conn.close()
+
+    if not row:
+        return jsonify({"error": "user not found"}), 401
+    user = row_to_user(row)
+    if not user["is_active"]:
+        return jsonify({"error": "account is disabled"}), 403
+    return jsonify({**user, **issue_tokens(user)}), 200
 
 # ========== USER SELF PROFILE (READ + UPDATE) ==========
 
 @auth_bp.get("/api/users/<int:user_id>")
+@require_user()
 def get_user_profile(user_id):
     """Get a single user's profile (used for 'My Profile').
-       For simplicity we don't check auth here – frontend only calls this for
-       the currently logged-in user.
+       With a bearer token, only that user (or an admin) may read it; see tokens.py.
     """
     conn = get_db()
     cur = conn.cursor()
@@ -150,6 +222,7 @@ def get_user_profile(user_id):
 
 
 @auth_bp.put("/api/users/<int:user_id>")
+@require_user()
 def update_user_profile(user_id):
     """Update the logged-in user's own profile.
        We allow: display_name, bio, and optional password change.
@@ -171,7 +244,7 @@ def update_user_profile(user_id):
         values.append(bio)
 
     if new_password:
-        pw_hash = generate_password_hash(new_password)
+        pw_hash = hash_password(new_password)
         fields.append("password_hash = %s")
         values.append(pw_hash)
 
@@ -204,33 +277,65 @@ def update_user_profile(user_id):
     if not row:
         return jsonify({"error": "user not found"}), 404
 
-    return jsonify(row_to_user(row)), 200
+    user = row_to_user(row)
+    if new_password:
+        # a password change ends the other sessions; this one gets new tokens
+        revoke(user_id)
+        user.update(issue_tokens(user))
+    return jsonify(user), 200
 
 # ========== ADMIN: MANAGE USERS (R, U, D) ==========
 
 @auth_bp.get("/api/admin/users")
+@require_admin
 def admin_list_users():
     """List all users (for admin panel).
-       NOTE: For this project we assume frontend only calls this if is_admin is true.
-       In a real app you'd verify an admin token here.
+       Requires an admin token when one is sent / enforced (tokens.py).
+
+       Optional ?limit=&cursor= switch to keyset paging on user_id and
+       return {"items", "limit", "next_cursor"} instead of the full list.
     """
-    conn = get_db()
-    cur = conn.cursor()
-    cur.execute(
-        """
+    try:
+        paged, limit, cursor = read_page_args(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    sql = """
         SELECT user_id, username, email, display_name, bio, is_admin, is_active
         FROM users
-        ORDER BY user_id
         """
-    )
+    params = []
+    if cursor:
+        try:
+            after_id = int(cursor[0])
+        except (IndexError, TypeError, ValueError):
+            return jsonify({"error": "invalid cursor"}), 400
+        sql += " WHERE user_id > %s"
+        params.append(after_id)
+    sql += " ORDER BY user_id"
+    if paged:
+        sql += " LIMIT %s"
+        params.append(limit + 1)
+
+    conn = get_db()
+    cur = conn.cursor()
+    cur.execute(sql, tuple(params))
     rows = cur.fetchall()
     cur.close()
     conn.close()
 
-    return jsonify([row_to_user(r) for r in rows]), 200
+    if not paged:
+        return jsonify([row_to_user(r) for r in rows]), 200
+
+    next_key = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_key = [rows[-1][0]]
+    return jsonify(page_response([row_to_user(r) for r in rows], limit, next_key)), 200
 
 
 @auth_bp.put("/api/admin/users/<int:user_id>")
+@require_admin
 def admin_update_user(user_id):
     """Admin can toggle is_admin / is_active (and optionally display_name/bio)."""
     data = request.get_json() or {}
@@ -263,6 +368,8 @@ def admin_update_user(user_id):
         tuple(values),
     )
     conn.commit()
+    # tokens carry is_admin / is_active: make the user refresh to pick them up
+    revoke(user_id)
 
     cur.execute(
         """
@@ -283,12 +390,14 @@ def admin_update_user(user_id):
 
 
 @auth_bp.delete("/api/admin/users/<int:user_id>")
+@require_admin
 def admin_delete_user(user_id):
     """Admin delete user. Here we do a hard delete; you could also soft-delete."""
     conn = get_db()
     cur = conn.cursor()
     cur.execute("DELETE FROM users WHERE user_id = %s", (user_id,))
     conn.commit()
+    revoke(user_id)
     cur.close()
     conn.close()
 
@@ -0,0 +1,272 @@
+# bench/run.py
+"""
+Drive the API at a fixed concurrency and report latency percentiles.
+
+    cd backend
+    python -m bench.seed --reset                       # once
+    python wsgi.py                                     # in another shell
+    python -m bench.run --out bench/baseline.json      # record a baseline
+    python -m bench.run --compare bench/baseline.json  # later: catch regressions
+
+Each scenario runs `--requests` requests spread over `--concurrency` threads
+(each thread keeps one HTTP keep-alive connection) after `--warmup` unmeasured
+requests. The report has, per scenario, p50/p95/p99/mean/max latency in ms,
+throughput in requests/s, and status / error counts.
+
+With --compare, every scenario's p95 and throughput are checked against the
+baseline; anything worse than --tolerance (default 20%) is listed and the
+script exits with status 1.
+"""
+import argparse
+import http.client
+import json
+import platform
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from urllib.parse import urlencode, urlsplit
+
+from db import query_all
+from bench.seed import BENCH_PASSWORD, TCONST_PREFIX, USER_PREFIX
+
+RUN_DEFAULTS = {
+    "base": "http://127.0.0.1:5000",
+    "concurrency": 16,
+    "requests": 2000,
+    "warmup": 100,
+    "timeout": 30.0,
+    "tolerance": 0.20,
+}
+
+
+def _sample_ids():
+    """Seeded tconsts / usernames to spread requests over."""
+    tconsts = [r["tconst"] for r in query_all(
+        "SELECT tconst FROM title WHERE tconst LIKE %s LIMIT 2000", [TCONST_PREFIX + "%"]
+    )]
+    if not tconsts:
+        tconsts = [r["tconst"] for r in query_all("SELECT tconst FROM title LIMIT 2000")]
+    users = [r["username"] for r in query_all(
+        "SELECT username FROM users WHERE username LIKE %s LIMIT 500", [USER_PREFIX + "%"]
+    )]
+    return tconsts, users
+
+
+def build_scenarios(rng, tconsts, users):
+    """name -> callable returning (method, path, json_body or None)."""
+    words = ["silent", "river", "the last", "empire", "shadow", "golden", "storm"]
+    genres = ["Drama", "Comedy", "Action", "Horror", "Sci-Fi", "Romance"]
+
+    def movies_plain():
+        return "GET", "/api/movies", None
+
+    def movies_search():
+        return "GET", "/api/movies?" + urlencode({"q": rng.choice(words)}), None
+
+    def movies_filtered():
+        start = rng.randint(1950, 2015)
+        params = {
+            "genre": rng.choice(genres),
+            "year_start": start,
+            "year_end": start + rng.randint(1, 10),
+            "min_rating": rng.choice([5, 6, 7, 8]),
+        }
+        return "GET", "/api/movies?" + urlencode(params), None
+
+    def movies_paged():
+        return "GET", "/api/movies?" + urlencode({"genre": rng.choice(genres), "limit": 50}), None
+
+    def title_details():
+        return "GET", f"/api/title/{rng.choice(tconsts)}", None
+
+    def title_full():
+        return "GET", f"/api/title/{rng.choice(tconsts)}?fields=principals,akas,reviews", None
+
+    def top_user_rated():
+        return "GET", "/api/top_user_rated?limit=10&min_reviews=2", None
+
+    def search_trending():
+        return "GET", "/api/search_trending?" + urlencode({"window": rng.choice(["1h", "24h", "7d"])}), None
+
+    def login():
+        return "POST", "/api/login", {"username": rng.choice(users), "password": BENCH_PASSWORD}
+
+    scenarios = {
+        "movies": movies_plain,
+        "movies_search": movies_search,
+        "movies_filtered": movies_filtered,
+        "movies_paged": movies_paged,
+        "title": title_details,
+        "title_full": title_full,
+        "top_user_rated": top_user_rated,
+        "search_trending": search_trending,
+    }
+    if users:
+        scenarios["login"] = login
+    return scenarios
+
+
+class _Client:
+    """One keep-alive connection per worker thread."""
+
+    def __init__(self, base, timeout):
+        parts = urlsplit(base)
+        cls = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+        self.conn = cls(parts.hostname, parts.port, timeout=timeout)
+
+    def request(self, method, path, body):
+        headers = {"Accept-Encoding": "gzip"}
+        data = None
+        if body is not None:
+            data = json.dumps(body).encode()
+            headers["Content-Type"] = "application/json"
+        try:
+            self.conn.request(method, path, body=data, headers=headers)
+            resp = self.conn.getresponse()
+            resp.read()
+            return resp.status
+        except (http.client.HTTPException, OSError):
+            self.conn.close()  # reconnects on the next request
+            raise
+
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    k = (len(sorted_values) - 1) * pct / 100
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+def run_scenario(make_request, base, concurrency, total, warmup, timeout):
+    local = threading.local()
+    latencies = []
+    statuses = {}
+    errors = {}
+    lock = threading.Lock()
+
+    def one(measure):
+        client = getattr(local, "client", None)
+        if client is None:
+            client = local.client = _Client(base, timeout)
+        method, path, body = make_request()
+        started = time.perf_counter()
+        try:
+            status = client.request(method, path, body)
+        except Exception as e:
+            if measure:
+                with lock:
+                    errors[type(e).__name__] = errors.get(type(e).__name__, 0) + 1
+            return
+        elapsed = time.perf_counter() - started
+        if measure:
+            with lock:
+                latencies.append(elapsed * 1000)
+                statuses[status] = statuses.get(status, 0) + 1
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(lambda _: one(False), range(warmup)))
+        started = time.perf_counter()
+        list(pool.map(lambda _: one(True), range(total)))
+        wall = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "throughput_rps": round(len(latencies) / wall, 1) if wall else None,
+        "p50_ms": _round(_percentile(latencies, 50)),
+        "p95_ms": _round(_percentile(latencies, 95)),
+        "p99_ms": _round(_percentile(latencies, 99)),
+        "mean_ms": _round(sum(latencies) / len(latencies)) if latencies else None,
+        "max_ms": _round(latencies[-1]) if latencies else None,
+        "status": {str(k): v for k, v in sorted(statuses.items())},
+        "errors": errors,
+    }
+
+
+def _round(value):
+    return round(value, 2) if value is not None else None
+
+
+def compare(report, baseline, tolerance):
+    """Scenarios whose p95 or throughput got worse than the tolerance allows."""
+    regressions = []
+    for name, now in report["scenarios"].items():
+        before = baseline.get("scenarios", {}).get(name)
+        if not before:
+            continue
+        if before.get("p95_ms") and now.get("p95_ms") is not None \
+                and now["p95_ms"] > before["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {before['p95_ms']} -> {now['p95_ms']} ms")
+        if before.get("throughput_rps") and now.get("throughput_rps") is not None \
+                and now["throughput_rps"] < before["throughput_rps"] * (1 - tolerance):
+            regressions.append(
+                f"{name}: throughput {before['throughput_rps']} -> {now['throughput_rps']} req/s"
+            )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    for key, value in RUN_DEFAULTS.items():
+        parser.add_argument(f"--{key}", type=type(value), default=value)
+    parser.add_argument("--only", default="", help="comma list of scenarios to run")
+    parser.add_argument("--seed", type=int, default=2003)
+    parser.add_argument("--out", help="write the JSON report here")
+    parser.add_argument("--compare", help="baseline JSON report to check against")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    tconsts, users = _sample_ids()
+    if not tconsts:
+        sys.exit("no titles in the database; run `python -m bench.seed` first")
+    scenarios = build_scenarios(rng, tconsts, users)
+    if args.only:
+        wanted = [s.strip() for s in args.only.split(",") if s.strip()]
+        unknown = [s for s in wanted if s not in scenarios]
+        if unknown:
+            sys.exit(f"unknown scenarios: {', '.join(unknown)} (have {', '.join(scenarios)})")
+        scenarios = {name: scenarios[name] for name in wanted}
+
+    report = {
+        "started_at": datetime.utcnow().isoformat() + "Z",
+        "base": args.base,
+        "concurrency": args.concurrency,
+        "requests_per_scenario": args.requests,
+        "python": platform.python_version(),
+        "scenarios": {},
+    }
+    for name, make_request in scenarios.items():
+        result = run_scenario(make_request, args.base, args.concurrency,
+                              args.requests, args.warmup, args.timeout)
+        report["scenarios"][name] = result
+        print(f"{name:16} p50={result['p50_ms']}ms p95={result['p95_ms']}ms "
+              f"p99={result['p99_ms']}ms {result['throughput_rps']} req/s "
+              f"status={result['status']} errors={result['errors']}", file=sys.stderr)
+
+    out = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(out + "\n")
+    else:
+        print(out)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.tolerance)
+        if regressions:
+            print("regressions against " + args.compare + ":", file=sys.stderr)
+            for line in regressions:
+                print("  " + line, file=sys.stderr)
+            sys.exit(1)
+        print(f"no regressions against {args.compare}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
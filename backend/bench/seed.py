@@ -0,0 +1,308 @@
+# bench/seed.py
+"""
+Seed synthetic IMDb-shaped data for benchmarking.
+
+    cd backend
+    python -m bench.seed --titles 20000 --reset
+
+Writes into the same MySQL database / Mongo DB as the app (db.py, mongo.py),
+using the Dump20251129.sql schema: title, hasgenre, person, hasprofession,
+hasprincipal, knownfor, titleakas and users, plus reviews, watchlists and
+search_logs in Mongo. Run the migrations first; their triggers keep
+title.genre_mask and genre_title_rating in sync while rows go in.
+
+Synthetic rows use their own id prefixes (tconst "tb...", nconst "nb...",
+usernames "bench_user_...") so --reset only removes what an earlier seed run
+created. The same --seed always produces the same data.
+
+Every bench user has the password BENCH_PASSWORD (bench/run.py logs in with it).
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+from db import get_connection
+from mongo import reviews_col, watchlists_col, logs_col
+import genre_stats
+from passwords import hash_password
+import review_stats
+import trending
+
+BENCH_PASSWORD = "bench-password"
+TCONST_PREFIX = "tb"
+NCONST_PREFIX = "nb"
+USER_PREFIX = "bench_user_"
+
+SCALE_DEFAULTS = {
+    "titles": 10000,
+    "people_per_title": 0.8,
+    "users": 500,
+    "reviews_per_user": 20,
+    "watchlist_items": 15,
+    "search_logs": 50000,
+    "chunk_size": 1000,   # rows per executemany / insert_many
+}
+
+_ADJECTIVES = [
+    "Silent", "Crimson", "Last", "Hidden", "Broken", "Golden", "Dark", "Lost",
+    "Wild", "Frozen", "Burning", "Secret", "Final", "Electric", "Midnight",
+    "Empty", "Endless", "Distant", "Savage", "Quiet",
+]
+_NOUNS = [
+    "River", "Empire", "Horizon", "Shadow", "Kingdom", "Promise", "Garden",
+    "Station", "Storm", "Dream", "Harbor", "Witness", "Frontier", "Machine",
+    "Summer", "Letter", "Island", "Road", "Circle", "Signal",
+]
+_FIRST = [
+    "Anna", "Ben", "Chen", "Diego", "Elena", "Farah", "George", "Hana", "Ivan",
+    "Julia", "Kenji", "Lena", "Marco", "Nadia", "Omar", "Priya", "Quinn",
+    "Rosa", "Sam", "Tara", "Umar", "Vera", "Wei", "Yusuf", "Zoe",
+]
+_LAST = [
+    "Anderson", "Brooks", "Castillo", "Dubois", "Evans", "Fischer", "Garcia",
+    "Hoffman", "Ito", "Jensen", "Kowalski", "Lim", "Moreau", "Novak",
+    "Okafor", "Petrov", "Rossi", "Santos", "Tanaka", "Weber",
+]
+_WORDS = [
+    "great", "boring", "acting", "plot", "twist", "soundtrack", "visuals",
+    "slow", "brilliant", "ending", "characters", "script", "funny", "dark",
+    "beautiful", "confusing", "masterpiece", "overrated", "cast", "pacing",
+]
+_TITLE_TYPES = ["movie"] * 6 + ["tvSeries", "short", "tvMovie", "tvEpisode"]
+_CATEGORIES = ["actor", "actress", "actor", "actress", "director", "writer",
+               "producer", "composer"]
+_REGIONS = ["US", "GB", "FR", "DE", "JP", "SG", "IN", "BR"]
+
+
+def _title_name(rng):
+    name = f"The {rng.choice(_ADJECTIVES)} {rng.choice(_NOUNS)}"
+    if rng.random() < 0.3:
+        name += f" {rng.randint(2, 4)}"
+    return name
+
+
+def _insert(conn, sql, rows, chunk):
+    cur = conn.cursor()
+    try:
+        for i in range(0, len(rows), chunk):
+            cur.executemany(sql, rows[i:i + chunk])
+            conn.commit()
+    finally:
+        cur.close()
+
+
+def _ids(conn, sql):
+    cur = conn.cursor()
+    cur.execute(sql)
+    rows = [r[0] for r in cur.fetchall()]
+    cur.close()
+    return rows
+
+
+def reset(conn):
+    """Remove rows created by an earlier seed run (child tables first)."""
+    cur = conn.cursor()
+    t_like = TCONST_PREFIX + "%"
+    n_like = NCONST_PREFIX + "%"
+    for sql, arg in [
+        ("DELETE FROM titleakas WHERE titleId LIKE %s", t_like),
+        ("DELETE FROM hasprincipal WHERE tconst LIKE %s", t_like),
+        ("DELETE FROM knownfor WHERE nconst LIKE %s", n_like),
+        ("DELETE FROM hasgenre WHERE tconst LIKE %s", t_like),
+        ("DELETE FROM hasprofession WHERE nconst LIKE %s", n_like),
+        ("DELETE FROM title WHERE tconst LIKE %s", t_like),
+        ("DELETE FROM person WHERE nconst LIKE %s", n_like),
+    ]:
+        cur.execute(sql, (arg,))
+        conn.commit()
+    cur.execute("SELECT user_id FROM users WHERE username LIKE %s", (USER_PREFIX + "%",))
+    user_ids = [r[0] for r in cur.fetchall()]
+    cur.execute("DELETE FROM users WHERE username LIKE %s", (USER_PREFIX + "%",))
+    conn.commit()
+    cur.close()
+
+    tconst_re = {"$regex": f"^{TCONST_PREFIX}"}
+    reviews_col.delete_many({"tconst": tconst_re})
+    watchlists_col.delete_many({"user_id": {"$in": user_ids}})
+    logs_col.delete_many({"user_id": {"$in": user_ids}})
+
+
+def seed_mysql(conn, rng, scale):
+    chunk = scale["chunk_size"]
+    n_titles = scale["titles"]
+    n_people = max(int(n_titles * scale["people_per_title"]), 1)
+
+    genre_ids = _ids(conn, "SELECT genreID FROM genre")
+    profession_ids = _ids(conn, "SELECT professionID FROM profession")
+
+    titles, genres, akas = [], [], []
+    tconsts = [f"{TCONST_PREFIX}{i:07d}" for i in range(n_titles)]
+    for tconst in tconsts:
+        name = _title_name(rng)
+        ttype = rng.choice(_TITLE_TYPES)
+        year = rng.randint(1920, 2025)
+        end_year = year + rng.randint(0, 8) if ttype == "tvSeries" else None
+        rated = rng.random() < 0.85
+        titles.append((
+            tconst, ttype, name, name, 0, year, end_year,
+            rng.randint(5, 60) if ttype == "short" else rng.randint(70, 180),
+            round(rng.uniform(1.5, 9.5), 1) if rated else None,
+            int(rng.paretovariate(1.2) * 20) if rated else None,
+        ))
+        for gid in rng.sample(genre_ids, rng.randint(1, 3)):
+            genres.append((tconst, gid))
+        for ordering in range(1, rng.randint(1, 4)):
+            region = rng.choice(_REGIONS)
+            akas.append((tconst, ordering, f"{name} ({region})", region, None,
+                         None, None, 0))
+
+    people, professions = [], []
+    nconsts = [f"{NCONST_PREFIX}{i:07d}" for i in range(n_people)]
+    for nconst in nconsts:
+        birth = rng.randint(1900, 2005) if rng.random() < 0.7 else None
+        death = birth + rng.randint(40, 95) if birth and birth < 1950 and rng.random() < 0.5 else None
+        people.append((nconst, f"{rng.choice(_FIRST)} {rng.choice(_LAST)}", birth,
+                       death if death and death <= 2025 else None))
+        for pid in rng.sample(profession_ids, min(rng.randint(1, 2), len(profession_ids))):
+            professions.append((nconst, pid))
+
+    principals, known = [], set()
+    for tconst in tconsts:
+        for ordering in range(1, rng.randint(3, 8) + 1):
+            nconst = rng.choice(nconsts)
+            category = rng.choice(_CATEGORIES)
+            character = f"{rng.choice(_FIRST)}" if category in ("actor", "actress") else None
+            principals.append((tconst, ordering, nconst, category, None, character))
+            if rng.random() < 0.3:
+                known.add((nconst, tconst))
+
+    _insert(conn, """
+        INSERT INTO title (tconst, titleType, primaryTitle, originalTitle, isAdult,
+                           startYear, endYear, runtimeMinutes, averageRating, numVotes)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+    """, titles, chunk)
+    _insert(conn, "INSERT INTO hasgenre (tconst, genreID) VALUES (%s, %s)", genres, chunk)
+    _insert(conn, """
+        INSERT INTO titleakas (titleId, ordering, title, region, language, types,
+                               attributes, isOriginalTitle)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+    """, akas, chunk)
+    _insert(conn, """
+        INSERT INTO person (nconst, primaryName, birthYear, deathYear)
+        VALUES (%s, %s, %s, %s)
+    """, people, chunk)
+    _insert(conn, "INSERT INTO hasprofession (nconst, professionID) VALUES (%s, %s)",
+            professions, chunk)
+    _insert(conn, """
+        INSERT INTO hasprincipal (tconst, ordering, nconst, category, job, characterName)
+        VALUES (%s, %s, %s, %s, %s, %s)
+    """, principals, chunk)
+    _insert(conn, "INSERT INTO knownfor (nconst, tconst) VALUES (%s, %s)",
+            sorted(known), chunk)
+
+    # one hash for everyone: hashing is deliberately slow
+    pw_hash = hash_password(BENCH_PASSWORD)
+    users = [
+        (f"{USER_PREFIX}{i}", f"{USER_PREFIX}{i}@bench.local", pw_hash, f"Bench User {i}")
+        for i in range(scale["users"])
+    ]
+    _insert(conn, """
+        INSERT INTO users (username, email, password_hash, display_name)
+        VALUES (%s, %s, %s, %s)
+    """, users, chunk)
+    cur = conn.cursor()
+    cur.execute("SELECT user_id, username FROM users WHERE username LIKE %s",
+                (USER_PREFIX + "%",))
+    user_rows = cur.fetchall()
+    cur.close()
+
+    print(f"mysql: {len(titles)} titles, {len(people)} people, "
+          f"{len(principals)} principals, {len(akas)} akas, {len(users)} users")
+    return tconsts, user_rows
+
+
+def seed_mongo(rng, scale, tconsts, user_rows):
+    chunk = scale["chunk_size"]
+    now = datetime.utcnow()
+    # a few titles get most of the reviews, like real traffic
+    hot = tconsts[: max(len(tconsts) // 50, 1)]
+
+    reviews, watchlists, logs = [], [], []
+    for user_id, username in user_rows:
+        n = min(scale["reviews_per_user"], len(tconsts))
+        picked = set()
+        while len(picked) < n:
+            picked.add(rng.choice(hot) if rng.random() < 0.5 else rng.choice(tconsts))
+        for tconst in picked:
+            created = now - timedelta(minutes=rng.randint(0, 60 * 24 * 365))
+            reviews.append({
+                "tconst": tconst,
+                "user_id": user_id,
+                "username": username,
+                "stars": rng.randint(1, 10),
+                "text": " ".join(rng.choice(_WORDS) for _ in range(rng.randint(8, 80))),
+                "spoiler": rng.random() < 0.1,
+                "tags": rng.sample(_WORDS, rng.randint(0, 3)),
+                "created_at": created,
+                "updated_at": created,
+            })
+        items = rng.sample(tconsts, min(scale["watchlist_items"], len(tconsts)))
+        watchlists.append({
+            "user_id": user_id,
+            "created_at": now,
+            "items": [{"tconst": t, "added_at": now, "note": None} for t in items],
+        })
+
+    user_ids = [u[0] for u in user_rows]
+    queries = [f"{rng.choice(_ADJECTIVES)} {rng.choice(_NOUNS)}".lower() for _ in range(200)]
+    for _ in range(scale["search_logs"]):
+        # skewed towards the first queries so trending has a clear top
+        q = queries[min(int(rng.expovariate(1 / 15)), len(queries) - 1)]
+        logs.append({
+            "user_id": rng.choice(user_ids),
+            "q": q,
+            "ts": now - timedelta(seconds=rng.randint(0, 7 * 24 * 3600)),
+        })
+
+    for col, docs in ((reviews_col, reviews), (watchlists_col, watchlists), (logs_col, logs)):
+        for i in range(0, len(docs), chunk):
+            col.insert_many(docs[i:i + chunk], ordered=False)
+    for i in range(0, len(logs), chunk):
+        trending.record_many((d["q"], d["ts"]) for d in logs[i:i + chunk])
+
+    print(f"mongo: {len(reviews)} reviews, {len(watchlists)} watchlists, "
+          f"{len(logs)} search logs")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    for key, value in SCALE_DEFAULTS.items():
+        parser.add_argument(f"--{key.replace('_', '-')}", type=type(value), default=value)
+    parser.add_argument("--seed", type=int, default=2003)
+    parser.add_argument("--reset", action="store_true",
+                        help="delete earlier bench rows before seeding")
+    args = parser.parse_args()
+    scale = {key: getattr(args, key) for key in SCALE_DEFAULTS}
+    rng = random.Random(args.seed)
+
+    started = time.monotonic()
+    conn = get_connection()
+    try:
+        if args.reset:
+            reset(conn)
+        tconsts, user_rows = seed_mysql(conn, rng, scale)
+    finally:
+        conn.close()
+    seed_mongo(rng, scale, tconsts, user_rows)
+
+    review_stats.ensure_indexes()
+    trending.ensure_indexes()
+    review_stats.rebuild()
+    genre_stats.rebuild_all()
+    print(f"seeded in {time.monotonic() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+# cache.py
+"""
+Response cache for read-heavy GET endpoints.
+
+    @app.route("/api/genres")
+    @cached(ttl=3600, tags=lambda: ["genres"])
+    def get_genres(): ...
+
+    invalidate_tags("reviews:tt0000001")   # after a write
+
+Keys are built from the request path plus normalized query args (sorted, blank
+values dropped), so ?a=1&b=2 and ?b=2&a=1 share an entry.
+
+Tag invalidation uses version counters instead of tracking every key per tag:
+each entry remembers the version of its tags when it was stored, and
+invalidate_tags() just bumps the version, so stale entries miss on their next
+read and get evicted by LRU/TTL. That works the same for the in-process
+backend and for a shared one (e.g. Redis) used by several workers.
+"""
+import hashlib
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import request, make_response
+
+CACHE_CONFIG = {
+    "enabled": True,
+    "max_entries": 2048,
+    "max_bytes": 64 * 1024 * 1024,
+    "default_ttl": 60,
+}
+
+
+class LRUBackend:
+    """In-process LRU with per-entry TTL and entry/byte caps."""
+
+    def __init__(self, max_entries=2048, max_bytes=64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._data = OrderedDict()   # key -> (expires_at, size, value)
+        self._bytes = 0
+        self._tag_versions = {}
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires_at, size, value = item
+            if expires_at and expires_at < time.monotonic():
+                del self._data[key]
+                self._bytes -= size
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None, size=1):
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._data[key] = (expires_at, size, value)
+            self._bytes += size
+            while self._data and (
+                len(self._data) > self.max_entries or self._bytes > self.max_bytes
+            ):
+                _, (_, old_size, _) = self._data.popitem(last=False)
+                self._bytes -= old_size
+                self.evictions += 1
+
+    def tag_version(self, tag):
+        return self._tag_versions.get(tag, 0)
+
+    def bump_tag(self, tag):
+        # kept outside the LRU: an evicted counter would resurrect stale entries
+        with self._lock:
+            self._tag_versions[tag] = self._tag_versions.get(tag, 0) + 1
+
+    def delete(self, key):
+        with self._lock:
+            item = self._data.pop(key, None)
+            if item is not None:
+                self._bytes -= item[1]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._data),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "evictions": self.evictions,
+            }
+
+
+class SharedBackend:
+    """Adapter for a shared key/value store with a redis-py style client
+    (get / set(ex=) / incr / delete). Values are pickled; tag versions are
+    plain counters so every worker sees the same invalidations.
+
+        import redis
+        configure_cache(SharedBackend(redis.Redis(), prefix="inf2003:"))
+    """
+
+    def __init__(self, client, prefix="cache:"):
+        self.client = client
+        self.prefix = prefix
+
+    def get(self, key):
+        raw = self.client.get(self.prefix + key)
+        return pickle.loads(raw) if raw is not None else None
+
+    def set(self, key, value, ttl=None, size=1):
+        self.client.set(self.prefix + key, pickle.dumps(value), ex=ttl or None)
+
+    def tag_version(self, tag):
+        return int(self.client.get(f"{self.prefix}tag:{tag}") or 0)
+
+    def bump_tag(self, tag):
+        self.client.incr(f"{self.prefix}tag:{tag}")
+
+    def delete(self, key):
+        self.client.delete(self.prefix + key)
+
+    def clear(self):
+        for key in self.client.scan_iter(self.prefix + "*"):
+            self.client.delete(key)
+
+    def stats(self):
+        return {"backend": "shared"}
+
+
+_backend = LRUBackend(CACHE_CONFIG["max_entries"], CACHE_CONFIG["max_bytes"])
+_stats_lock = threading.Lock()
+_stats = {}   # route name -> {"hits": n, "misses": n}
+
+
+def compute_etag(body):
+    """Strong validator for a response body (see http_opt.py)."""
+    return hashlib.blake2b(body, digest_size=16).hexdigest()
+
+
+def configure_cache(backend):
+    """Swap the cache backend (e.g. a SharedBackend)."""
+    global _backend
+    _backend = backend
+
+
+def _count(name, field):
+    with _stats_lock:
+        route = _stats.setdefault(name, {"hits": 0, "misses": 0})
+        route[field] += 1
+
+
+def invalidate_tags(*tags):
+    """Invalidate every cached response carrying any of these tags."""
+    for tag in tags:
+        _backend.bump_tag(tag)
+
+
+def cache_key(name):
+    args = sorted(
+        (k, v.strip())
+        for k, values in request.args.lists()
+        for v in values
+        if v.strip()
+    )
+    query = "&".join(f"{k}={v}" for k, v in args)
+    return f"resp:{name}:{request.path}?{query}"
+
+
+def cached(ttl=None, tags=None):
+    """Cache a GET view's 200 responses.
+
+    tags: optional callable receiving the view's kwargs and returning the
+    list of tags for the entry, e.g. lambda tconst: [f"title:{tconst}"].
+    """
+    def decorator(view):
+        name = view.__name__
+
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if not CACHE_CONFIG["enabled"] or request.method != "GET":
+                return view(*args, **kwargs)
+
+            key = cache_key(name)
+            entry_tags = list(tags(**kwargs)) if tags else []
+            versions = [_backend.tag_version(t) for t in entry_tags]
+
+            entry = _backend.get(key)
+            if entry is not None and entry["versions"] == versions:
+                _count(name, "hits")
+                resp = make_response(entry["body"], entry["status"])
+                resp.mimetype = entry["mimetype"]
+                resp.set_etag(entry["etag"])
+                resp.headers["X-Cache"] = "HIT"
+                return resp
+
+            _count(name, "misses")
+            resp = make_response(view(*args, **kwargs))
+            if resp.status_code == 200 and not resp.is_streamed:
+                body = resp.get_data()
+                etag = compute_etag(body)
+                resp.set_etag(etag)
+                _backend.set(
+                    key,
+                    {
+                        "body": body,
+                        "status": resp.status_code,
+                        "mimetype": resp.mimetype,
+                        "etag": etag,
+                        "versions": versions,
+                    },
+                    ttl=ttl or CACHE_CONFIG["default_ttl"],
+                    size=len(body),
+                )
+            resp.headers["X-Cache"] = "MISS"
+            return resp
+
+        return wrapper
+    return decorator
+
+
+def cache_stats():
+    with _stats_lock:
+        routes = {k: dict(v) for k, v in _stats.items()}
+    hits = sum(r["hits"] for r in routes.values())
+    misses = sum(r["misses"] for r in routes.values())
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_ratio": round(hits / (hits + misses), 4) if hits + misses else None,
+        "routes": routes,
+        "backend": _backend.stats(),
+    }
@@ -0,0 +1,260 @@
+# catalog.py
+"""
+In-memory columnar copy of the `title` columns /api/movies filters on.
+
+When NumPy is installed, the catalog loads tconst, startYear, averageRating,
+numVotes, titleType and genre_mask for every title into NumPy arrays, already
+permuted into the list order (startYear DESC NULLS LAST, primaryTitle,
+tconst; one np.lexsort at build time). A filter is then a few vectorized
+comparisons producing a boolean mask. The first set positions are the page
+in display order, so nothing is sorted per request. Only that page is
+hydrated, from the title-card cache or one batched SQL lookup (titles.py).
+
+    CATALOG_CONFIG["enabled"]           turn the fast path off
+    CATALOG_CONFIG["refresh_interval"]  seconds between background rebuilds
+
+Like the search index (search.py), it is built in a background thread on
+first use. It is swapped in whole when a rebuild finishes, and until then
+query() returns None and callers use the SQL path. Titles are only written
+by imdb_import.py, in its own process, so there is nothing to invalidate
+here: filters run against data up to refresh_interval seconds old, while the
+hydrated cards themselves come from the card cache / SQL.
+
+NumPy is an optional dependency and isn't in requirements.txt. Without it
+the catalog stays disabled and /api/movies uses the SQL path, which is the
+supported baseline; the catalog only makes the same answers faster.
+"""
+import logging
+import threading
+import time
+
+from db import get_connection
+from search import normalize
+from titles import get_title_cards
+
+try:
+    import numpy as np
+except ImportError:  # optional dependency
+    np = None
+
+log = logging.getLogger(__name__)
+
+CATALOG_CONFIG = {
+    "enabled": True,
+    "refresh_interval": 300,   # seconds between background rebuilds
+    "chunk_size": 100000,      # titles loaded per round-trip while building
+}
+
+_NO_YEAR = -1
+
+
+def _clamp_year(value):
+    # years are int16; keep odd query values from overflowing the comparison
+    return max(-32768, min(32767, value))
+
+
+class TitleCatalog:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cols = None          # dict of arrays, position == list order
+        self._building = False
+        self._last_refresh = 0.0   # monotonic time of the last build attempt
+        self._stats = {"rows": 0, "build_seconds": None, "built_at": None, "queries": 0}
+
+    @property
+    def ready(self):
+        return self._cols is not None
+
+    # ---------- building ----------
+
+    def _load(self):
+        """All title rows, fetched in tconst order in chunks."""
+        rows = []
+        last = ""
+        chunk = CATALOG_CONFIG["chunk_size"]
+        conn = get_connection()
+        try:
+            cur = conn.cursor()
+            while True:
+                cur.execute(
+                    """
+                    SELECT tconst, titleType, primaryTitle, startYear,
+                           averageRating, numVotes, genre_mask
+                    FROM Title
+                    WHERE tconst > %s
+                    ORDER BY tconst
+                    LIMIT %s
+                    """,
+                    [last, chunk],
+                )
+                batch = cur.fetchall()
+                rows.extend(batch)
+                if len(batch) < chunk:
+                    break
+                last = batch[-1][0]
+            cur.close()
+        finally:
+            conn.close()
+        return rows
+
+    def build(self):
+        started = time.monotonic()
+        rows = self._load()
+        n = len(rows)
+
+        tconst = np.array([r[0] for r in rows], dtype="S12")
+        year = np.array([_NO_YEAR if r[3] is None else r[3] for r in rows], dtype=np.int16)
+        types = sorted({r[1] for r in rows})
+        type_code = {t: i for i, t in enumerate(types)}
+
+        # primaryTitle rank, folded like the ai_ci collation (rows are already
+        # in tconst order, so the row number doubles as the tconst tiebreak)
+        title_keys = [normalize(r[2]) for r in rows]
+        title_rank = np.empty(n, dtype=np.int32)
+        title_rank[sorted(range(n), key=title_keys.__getitem__)] = np.arange(n, dtype=np.int32)
+        del title_keys
+
+        # lexsort: last key is primary. startYear DESC with NULL last -> sort
+        # on -year, NULL mapped above every real year.
+        year_key = np.where(year == _NO_YEAR, np.int32(1 << 20), -year.astype(np.int32))
+        order = np.lexsort((np.arange(n), title_rank, year_key))
+        del title_rank, year_key
+
+        cols = {
+            "tconst": tconst[order],
+            "year": year[order],
+            "rating": np.array(
+                [np.nan if r[4] is None else r[4] for r in rows], dtype=np.float64
+            )[order],
+            "votes": np.array([r[5] or 0 for r in rows], dtype=np.int32)[order],
+            "type": np.array([type_code[r[1]] for r in rows], dtype=np.uint8)[order],
+            "genre_mask": np.array([r[6] or 0 for r in rows], dtype=np.uint64)[order],
+            "type_names": np.array(types),
+        }
+        del rows
+        # tconst -> position lookup without a dict: sorted copy + searchsorted
+        by_tconst = np.argsort(cols["tconst"]).astype(np.int32)
+        cols["by_tconst"] = by_tconst
+        cols["tconst_sorted"] = cols["tconst"][by_tconst]
+
+        with self._lock:
+            self._cols = cols
+            self._stats["rows"] = n
+            self._stats["build_seconds"] = round(time.monotonic() - started, 2)
+            self._stats["built_at"] = time.time()
+
+    def _run_in_background(self):
+        def runner():
+            try:
+                self.build()
+            except Exception:  # keep serving from SQL if the build fails
+                log.exception("catalog build failed")
+            finally:
+                self._building = False
+
+        self._building = True
+        self._last_refresh = time.monotonic()  # also throttles retries after a failure
+        threading.Thread(target=runner, name="title-catalog", daemon=True).start()
+
+    def ensure_fresh(self):
+        """Kick off a (re)build in the background if one is due."""
+        if np is None or not CATALOG_CONFIG["enabled"] or self._building:
+            return
+        due = time.monotonic() - self._last_refresh > CATALOG_CONFIG["refresh_interval"]
+        if due or self._last_refresh == 0.0:
+            self._run_in_background()
+
+    # ---------- querying ----------
+
+    def _position(self, cols, tconst):
+        key = np.array(tconst, dtype="S12")
+        i = int(np.searchsorted(cols["tconst_sorted"], key))
+        if i < len(cols["tconst_sorted"]) and cols["tconst_sorted"][i] == key:
+            return int(cols["by_tconst"][i])
+        return None
+
+    def query(self, genre_bit=None, year_start=None, year_end=None, min_rating=None,
+              title_type=None, tconsts=None, after=None, limit=200):
+        """tconsts of the first `limit` matches in list order, or None if the
+        catalog can't answer (not built, or the cursor title is unknown).
+
+        tconsts - restrict to this set (e.g. search.py candidates)
+        after   - tconst of the last row of the previous page
+        """
+        self.ensure_fresh()
+        cols = self._cols
+        if cols is None:
+            return None
+
+        mask = np.ones(len(cols["tconst"]), dtype=bool)
+        if genre_bit is not None:
+            mask &= (cols["genre_mask"] & np.uint64(genre_bit)) != 0
+        if year_start is not None or year_end is not None:
+            year = cols["year"]
+            mask &= year != _NO_YEAR
+            if year_start is not None:
+                mask &= year >= _clamp_year(year_start)
+            if year_end is not None:
+                mask &= year <= _clamp_year(year_end)
+        if min_rating is not None:
+            # float64 like MySQL's FLOAT-vs-double comparison; NaN (NULL) is False
+            mask &= cols["rating"] >= np.float64(min_rating)
+        if title_type is not None:
+            codes = np.flatnonzero(cols["type_names"] == title_type)
+            if not len(codes):
+                return []
+            mask &= cols["type"] == codes[0]
+        if tconsts is not None:
+            keep = np.zeros_like(mask)
+            for t in tconsts:
+                pos = self._position(cols, t)
+                if pos is not None:
+                    keep[pos] = True
+            mask &= keep
+
+        start = 0
+        if after is not None:
+            pos = self._position(cols, after)
+            if pos is None:
+                return None
+            start = pos + 1
+
+        hits = np.flatnonzero(mask[start:])[:limit] + start
+        with self._lock:
+            self._stats["queries"] += 1
+        return [t.decode() for t in cols["tconst"][hits]]
+
+    def page(self, limit, after=None, **filters):
+        """Like query(), but hydrated into title cards (list order kept).
+
+        Returns (cards, more), or None if the catalog can't answer. `more` says
+        whether candidates follow the last card. A candidate without a card
+        (deleted since the last build) is skipped and the next ones are
+        fetched, so a gap doesn't end paging early.
+        """
+        cards = []
+        while True:
+            want = limit - len(cards)
+            tconsts = self.query(limit=want + 1, after=after, **filters)
+            if tconsts is None:
+                return None
+            found = get_title_cards(tconsts[:want])
+            cards += [found[t] for t in tconsts[:want] if t in found]
+            more = len(tconsts) > want
+            if not more or len(cards) >= limit:
+                return cards, more
+            after = tconsts[want - 1]
+
+    def stats(self):
+        cols = self._cols
+        with self._lock:
+            out = dict(self._stats)
+        out["available"] = np is not None
+        out["ready"] = cols is not None
+        out["building"] = self._building
+        out["memory_bytes"] = sum(a.nbytes for a in cols.values()) if cols else 0
+        out["columns"] = {k: a.nbytes for k, a in cols.items()} if cols else {}
+        return out
+
+
+title_catalog = TitleCatalog()
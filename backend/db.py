@@ -1,18 +1,383 @@
 # db.py
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 import mysql.connector
 from mysql.connector import Error
 
+from metrics import METRICS_CONFIG, record_rows, record_slow_query, record_sql
+
 DB_CONFIG = {
     "host": "localhost",
-    "user": "root",         
+    "user": "root",
     "password": "12345678",
     "database": "project2",
 }
 
+# Connection pool settings.
+#   size          - connections kept open in the pool
+#   max_overflow  - extra connections allowed under burst load (closed on release)
+#   timeout       - seconds to wait for a free connection before giving up
+#   pre_ping      - check a connection is still alive when it is checked out
+#   max_lifetime  - seconds before a pooled connection is recycled
+POOL_CONFIG = {
+    "size": 10,
+    "max_overflow": 10,
+    "timeout": 10,
+    "pre_ping": True,
+    "max_lifetime": 1800,
+}
+
+
+class PoolTimeout(Error):
+    """Raised when no connection becomes free within POOL_CONFIG['timeout']."""
+
+
+class TimedCursor:
+    """Cursor proxy that reports statement time and fetched rows to metrics.py
+    and sends statements over METRICS_CONFIG["slow_query_ms"] to the slow log.
+    """
+
+    def __init__(self, raw):
+        self._raw = raw
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def _timed(self, method, operation, params, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return method(operation, params, *args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - started
+            record_sql(elapsed)
+            slow_ms = METRICS_CONFIG["slow_query_ms"]
+            if slow_ms is not None and elapsed * 1000 >= slow_ms:
+                _log_slow_query(operation, params, elapsed)
+
+    def execute(self, operation, params=None, *args, **kwargs):
+        return self._timed(self._raw.execute, operation, params, *args, **kwargs)
+
+    def executemany(self, operation, seq_params, *args, **kwargs):
+        return self._timed(self._raw.executemany, operation, seq_params, *args, **kwargs)
+
+    def fetchone(self):
+        row = self._raw.fetchone()
+        if row is not None:
+            record_rows(1)
+        return row
+
+    def fetchmany(self, *args, **kwargs):
+        rows = self._raw.fetchmany(*args, **kwargs)
+        record_rows(len(rows))
+        return rows
+
+    def fetchall(self):
+        rows = self._raw.fetchall()
+        record_rows(len(rows))
+        return rows
+
+    def __iter__(self):
+        return iter(self.fetchone, None)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._raw.close()
+
+
+# EXPLAIN for slow statements runs on its own thread and connection, so the
+# request that was slow doesn't also pay for the plan.
+_explain_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="slow-query-explain")
+_explain_pending = 0
+_explain_lock = threading.Lock()
+
+
+def _explain(sql, params):
+    conn = get_pool().get()
+    try:
+        cur = conn._raw.cursor(dictionary=True)  # raw cursor: not timed itself
+        try:
+            cur.execute("EXPLAIN " + sql, params or [])
+            return cur.fetchall()
+        finally:
+            cur.close()
+    finally:
+        conn.close()
+
+
+def _log_slow_query(sql, params, elapsed):
+    global _explain_pending
+    entry = {
+        # statement text only; params may hold user data (e.g. password hashes)
+        "sql": " ".join(str(sql).split()),
+        "ms": round(elapsed * 1000, 1),
+        "at": time.time(),
+        "explain": None,
+    }
+    if not (METRICS_CONFIG["explain"] and entry["sql"][:6].upper() == "SELECT"):
+        record_slow_query(entry)
+        return
+
+    with _explain_lock:
+        if _explain_pending >= METRICS_CONFIG["slow_log_size"]:
+            record_slow_query(entry)
+            return
+        _explain_pending += 1
+
+    def run():
+        global _explain_pending
+        try:
+            entry["explain"] = _explain(sql, params)
+        except Exception as e:
+            entry["explain"] = {"error": str(e)}
+        finally:
+            with _explain_lock:
+                _explain_pending -= 1
+            record_slow_query(entry)
+
+    _explain_pool.submit(run)
+
+
+class PooledConnection:
+    """Wraps a mysql.connector connection so close() hands it back to the pool.
+
+    Everything else (cursor, commit, rollback, lastrowid...) is passed through,
+    so existing code that does get_connection() ... conn.close() keeps working.
+    Every checkout gets a fresh wrapper, and close() / discard() detach it
+    from the connection. A second close() is therefore a no-op and can't put
+    the connection in the pool twice.
+    """
+
+    def __init__(self, pool, raw, created_at, overflow=False):
+        self._pool = pool
+        self._raw = raw
+        self._created_at = created_at
+        self._overflow = overflow
+        self._checked_out_at = None
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def cursor(self, *args, **kwargs):
+        return TimedCursor(self._raw.cursor(*args, **kwargs))
+
+    def close(self):
+        if self._raw is None:
+            return
+        self._pool._release(self)
+
+    def discard(self):
+        """Close the connection instead of pooling it, e.g. after abandoning
+        an unbuffered result that would otherwise have to be read to the end."""
+        if self._raw is None:
+            return
+        self._pool._discard(self)
+
+    # allow `with get_connection() as conn:`
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class ConnectionPool:
+    """Small thread-safe MySQL connection pool with overflow and recycling."""
+
+    def __init__(self, db_config, size=10, max_overflow=10, timeout=10,
+                 pre_ping=True, max_lifetime=1800):
+        self.db_config = db_config
+        self.size = size
+        self.max_overflow = max_overflow
+        self.timeout = timeout
+        self.pre_ping = pre_ping
+        self.max_lifetime = max_lifetime
+
+        self._idle = []         # (raw, created_at) stack, most recently used last
+        self._lock = threading.Lock()
+        # notified whenever a connection is returned or a slot frees up, so a
+        # waiting get() can take it or open a new connection
+        self._available = threading.Condition(self._lock)
+        self._open = 0          # connections currently alive (idle + in use)
+        self._overflow = 0      # of which are overflow connections
+
+        self._stats = {
+            "checkouts": 0,
+            "timeouts": 0,
+            "created": 0,
+            "recycled": 0,
+            "ping_failures": 0,
+            "wait_seconds_total": 0.0,
+            "wait_seconds_max": 0.0,
+            "checkout_seconds_total": 0.0,
+            "checkout_seconds_max": 0.0,
+        }
+
+    # ---- internal helpers ----
+
+    def _connect(self, overflow):
+        raw = mysql.connector.connect(**self.db_config)
+        with self._lock:
+            self._stats["created"] += 1
+        return PooledConnection(self, raw, time.monotonic(), overflow)
+
+    def _discard(self, conn):
+        try:
+            conn._raw.close()
+        except Error:
+            pass
+        conn._raw = None
+        self._unreserve_slot(conn._overflow)
+
+    def _reserve_slot(self):
+        """Reserve room for a brand-new connection (caller holds _lock).
+        Returns (ok, overflow)."""
+        if self._open < self.size:
+            self._open += 1
+            return True, False
+        if self._overflow < self.max_overflow:
+            self._open += 1
+            self._overflow += 1
+            return True, True
+        return False, False
+
+    def _unreserve_slot(self, overflow):
+        with self._available:
+            self._open -= 1
+            if overflow:
+                self._overflow -= 1
+            self._available.notify()
+
+    def _is_usable(self, conn):
+        if self.max_lifetime and time.monotonic() - conn._created_at > self.max_lifetime:
+            with self._lock:
+                self._stats["recycled"] += 1
+            return False
+        if self.pre_ping:
+            try:
+                conn._raw.ping(reconnect=False)
+            except Error:
+                with self._lock:
+                    self._stats["ping_failures"] += 1
+                return False
+        return True
+
+    # ---- public API ----
+
+    def get(self):
+        """Check a connection out of the pool (blocking up to `timeout`)."""
+        started = time.monotonic()
+        deadline = started + self.timeout
+        conn = None
+
+        while conn is None:
+            with self._available:
+                while True:
+                    if self._idle:
+                        raw, created_at = self._idle.pop()
+                        new = overflow = False
+                        break
+                    ok, overflow = self._reserve_slot()
+                    if ok:
+                        new = True
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats["timeouts"] += 1
+                        raise PoolTimeout(msg="timed out waiting for a DB connection")
+                    self._available.wait(remaining)
+
+            if new:
+                try:
+                    conn = self._connect(overflow)
+                except Exception:
+                    self._unreserve_slot(overflow)
+                    raise
+                break
+            # fresh wrapper per checkout: old wrappers stay detached
+            conn = PooledConnection(self, raw, created_at)
+            if not self._is_usable(conn):
+                self._discard(conn)
+                conn = None
+
+        waited = time.monotonic() - started
+        conn._checked_out_at = time.monotonic()
+        with self._lock:
+            self._stats["checkouts"] += 1
+            self._stats["wait_seconds_total"] += waited
+            self._stats["wait_seconds_max"] = max(self._stats["wait_seconds_max"], waited)
+        return conn
+
+    def _release(self, conn):
+        held = time.monotonic() - (conn._checked_out_at or time.monotonic())
+        with self._lock:
+            self._stats["checkout_seconds_total"] += held
+            self._stats["checkout_seconds_max"] = max(self._stats["checkout_seconds_max"], held)
+
+        if conn._overflow:
+            self._discard(conn)
+            return
+
+        # End any implicit transaction so the next user doesn't see a stale
+        # REPEATABLE READ snapshot or inherit half-done writes.
+        try:
+            conn._raw.rollback()
+        except Error:
+            self._discard(conn)
+            return
+
+        with self._available:
+            if len(self._idle) < self.size:
+                self._idle.append((conn._raw, conn._created_at))
+                conn._raw = None
+                self._available.notify()
+                return
+        self._discard(conn)
+
+    def stats(self):
+        """Snapshot of pool counters (used by the metrics endpoint)."""
+        with self._lock:
+            out = dict(self._stats)
+            out["open"] = self._open
+            out["overflow"] = self._overflow
+            out["idle"] = len(self._idle)
+        out["in_use"] = out["open"] - out["idle"]
+        out["size"] = self.size
+        out["max_overflow"] = self.max_overflow
+        return out
+
+    def dispose(self):
+        """Close every idle connection (e.g. on shutdown or in scripts)."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for raw, created_at in idle:
+            self._discard(PooledConnection(self, raw, created_at))
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Return the shared pool, creating it on first use."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(DB_CONFIG, **POOL_CONFIG)
+    return _pool
+
 
 def get_connection():
-    """Create a new DB connection."""
-    return mysql.connector.connect(**DB_CONFIG)
+    """Check out a pooled DB connection. Call conn.close() to give it back."""
+    return get_pool().get()
+
+
+def pool_stats():
+    return get_pool().stats()
 
 
 def query_all(sql, params=None):
@@ -29,3 +394,24 @@ def query_all(sql, params=None):
             cur.close()
         if conn:
             conn.close()
+
+
+def query_many(statements):
+    """Run several SELECTs over one pooled connection.
+
+    statements: list of (sql, params). Returns a list of row lists (dicts),
+    in the same order. One checkout instead of one per query.
+    """
+    conn = get_connection()
+    try:
+        results = []
+        cur = conn.cursor(dictionary=True)
+        try:
+            for sql, params in statements:
+                cur.execute(sql, params or [])
+                results.append(cur.fetchall())
+        finally:
+            cur.close()
+        return results
+    finally:
+        conn.close()
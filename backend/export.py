@@ -0,0 +1,226 @@
+# export.py
+"""
+Streaming bulk export: GET /api/export/<kind> for titles, people, reviews
+and search_logs.
+
+The list endpoints build a whole page with fetchall() + jsonify, which is
+fine for their LIMIT 200 pages but not for a full dump. Exports stream
+instead:
+  - MySQL rows come from an unbuffered cursor (mysql-connector's default), read
+    EXPORT_CONFIG["batch_size"] rows at a time with fetchmany(), so the
+    server sends rows as we consume them.
+  - Mongo documents come from a find() cursor with batch_size() set,
+    read with the "export" read profile (secondaries when there are any).
+    The cursor has no maxTimeMS: that limit covers the whole cursor, so it
+    would cut off a long export with a half-written body. The server's
+    idle-cursor timeout (10 min between batches) still applies.
+  - Each batch is serialized and yielded as one chunk of a generator
+    response. Memory stays at one batch whether the export has 1k or 10M
+    rows. http_opt and the response cache skip streamed responses.
+
+    format - ndjson (default, one JSON object per line) or json (one array)
+    limit  - optional cap on the number of rows
+
+An export holds one pooled MySQL connection (or a Mongo cursor) for as long
+as the client keeps reading. If the client disconnects mid-way, the
+connection is discarded rather than drained (see PooledConnection.discard).
+Exports include review texts and users' searches, so they always need an
+admin token, even when TOKEN_CONFIG["enforce"] is switched off.
+"""
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+from bson import ObjectId
+from flask import Blueprint, Response, jsonify, request, stream_with_context
+
+from db import get_connection
+from genres import decode_mask
+from mongo import logs_col, reading, reviews_col
+from nosql import clean_review
+from tokens import require_admin
+
+export_bp = Blueprint("export", __name__)
+
+EXPORT_CONFIG = {
+    "batch_size": 1000,          # rows per fetchmany() / Mongo batch / response chunk
+    "net_write_timeout": 600,    # seconds MySQL waits on a slow reader before aborting
+}
+
+_FORMATS = {"ndjson": "application/x-ndjson", "json": "application/json"}
+
+
+def _default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, ObjectId):
+        return str(value)
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def _dumps(row):
+    return json.dumps(row, default=_default, separators=(",", ":"), ensure_ascii=False)
+
+
+# ---------- row sources (generators of row batches) ----------
+
+def _sql_batches(sql, params):
+    conn = get_connection()
+    finished = False
+    try:
+        cur = conn.cursor(dictionary=True)
+        cur.execute("SET SESSION net_write_timeout = %s", (EXPORT_CONFIG["net_write_timeout"],))
+        cur.execute(sql, params)
+        while True:
+            rows = cur.fetchmany(EXPORT_CONFIG["batch_size"])
+            if not rows:
+                break
+            yield rows
+        cur.execute("SET SESSION net_write_timeout = DEFAULT")
+        cur.close()
+        finished = True
+    finally:
+        # a half-read unbuffered result can't go back to the pool
+        if finished:
+            conn.close()
+        else:
+            conn.discard()
+
+
+def _mongo_batches(cursor):
+    batch_size = EXPORT_CONFIG["batch_size"]
+    # no maxTimeMS: Mongo counts it across every getMore of the cursor, so
+    # any limit would cut a large export off mid-stream
+    cursor = cursor.batch_size(batch_size)
+    try:
+        batch = []
+        for doc in cursor:
+            batch.append(doc)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+    finally:
+        cursor.close()
+
+
+def _limit_sql(sql, params, limit):
+    if limit is not None:
+        sql += " LIMIT %s"
+        params = params + [limit]
+    return sql, params
+
+
+# ---------- kinds ----------
+
+def _titles(args, limit):
+    where, params = [], []
+    if args.get("year_start", type=int) is not None:
+        where.append("startYear >= %s")
+        params.append(args.get("year_start", type=int))
+    if args.get("year_end", type=int) is not None:
+        where.append("startYear <= %s")
+        params.append(args.get("year_end", type=int))
+    if args.get("type"):
+        where.append("titleType = %s")
+        params.append(args["type"])
+    sql = (
+        "SELECT tconst, titleType, primaryTitle, originalTitle, isAdult, startYear, "
+        "endYear, runtimeMinutes, averageRating, numVotes, genre_mask FROM title"
+        + (" WHERE " + " AND ".join(where) if where else "")
+        + " ORDER BY tconst"
+    )
+
+    def shape(r):
+        r["genres"] = decode_mask(r.pop("genre_mask"))
+        return r
+    return _sql_batches(*_limit_sql(sql, params, limit)), shape
+
+
+def _people(args, limit):
+    sql = "SELECT nconst, primaryName, birthYear, deathYear FROM person ORDER BY nconst"
+    return _sql_batches(*_limit_sql(sql, [], limit)), None
+
+
+def _reviews(args, limit):
+    query = {}
+    if args.get("tconst"):
+        query["tconst"] = args["tconst"]
+    if args.get("user_id", type=int) is not None:
+        query["user_id"] = args.get("user_id", type=int)
+    cursor = reading(reviews_col, "export").find(query).sort("_id", 1)
+    if limit is not None:
+        cursor = cursor.limit(limit)
+    return _mongo_batches(cursor), clean_review
+
+
+def _search_logs(args, limit):
+    query = {}
+    if args.get("user_id", type=int) is not None:
+        query["user_id"] = args.get("user_id", type=int)
+    if args.get("since"):
+        try:
+            query["ts"] = {"$gte": datetime.fromisoformat(args["since"])}
+        except ValueError:
+            raise ValueError("since must be an ISO date, e.g. 2025-01-31")
+    cursor = reading(logs_col, "export").find(query, {"_id": 0}).sort("_id", 1)
+    if limit is not None:
+        cursor = cursor.limit(limit)
+    return _mongo_batches(cursor), None
+
+
+EXPORTS = {
+    "titles": _titles,
+    "people": _people,
+    "reviews": _reviews,
+    "search_logs": _search_logs,
+}
+
+
+# ---------- endpoint ----------
+
+def _ndjson(batches, shape):
+    for batch in batches:
+        yield "".join(_dumps(shape(r) if shape else r) + "\n" for r in batch)
+
+
+def _json_array(batches, shape):
+    yield "["
+    first = True
+    for batch in batches:
+        chunk = ",\n".join(_dumps(shape(r) if shape else r) for r in batch)
+        yield chunk if first else ",\n" + chunk
+        first = False
+    yield "]\n"
+
+
+@export_bp.get("/api/export/<kind>")
+@require_admin(always=True)
+def export(kind):
+    """Stream every row of `kind` (see module docstring for params)."""
+    if kind not in EXPORTS:
+        return jsonify({"error": f"kind must be one of {', '.join(EXPORTS)}"}), 404
+    fmt = request.args.get("format", "ndjson")
+    if fmt not in _FORMATS:
+        return jsonify({"error": f"format must be one of {', '.join(_FORMATS)}"}), 400
+    limit = request.args.get("limit", type=int)
+    if limit is not None and limit < 1:
+        return jsonify({"error": "limit must be positive"}), 400
+
+    try:
+        batches, shape = EXPORTS[kind](request.args, limit)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    body = _ndjson(batches, shape) if fmt == "ndjson" else _json_array(batches, shape)
+    return Response(
+        stream_with_context(body),
+        mimetype=_FORMATS[fmt],
+        headers={
+            "Content-Disposition": f'attachment; filename="{kind}.{fmt}"',
+            "Cache-Control": "no-store",
+        },
+    )
@@ -0,0 +1,365 @@
+# filmography.py
+"""
+Person filmographies and frequent collaborators, served from the
+precomputed person <-> title tables of migrations/0004_person_adjacency.sql.
+
+person_title has one row per (person, title) with the categories and the
+title's year / rating. A filmography page is a range scan on
+(nconst, startYear DESC) or (nconst, averageRating DESC) with a keyset
+cursor. person_collab keeps each person's top collaborators with their shared
+title count, so /collaborators is a single index read. The co-occurrence
+count is only computed when a person is refreshed, from their own titles,
+never per request.
+
+Triggers flag a person in person_adjacency_state when their principals
+change, or when someone joins or leaves one of their titles. Like
+genre_stats.get_stats(), reads refresh a flagged person first (see
+ensure_fresh), so answers stay consistent without full rebuilds.
+
+rebuild_all() fills a shadow table and swaps it in with RENAME TABLE, so
+filmographies keep serving the old rows during an import instead of coming
+back empty. People refreshed or flagged while it runs are flagged again
+after the swap, so no refresh is lost with the old table. It ends by
+bumping the `people` cache tag, which every person endpoint carries next to
+`person:<nconst>`. Run from the CLI, that only reaches the API's cache
+through a shared cache backend (cache.py); otherwise entries expire by TTL.
+
+    python filmography.py            # rebuild person_title (e.g. after an import)
+    python filmography.py --dirty    # refresh only flagged people
+    python filmography.py --collab   # also precompute everyone's collaborators
+
+If the migration hasn't been applied, both queries fall back to plain SQL
+over hasprincipal / title.
+"""
+import logging
+import sys
+
+from mysql.connector import errorcode
+from mysql.connector.errors import ProgrammingError
+
+from cache import invalidate_tags
+from db import get_connection, query_all
+
+FILMOGRAPHY_CONFIG = {
+    "collab_keep": 200,       # collaborators stored per person
+    "rebuild_chunk": 20000,   # people per statement in rebuild_all()
+}
+
+# sort name -> person_title column; NULLs go last (DESC)
+FILMOGRAPHY_SORTS = {"year": "startYear", "rating": "averageRating"}
+
+log = logging.getLogger(__name__)
+
+_missing_tables = False   # set once migration 0004 turns out not to be applied
+
+
+def _no_such_table(e):
+    return isinstance(e, ProgrammingError) and e.errno == errorcode.ER_NO_SUCH_TABLE
+
+
+def _use_fallback():
+    """Switch to the hasprincipal queries for good, logging it once."""
+    global _missing_tables
+    if not _missing_tables:
+        _missing_tables = True
+        log.warning("person_title / person_collab missing (migration 0004), using hasprincipal")
+
+
+# ---------- maintenance ----------
+
+_PERSON_TITLE_SELECT = """
+    SELECT h.nconst, h.tconst,
+           GROUP_CONCAT(DISTINCT h.category ORDER BY h.category),
+           MAX(t.startYear), MAX(t.averageRating)
+    FROM hasprincipal h
+    JOIN title t ON t.tconst = h.tconst
+"""
+
+
+def refresh_person(nconst, conn=None):
+    """Recompute one person's person_title rows and collaborator counts."""
+    own_conn = conn is None
+    if own_conn:
+        conn = get_connection()
+    try:
+        cur = conn.cursor()
+        # clear the flag first: a change landing while we recompute flags
+        # the person again instead of being lost
+        cur.execute(
+            """
+            INSERT INTO person_adjacency_state (nconst, dirty) VALUES (%s, 0)
+            ON DUPLICATE KEY UPDATE dirty = 0
+            """,
+            (nconst,),
+        )
+        conn.commit()
+
+        cur.execute("DELETE FROM person_title WHERE nconst = %s", (nconst,))
+        cur.execute(
+            "INSERT IGNORE INTO person_title "
+            "(nconst, tconst, categories, startYear, averageRating)"
+            + _PERSON_TITLE_SELECT
+            + " WHERE h.nconst = %s GROUP BY h.nconst, h.tconst",
+            (nconst,),
+        )
+
+        # co-occurrence over this person's titles only: PK lookups on
+        # hasprincipal per title, so the other side needn't be fresh
+        cur.execute("DELETE FROM person_collab WHERE nconst = %s", (nconst,))
+        cur.execute(
+            """
+            INSERT IGNORE INTO person_collab (nconst, other_nconst, shared)
+            SELECT %s, h.nconst, COUNT(DISTINCT h.tconst) AS shared
+            FROM person_title pt
+            JOIN hasprincipal h ON h.tconst = pt.tconst
+            WHERE pt.nconst = %s AND h.nconst IS NOT NULL AND h.nconst <> %s
+            GROUP BY h.nconst
+            ORDER BY shared DESC, h.nconst
+            LIMIT %s
+            """,
+            (nconst, nconst, nconst, FILMOGRAPHY_CONFIG["collab_keep"]),
+        )
+        cur.execute(
+            "UPDATE person_adjacency_state SET collab_at = NOW() WHERE nconst = %s",
+            (nconst,),
+        )
+        conn.commit()
+        cur.close()
+    finally:
+        if own_conn:
+            conn.close()
+
+
+def ensure_fresh(nconst, need_collab=False):
+    """Refresh a person flagged by the triggers (or whose collaborators were
+    never built, when need_collab) before reading their rows."""
+    rows = query_all(
+        "SELECT dirty, collab_at FROM person_adjacency_state WHERE nconst = %s",
+        [nconst],
+    )
+    state = rows[0] if rows else None
+    if (state and state["dirty"]) or (need_collab and (not state or state["collab_at"] is None)):
+        refresh_person(nconst)
+
+
+def refresh_dirty():
+    """Recompute only the people flagged dirty by the triggers."""
+    rows = query_all("SELECT nconst FROM person_adjacency_state WHERE dirty = 1")
+    conn = get_connection()
+    try:
+        for r in rows:
+            refresh_person(r["nconst"], conn)
+    finally:
+        conn.close()
+    return len(rows)
+
+
+def rebuild_all(collab=False):
+    """Rebuild person_title from hasprincipal in nconst chunks into a shadow
+    table, then swap it in. Collaborators are rebuilt lazily on request, or
+    here for everyone when collab=True."""
+    conn = get_connection()
+    done = 0
+    try:
+        cur = conn.cursor()
+        # flags raised from here on survive and refresh those people on read
+        cur.execute("DELETE FROM person_collab")
+        cur.execute("DELETE FROM person_adjacency_state")
+        cur.execute("DROP TABLE IF EXISTS person_title_new, person_title_old")
+        # LIKE copies columns and indexes, not the foreign keys (added after the swap)
+        cur.execute("CREATE TABLE person_title_new LIKE person_title")
+        conn.commit()
+
+        last = ""
+        chunk = FILMOGRAPHY_CONFIG["rebuild_chunk"]
+        while True:
+            cur.execute(
+                "SELECT nconst FROM person WHERE nconst > %s ORDER BY nconst LIMIT %s",
+                (last, chunk),
+            )
+            nconsts = [r[0] for r in cur.fetchall()]
+            if not nconsts:
+                break
+            cur.execute(
+                "INSERT IGNORE INTO person_title_new "
+                "(nconst, tconst, categories, startYear, averageRating)"
+                + _PERSON_TITLE_SELECT
+                + " WHERE h.nconst BETWEEN %s AND %s GROUP BY h.nconst, h.tconst",
+                (nconsts[0], nconsts[-1]),
+            )
+            conn.commit()
+            done += len(nconsts)
+            last = nconsts[-1]
+
+        # atomic swap; the old table (and its FK names) goes, the FKs are
+        # re-added without re-checking rows that were just built from joins
+        cur.execute("SET SESSION foreign_key_checks = 0")
+        try:
+            cur.execute(
+                "RENAME TABLE person_title TO person_title_old, "
+                "person_title_new TO person_title"
+            )
+            cur.execute("DROP TABLE person_title_old")
+            cur.execute(
+                """
+                ALTER TABLE person_title
+                  ADD CONSTRAINT fk_pt_person FOREIGN KEY (nconst)
+                    REFERENCES person (nconst) ON DELETE CASCADE,
+                  ADD CONSTRAINT fk_pt_title FOREIGN KEY (tconst)
+                    REFERENCES title (tconst) ON DELETE CASCADE
+                """
+            )
+        finally:
+            # pooled connection: don't hand it back with checks disabled
+            cur.execute("SET SESSION foreign_key_checks = 1")
+
+        # every state row was created during the fill (the table was emptied
+        # first): those people were flagged by triggers or refreshed into
+        # the old person_title, which the swap just dropped. Recompute them
+        # on their next read.
+        cur.execute("UPDATE person_adjacency_state SET dirty = 1")
+        conn.commit()
+
+        if collab:
+            last = ""
+            while True:
+                cur.execute(
+                    "SELECT nconst FROM person WHERE nconst > %s ORDER BY nconst LIMIT %s",
+                    (last, chunk),
+                )
+                nconsts = [r[0] for r in cur.fetchall()]
+                if not nconsts:
+                    break
+                for nconst in nconsts:
+                    refresh_person(nconst, conn)
+                last = nconsts[-1]
+        cur.close()
+    finally:
+        conn.close()
+    invalidate_tags("people")
+    return done
+
+
+# ---------- queries ----------
+
+def _keyset(col, cursor):
+    """WHERE fragment for rows after `cursor` = [value, tconst] in
+    `col DESC (NULLs last), tconst` order."""
+    value, tconst = cursor
+    if value is None:
+        return f"({col} IS NULL AND pt.tconst > %s)", [tconst]
+    # ratings are FLOAT: compare against the same single-precision value
+    cast = "CAST(%s AS FLOAT)" if col == "averageRating" else "%s"
+    return (
+        f"({col} < {cast} OR {col} IS NULL OR ({col} = {cast} AND pt.tconst > %s))",
+        [value, value, tconst],
+    )
+
+
+def filmography(nconst, category=None, year_start=None, year_end=None,
+                sort="year", limit=50, cursor=None):
+    """One page of a person's titles.
+
+    Returns (rows, next_key): rows are dicts with tconst, categories,
+    startYear, averageRating in page order; next_key is the cursor for the
+    following page or None.
+    """
+    col = FILMOGRAPHY_SORTS[sort]
+
+    where, params = [], []
+    if category:
+        where.append("FIND_IN_SET(%s, categories)")
+        params.append(category)
+    if year_start is not None:
+        where.append("startYear >= %s")
+        params.append(year_start)
+    if year_end is not None:
+        where.append("startYear <= %s")
+        params.append(year_end)
+    if cursor:
+        cond, values = _keyset(col, cursor)
+        where.append(cond)
+        params += values
+    order = f"ORDER BY {col} DESC, pt.tconst LIMIT %s"
+
+    rows = None
+    if not _missing_tables:
+        sql = (
+            "SELECT pt.tconst, pt.categories, pt.startYear, pt.averageRating "
+            "FROM person_title pt WHERE pt.nconst = %s"
+            + "".join(" AND " + w for w in where) + " " + order
+        )
+        try:
+            ensure_fresh(nconst)
+            rows = query_all(sql, [nconst] + params + [limit + 1])
+        except ProgrammingError as e:
+            if not _no_such_table(e):
+                raise
+            _use_fallback()
+
+    if rows is None:
+        # same shape straight from hasprincipal / title, grouped per title in
+        # a derived table so the filters / cursor apply unchanged
+        sql = (
+            "SELECT pt.tconst, pt.categories, pt.startYear, pt.averageRating FROM ("
+            "  SELECT h.tconst,"
+            "         GROUP_CONCAT(DISTINCT h.category ORDER BY h.category) AS categories,"
+            "         MAX(t.startYear) AS startYear, MAX(t.averageRating) AS averageRating"
+            "  FROM hasprincipal h JOIN title t ON t.tconst = h.tconst"
+            "  WHERE h.nconst = %s GROUP BY h.tconst"
+            ") pt"
+            + (" WHERE " + " AND ".join(where) if where else "") + " " + order
+        )
+        rows = query_all(sql, [nconst] + params + [limit + 1])
+
+    next_key = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_key = [last[col], last["tconst"]]
+    for r in rows:
+        r["categories"] = r["categories"].split(",") if r["categories"] else []
+    return rows, next_key
+
+
+def collaborators(nconst, limit=20):
+    """[{nconst, primaryName, shared}] - the people sharing the most titles."""
+    if not _missing_tables:
+        try:
+            ensure_fresh(nconst, need_collab=True)
+            return query_all(
+                """
+                SELECT c.other_nconst AS nconst, p.primaryName, c.shared
+                FROM person_collab c
+                JOIN person p ON p.nconst = c.other_nconst
+                WHERE c.nconst = %s
+                ORDER BY c.shared DESC, c.other_nconst
+                LIMIT %s
+                """,
+                [nconst, limit],
+            )
+        except ProgrammingError as e:
+            if not _no_such_table(e):
+                raise
+            _use_fallback()
+
+    return query_all(
+        """
+        SELECT h2.nconst, p.primaryName, COUNT(DISTINCT h2.tconst) AS shared
+        FROM hasprincipal h1
+        JOIN hasprincipal h2 ON h2.tconst = h1.tconst
+        JOIN person p ON p.nconst = h2.nconst
+        WHERE h1.nconst = %s AND h2.nconst <> %s
+        GROUP BY h2.nconst, p.primaryName
+        ORDER BY shared DESC, h2.nconst
+        LIMIT %s
+        """,
+        [nconst, nconst, limit],
+    )
+
+
+if __name__ == "__main__":
+    if "--dirty" in sys.argv:
+        print(f"refreshed people: {refresh_dirty()}")
+    else:
+        print(f"rebuilt people: {rebuild_all(collab='--collab' in sys.argv)}")
@@ -0,0 +1,190 @@
+# genre_stats.py
+"""
+Precomputed per-genre rating statistics (see migrations/0001_genre_stats.sql).
+
+genre_stats holds avg / count / p25 / p50 / p75 / p90 of averageRating for
+each (genreID, min_votes bucket). Triggers on title/hasgenre mark rows dirty
+when ratings or genre links change. get_stats() answers from the stored row
+and, when it is dirty, starts one background refresh of that genre per
+process. A burst of rating updates therefore costs one full-genre pass, not
+one per request, and the stats lag the updates by that one refresh. Only a
+genre with no row yet is computed on the request thread.
+
+Run `python genre_stats.py` to (re)build every genre, e.g. after a bulk import.
+"""
+import logging
+import sys
+import threading
+
+from db import get_connection, query_all
+
+log = logging.getLogger(__name__)
+
+# min_votes values we keep stats for; other values are computed on the fly
+VOTE_BUCKETS = (0, 10, 50, 100, 500, 1000, 10000)
+PERCENTILES = (25, 50, 75, 90)
+
+_refreshing = set()   # genre ids with a background refresh running
+_refreshing_lock = threading.Lock()
+
+
+def find_genre(name):
+    """Look up a genre by name. genreName's collation is case-insensitive,
+    so this hits the unique index instead of scanning with LOWER()."""
+    rows = query_all(
+        "SELECT genreID, genreName FROM Genre WHERE genreName = %s",
+        [name],
+    )
+    return rows[0] if rows else None
+
+
+def _percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    k = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[k]
+
+
+def _summarize(ratings):
+    ratings.sort()
+    out = {
+        "avgRating": (sum(ratings) / len(ratings)) if ratings else None,
+        "titleCount": len(ratings),
+    }
+    for p in PERCENTILES:
+        out[f"p{p}"] = _percentile(ratings, p)
+    return out
+
+
+def refresh_genre(genre_id, conn=None):
+    """Recompute every bucket for one genre from genre_title_rating."""
+    own_conn = conn is None
+    if own_conn:
+        conn = get_connection()
+    try:
+        cur = conn.cursor()
+        # clear the flag first: a change landing while we recompute flags
+        # the genre again instead of being lost
+        cur.execute("UPDATE genre_stats SET dirty = 0 WHERE genreID = %s", (genre_id,))
+        conn.commit()
+
+        cur.execute(
+            """
+            SELECT averageRating, numVotes
+            FROM genre_title_rating
+            WHERE genreID = %s AND averageRating IS NOT NULL
+            """,
+            (genre_id,),
+        )
+        rows = cur.fetchall()
+
+        values = []
+        for bucket in VOTE_BUCKETS:
+            s = _summarize([r for r, v in rows if (v or 0) >= bucket])
+            values.append((
+                genre_id, bucket, s["avgRating"], s["titleCount"],
+                s["p25"], s["p50"], s["p75"], s["p90"],
+            ))
+
+        cur.executemany(
+            """
+            INSERT INTO genre_stats
+              (genreID, min_votes, avgRating, titleCount, p25, p50, p75, p90, dirty)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, 0)
+            ON DUPLICATE KEY UPDATE
+              avgRating = VALUES(avgRating), titleCount = VALUES(titleCount),
+              p25 = VALUES(p25), p50 = VALUES(p50), p75 = VALUES(p75),
+              p90 = VALUES(p90)
+            """,
+            values,
+        )
+        conn.commit()
+        cur.close()
+    finally:
+        if own_conn:
+            conn.close()
+
+
+def _refresh_in_background(genre_id):
+    """Single-flight refresh: at most one running per genre in this process."""
+    with _refreshing_lock:
+        if genre_id in _refreshing:
+            return
+        _refreshing.add(genre_id)
+
+    def run():
+        try:
+            refresh_genre(genre_id)
+        except Exception:  # the stale row keeps serving; retried on a later read
+            log.exception("genre_stats refresh of genre %s failed", genre_id)
+        finally:
+            with _refreshing_lock:
+                _refreshing.discard(genre_id)
+
+    threading.Thread(target=run, name=f"genre-stats-{genre_id}", daemon=True).start()
+
+
+def refresh_dirty():
+    """Recompute only the genres flagged dirty by the triggers."""
+    rows = query_all("SELECT DISTINCT genreID FROM genre_stats WHERE dirty = 1")
+    for r in rows:
+        refresh_genre(r["genreID"])
+    return [r["genreID"] for r in rows]
+
+
+def rebuild_all():
+    conn = get_connection()
+    try:
+        cur = conn.cursor()
+        cur.execute("SELECT genreID FROM Genre ORDER BY genreID")
+        genre_ids = [r[0] for r in cur.fetchall()]
+        cur.close()
+        for gid in genre_ids:
+            refresh_genre(gid, conn)
+    finally:
+        conn.close()
+    return genre_ids
+
+
+def get_stats(genre_id, min_votes):
+    """Stats for (genre, min_votes). Uses the materialized row when min_votes
+    is one of VOTE_BUCKETS; if a trigger flagged it, the row is served as is
+    and refreshed in the background."""
+    if min_votes in VOTE_BUCKETS:
+        sql = """
+        SELECT avgRating, titleCount, p25, p50, p75, p90, dirty
+        FROM genre_stats
+        WHERE genreID = %s AND min_votes = %s
+        """
+        rows = query_all(sql, [genre_id, min_votes])
+        if not rows:
+            refresh_genre(genre_id)
+            rows = query_all(sql, [genre_id, min_votes])
+        elif rows[0]["dirty"]:
+            _refresh_in_background(genre_id)
+        row = rows[0]
+        row.pop("dirty", None)
+        return row
+
+    # off-bucket min_votes: aggregate the genre's slice of the rating index
+    # (percentiles are only kept for the materialized buckets)
+    rows = query_all(
+        """
+        SELECT AVG(averageRating) AS avgRating, COUNT(*) AS titleCount
+        FROM genre_title_rating
+        WHERE genreID = %s AND averageRating IS NOT NULL AND numVotes >= %s
+        """,
+        [genre_id, min_votes],
+    )
+    row = rows[0]
+    for p in PERCENTILES:
+        row[f"p{p}"] = None
+    return row
+
+
+if __name__ == "__main__":
+    if "--dirty" in sys.argv:
+        print(f"refreshed genres: {refresh_dirty()}")
+    else:
+        print(f"rebuilt genres: {rebuild_all()}")
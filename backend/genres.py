@@ -0,0 +1,52 @@
+# genres.py
+"""
+Genre ID <-> name lookups for the title.genre_mask bitmask
+(see migrations/0002_title_genre_mask.sql).
+
+The Genre table is tiny and almost never changes, so it is read once and kept
+in memory for GENRE_CACHE_TTL seconds.
+"""
+import threading
+import time
+
+from db import query_all
+
+GENRE_CACHE_TTL = 600
+
+# genre_mask is BIGINT UNSIGNED with bit N = genreID N, so IDs must stay <= 63
+MAX_GENRE_ID = 63
+
+_lock = threading.Lock()
+_loaded_at = 0.0
+_by_id = {}      # genreID -> genreName
+_by_name = {}    # lower(genreName) -> genreID
+
+
+def _ensure_loaded():
+    global _loaded_at, _by_id, _by_name
+    if _by_id and time.monotonic() - _loaded_at < GENRE_CACHE_TTL:
+        return
+    with _lock:
+        if _by_id and time.monotonic() - _loaded_at < GENRE_CACHE_TTL:
+            return
+        rows = query_all("SELECT genreID, genreName FROM Genre")
+        _by_id = {r["genreID"]: r["genreName"] for r in rows}
+        _by_name = {r["genreName"].lower(): r["genreID"] for r in rows}
+        _loaded_at = time.monotonic()
+
+
+def genre_bit(name):
+    """Bitmask for a genre name (case-insensitive), or None if unknown."""
+    _ensure_loaded()
+    genre_id = _by_name.get((name or "").strip().lower())
+    return None if genre_id is None else 1 << genre_id
+
+
+def decode_mask(mask):
+    """genre_mask -> sorted genre names (same order GROUP_CONCAT used)."""
+    if not mask:
+        return []
+    _ensure_loaded()
+    return sorted(
+        name for genre_id, name in _by_id.items() if mask & (1 << genre_id)
+    )
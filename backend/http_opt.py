@@ -0,0 +1,96 @@
+# http_opt.py
+"""
+ETag / conditional GET and response compression for every API response.
+
+init_app(app) installs one after_request hook that:
+  1. gives successful GET JSON responses a strong ETag (blake2b of the body,
+     or the one the response cache already stored with the entry),
+  2. answers If-None-Match with 304 Not Modified and no body,
+  3. compresses bodies above COMPRESS_CONFIG["min_size"] with brotli (when
+     the `brotli` package is installed) or gzip, based on Accept-Encoding.
+
+Compressed bodies are kept in a small LRU keyed by ETag, so a hot cached
+response is hashed and compressed once instead of on every request. Each
+encoding gets its own ETag suffix ("...-gzip"), as required for strong
+validators.
+"""
+import gzip
+
+from flask import request
+
+from cache import LRUBackend, compute_etag
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+COMPRESS_CONFIG = {
+    "enabled": True,
+    "min_size": 1024,        # bytes; smaller bodies aren't worth compressing
+    "gzip_level": 6,
+    "brotli_quality": 5,
+    "mimetypes": ("application/json", "text/plain", "text/html"),
+    "cache_entries": 512,    # compressed bodies kept by ETag
+}
+
+_compressed = LRUBackend(max_entries=COMPRESS_CONFIG["cache_entries"])
+
+
+def _pick_encoding():
+    accepted = request.accept_encodings
+    if brotli is not None and accepted["br"]:
+        return "br"
+    if accepted["gzip"]:
+        return "gzip"
+    return None
+
+
+def _compress(body, encoding):
+    if encoding == "br":
+        return brotli.compress(body, quality=COMPRESS_CONFIG["brotli_quality"])
+    return gzip.compress(body, compresslevel=COMPRESS_CONFIG["gzip_level"])
+
+
+def _optimize(resp):
+    if request.method not in ("GET", "HEAD") or resp.status_code != 200:
+        return resp
+    if resp.direct_passthrough or resp.is_streamed:
+        return resp
+    if resp.mimetype not in COMPRESS_CONFIG["mimetypes"]:
+        return resp
+    if resp.headers.get("Content-Encoding"):
+        return resp
+
+    body = resp.get_data()
+    base_etag, _ = resp.get_etag()
+    if not base_etag:
+        base_etag = compute_etag(body)
+
+    encoding = None
+    if COMPRESS_CONFIG["enabled"] and len(body) >= COMPRESS_CONFIG["min_size"]:
+        encoding = _pick_encoding()
+        resp.vary.add("Accept-Encoding")
+
+    etag = f"{base_etag}-{encoding}" if encoding else base_etag
+    resp.set_etag(etag)
+
+    if etag in request.if_none_match:
+        resp.status_code = 304
+        resp.set_data(b"")
+        resp.headers.pop("Content-Length", None)
+        return resp
+
+    if encoding:
+        key = f"{etag}:{encoding}"
+        data = _compressed.get(key)
+        if data is None:
+            data = _compress(body, encoding)
+            _compressed.set(key, data, size=len(data))
+        resp.set_data(data)
+        resp.headers["Content-Encoding"] = encoding
+    return resp
+
+
+def init_app(app):
+    app.after_request(_optimize)
@@ -0,0 +1,481 @@
+# imdb_import.py
+"""
+Load the official IMDb datasets (https://datasets.imdbws.com/) into MySQL.
+
+    cd backend
+    python imdb_import.py --dir ~/Downloads/imdb             # everything found there
+    python imdb_import.py --dir ~/Downloads/imdb --ratings-only
+    python imdb_import.py --dir ~/Downloads/imdb --only titles,akas
+
+Files read (gzipped TSV, "\\N" = NULL) and where they go:
+
+    title.basics.tsv.gz     -> title, hasgenre
+    title.ratings.tsv.gz    -> title.averageRating / numVotes
+    title.akas.tsv.gz       -> titleakas
+    name.basics.tsv.gz      -> person, hasprofession, knownfor
+    title.principals.tsv.gz -> hasprincipal
+
+Every file is streamed and written in chunks of IMPORT_CONFIG["chunk_size"]
+rows with executemany (batched into multi-row INSERTs by the connector) and a
+commit per chunk, so memory stays flat however big the file is. Only the
+genre / profession name -> ID maps are kept in memory; names that aren't in
+genre / profession yet are added with the next free ID.
+
+Rows are upserted (INSERT ... ON DUPLICATE KEY UPDATE), so re-running an
+import refreshes the data in place. Genre / profession / known-for links of
+the titles and people in a chunk are replaced.
+
+--ratings-only streams title.ratings into a temporary table and only UPDATEs
+titles whose rating or vote count changed, which keeps the genre triggers
+(migrations 0001 / 0002) from doing work for unchanged rows. Use it for the
+daily ratings refresh.
+
+During the load unique_checks and foreign_key_checks are switched off for the
+import connection (InnoDB has no DISABLE KEYS); they are restored before the
+connection goes back to the pool. Since nothing rejects orphans meanwhile,
+each chunk of a child table is checked against its parents right after it is
+written (indexed lookups on the chunk's keys only): AKAs and known-for links
+to unknown titles and principals of unknown titles are deleted, and a
+principal whose person is unknown keeps the row with nconst = NULL (what
+the FK's ON DELETE SET NULL would leave). So load names before principals
+and titles before everything else, as a full run does. Afterwards genre_stats is refreshed, and
+after a principals load the person_title adjacency table is rebuilt. A
+running API process picks up new and renamed titles in its search index on
+the next incremental refresh (title.changed_at, migration 0005).
+"""
+import argparse
+import csv
+import gzip
+import json
+import os
+import sys
+import time
+
+from db import get_connection
+from genres import MAX_GENRE_ID
+import filmography
+import genre_stats
+
+IMPORT_CONFIG = {
+    "chunk_size": 5000,      # rows per executemany + commit
+    "progress_every": 500000,
+}
+
+FILES = {
+    "titles": "title.basics.tsv.gz",
+    "ratings": "title.ratings.tsv.gz",
+    "akas": "title.akas.tsv.gz",
+    "names": "name.basics.tsv.gz",
+    "principals": "title.principals.tsv.gz",
+}
+
+# big TSV fields (e.g. long character lists)
+csv.field_size_limit(sys.maxsize)
+
+
+# ---------- parsing helpers ----------
+
+def _null(value):
+    return None if value == "\\N" or value == "" else value
+
+
+def _int(value):
+    value = _null(value)
+    try:
+        return int(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def _float(value):
+    value = _null(value)
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def _text(value, max_len):
+    value = _null(value)
+    return value[:max_len] if value is not None else None
+
+
+def _list(value):
+    value = _null(value)
+    return [v for v in value.split(",") if v] if value else []
+
+
+def read_tsv(path):
+    """Yield each data row of a gzipped IMDb TSV as a dict (header = keys)."""
+    with gzip.open(path, "rt", encoding="utf-8", newline="") as f:
+        reader = csv.reader(f, delimiter="\t", quoting=csv.QUOTE_NONE)
+        header = next(reader)
+        width = len(header)
+        for row in reader:
+            if len(row) == width:
+                yield dict(zip(header, row))
+
+
+def chunks(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+# ---------- ID maps ----------
+
+class NameIds:
+    """name -> ID for a small lookup table (genre, profession), adding
+    unknown names with the next free ID (refusing to go past max_id)."""
+
+    def __init__(self, conn, table, id_col, name_col, max_id=None):
+        self.conn = conn
+        self.table = table
+        self.id_col = id_col
+        self.name_col = name_col
+        self.max_id = max_id
+        cur = conn.cursor()
+        cur.execute(f"SELECT {id_col}, {name_col} FROM {table}")
+        self.ids = {name.lower(): i for i, name in cur.fetchall()}
+        cur.close()
+
+    def get(self, name):
+        key = name.lower()
+        if key not in self.ids:
+            new_id = max(self.ids.values(), default=0) + 1
+            if self.max_id is not None and new_id > self.max_id:
+                raise ValueError(
+                    f"new {self.table} {name!r} would get ID {new_id}, above "
+                    f"{self.max_id}; title.genre_mask has one bit per genre ID "
+                    f"(migration 0002), so reuse a free ID <= {self.max_id} by hand"
+                )
+            cur = self.conn.cursor()
+            cur.execute(
+                f"INSERT INTO {self.table} ({self.id_col}, {self.name_col}) VALUES (%s, %s)",
+                (new_id, name),
+            )
+            cur.close()
+            self.ids[key] = new_id
+        return self.ids[key]
+
+
+# ---------- loaders ----------
+
+def _replace_links(cur, table, key_col, keys, sql, rows):
+    """Delete the links of `keys` and insert `rows` in their place."""
+    marks = ",".join(["%s"] * len(keys))
+    cur.execute(f"DELETE FROM {table} WHERE {key_col} IN ({marks})", keys)
+    if rows:
+        cur.executemany(sql, rows)
+
+
+def _drop_orphans(cur, statements, keys):
+    """Run orphan clean-up statements (each with one IN ({marks}) list) for
+    the keys of a chunk; returns the number of rows deleted / detached."""
+    keys = list(dict.fromkeys(keys))
+    marks = ",".join(["%s"] * len(keys))
+    n = 0
+    for sql in statements:
+        cur.execute(sql.format(marks=marks), keys)
+        n += cur.rowcount
+    return n
+
+
+_AKA_ORPHANS = [
+    """DELETE a FROM titleakas a LEFT JOIN title t ON t.tconst = a.titleId
+       WHERE a.titleId IN ({marks}) AND t.tconst IS NULL""",
+]
+_KNOWNFOR_ORPHANS = [
+    """DELETE k FROM knownfor k LEFT JOIN title t ON t.tconst = k.tconst
+       WHERE k.nconst IN ({marks}) AND t.tconst IS NULL""",
+]
+_PRINCIPAL_ORPHANS = [
+    """DELETE h FROM hasprincipal h LEFT JOIN title t ON t.tconst = h.tconst
+       WHERE h.tconst IN ({marks}) AND t.tconst IS NULL""",
+    """UPDATE hasprincipal h LEFT JOIN person p ON p.nconst = h.nconst
+       SET h.nconst = NULL
+       WHERE h.tconst IN ({marks}) AND h.nconst IS NOT NULL AND p.nconst IS NULL""",
+]
+
+
+def _title_row(r):
+    start = _int(r["startYear"])
+    if start is not None and start < 1800:
+        start = None
+    end = _int(r["endYear"])
+    if end is not None and start is not None and end < start:
+        end = None
+    runtime = _int(r["runtimeMinutes"])
+    if runtime is not None and runtime < 0:
+        runtime = None
+    return (
+        r["tconst"],
+        _text(r["titleType"], 50) or "unknown",
+        _text(r["primaryTitle"], 255) or "",
+        _text(r["originalTitle"], 255) or "",
+        1 if r["isAdult"] == "1" else 0,
+        start,
+        end,
+        runtime,
+    )
+
+
+def load_titles(conn, path, chunk):
+    genres = NameIds(conn, "genre", "genreID", "genreName", max_id=MAX_GENRE_ID)
+    cur = conn.cursor()
+    n = 0
+    for batch in chunks(read_tsv(path), chunk):
+        cur.executemany(
+            """
+            INSERT INTO title (tconst, titleType, primaryTitle, originalTitle,
+                               isAdult, startYear, endYear, runtimeMinutes)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE
+              titleType = VALUES(titleType), primaryTitle = VALUES(primaryTitle),
+              originalTitle = VALUES(originalTitle), isAdult = VALUES(isAdult),
+              startYear = VALUES(startYear), endYear = VALUES(endYear),
+              runtimeMinutes = VALUES(runtimeMinutes)
+            """,
+            [_title_row(r) for r in batch],
+        )
+        links = [(r["tconst"], genres.get(g)) for r in batch for g in _list(r["genres"])]
+        _replace_links(cur, "hasgenre", "tconst", [r["tconst"] for r in batch],
+                       "INSERT INTO hasgenre (tconst, genreID) VALUES (%s, %s)", links)
+        conn.commit()
+        n = _progress("titles", n, len(batch))
+    cur.close()
+    return n
+
+
+def load_ratings(conn, path, chunk):
+    """Stage each chunk in a temp table, then update only changed titles."""
+    cur = conn.cursor()
+    cur.execute(
+        """
+        CREATE TEMPORARY TABLE IF NOT EXISTS import_ratings (
+          tconst varchar(20) NOT NULL PRIMARY KEY,
+          averageRating float DEFAULT NULL,
+          numVotes int DEFAULT NULL
+        )
+        """
+    )
+    n = changed = 0
+    for batch in chunks(read_tsv(path), chunk):
+        cur.execute("DELETE FROM import_ratings")
+        cur.executemany(
+            "INSERT INTO import_ratings (tconst, averageRating, numVotes) VALUES (%s, %s, %s)",
+            [(r["tconst"], _float(r["averageRating"]), _int(r["numVotes"])) for r in batch],
+        )
+        cur.execute(
+            """
+            UPDATE title t
+            JOIN import_ratings r ON r.tconst = t.tconst
+            SET t.averageRating = r.averageRating, t.numVotes = r.numVotes
+            WHERE NOT (t.averageRating <=> r.averageRating AND t.numVotes <=> r.numVotes)
+            """
+        )
+        changed += cur.rowcount
+        conn.commit()
+        n = _progress("ratings", n, len(batch))
+    cur.execute("DROP TEMPORARY TABLE IF EXISTS import_ratings")
+    cur.close()
+    print(f"ratings: {changed} titles changed")
+    return n
+
+
+def load_akas(conn, path, chunk):
+    cur = conn.cursor()
+    n = orphans = 0
+    for batch in chunks(read_tsv(path), chunk):
+        cur.executemany(
+            """
+            INSERT INTO titleakas (titleId, ordering, title, region, language,
+                                   types, attributes, isOriginalTitle)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE
+              title = VALUES(title), region = VALUES(region),
+              language = VALUES(language), types = VALUES(types),
+              attributes = VALUES(attributes), isOriginalTitle = VALUES(isOriginalTitle)
+            """,
+            [
+                (
+                    r["titleId"], _int(r["ordering"]), _text(r["title"], 255) or "",
+                    _text(r["region"], 20), _text(r["language"], 20),
+                    _text(r["types"], 100), _text(r["attributes"], 255),
+                    _int(r["isOriginalTitle"]),
+                )
+                for r in batch
+            ],
+        )
+        orphans += _drop_orphans(cur, _AKA_ORPHANS, [r["titleId"] for r in batch])
+        conn.commit()
+        n = _progress("akas", n, len(batch))
+    cur.close()
+    print(f"akas: {orphans} rows of unknown titles dropped")
+    return n
+
+
+def _person_row(r):
+    birth = _int(r["birthYear"])
+    if birth is not None and birth < 1700:
+        birth = None
+    death = _int(r["deathYear"])
+    if death is not None and birth is not None and death < birth:
+        death = None
+    return (r["nconst"], _text(r["primaryName"], 255) or "", birth, death)
+
+
+def load_names(conn, path, chunk):
+    professions = NameIds(conn, "profession", "professionID", "professionName")
+    cur = conn.cursor()
+    n = orphans = 0
+    for batch in chunks(read_tsv(path), chunk):
+        cur.executemany(
+            """
+            INSERT INTO person (nconst, primaryName, birthYear, deathYear)
+            VALUES (%s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE
+              primaryName = VALUES(primaryName), birthYear = VALUES(birthYear),
+              deathYear = VALUES(deathYear)
+            """,
+            [_person_row(r) for r in batch],
+        )
+        nconsts = [r["nconst"] for r in batch]
+        _replace_links(
+            cur, "hasprofession", "nconst", nconsts,
+            "INSERT IGNORE INTO hasprofession (nconst, professionID) VALUES (%s, %s)",
+            [(r["nconst"], professions.get(p)) for r in batch for p in _list(r["primaryProfession"])],
+        )
+        _replace_links(
+            cur, "knownfor", "nconst", nconsts,
+            "INSERT IGNORE INTO knownfor (nconst, tconst) VALUES (%s, %s)",
+            [(r["nconst"], t) for r in batch for t in _list(r["knownForTitles"])],
+        )
+        orphans += _drop_orphans(cur, _KNOWNFOR_ORPHANS, nconsts)
+        conn.commit()
+        n = _progress("names", n, len(batch))
+    cur.close()
+    print(f"names: {orphans} known-for links to unknown titles dropped")
+    return n
+
+
+def _characters(value):
+    # IMDb stores characters as a JSON list: ["Self", "Narrator"]
+    value = _null(value)
+    if value is None:
+        return None
+    try:
+        value = ", ".join(json.loads(value))
+    except (ValueError, TypeError):
+        pass
+    return value[:255]
+
+
+def load_principals(conn, path, chunk):
+    cur = conn.cursor()
+    n = orphans = 0
+    for batch in chunks(read_tsv(path), chunk):
+        cur.executemany(
+            """
+            INSERT INTO hasprincipal (tconst, ordering, nconst, category, job, characterName)
+            VALUES (%s, %s, %s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE
+              nconst = VALUES(nconst), category = VALUES(category),
+              job = VALUES(job), characterName = VALUES(characterName)
+            """,
+            [
+                (
+                    r["tconst"], _int(r["ordering"]), _null(r["nconst"]),
+                    _text(r["category"], 100), _text(r["job"], 255),
+                    _characters(r["characters"]),
+                )
+                for r in batch
+            ],
+        )
+        orphans += _drop_orphans(cur, _PRINCIPAL_ORPHANS, [r["tconst"] for r in batch])
+        conn.commit()
+        n = _progress("principals", n, len(batch))
+    cur.close()
+    print(f"principals: {orphans} rows with an unknown title / person dropped or detached")
+    return n
+
+
+LOADERS = {
+    "titles": load_titles,
+    "ratings": load_ratings,
+    "akas": load_akas,
+    "names": load_names,
+    "principals": load_principals,
+}
+
+
+def _progress(kind, done, added):
+    every = IMPORT_CONFIG["progress_every"]
+    if (done + added) // every > done // every:
+        print(f"{kind}: {done + added} rows")
+    return done + added
+
+
+def run(directory, kinds, chunk):
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.execute("SET SESSION unique_checks = 0, foreign_key_checks = 0")
+    cur.close()
+    try:
+        for kind in kinds:
+            path = os.path.join(directory, FILES[kind])
+            if not os.path.exists(path):
+                print(f"{kind}: {FILES[kind]} not found in {directory}, skipped")
+                continue
+            started = time.monotonic()
+            n = LOADERS[kind](conn, path, chunk)
+            print(f"{kind}: {n} rows in {time.monotonic() - started:.0f}s")
+    finally:
+        # pooled connection: don't hand it back with checks disabled
+        cur = conn.cursor()
+        cur.execute("SET SESSION unique_checks = 1, foreign_key_checks = 1")
+        cur.close()
+        conn.close()
+
+    if "titles" in kinds or "ratings" in kinds:
+        if "titles" in kinds:
+            genre_stats.rebuild_all()
+        else:
+            genre_stats.refresh_dirty()
+        print("genre_stats refreshed")
+    if "principals" in kinds:
+        # one set-based rebuild instead of the per-person trigger refreshes
+        filmography.rebuild_all()
+        print("person_title rebuilt")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dir", required=True, help="folder with the *.tsv.gz files")
+    parser.add_argument("--only", default="",
+                        help=f"comma list of {', '.join(FILES)} (default: all)")
+    parser.add_argument("--ratings-only", action="store_true",
+                        help="just refresh averageRating / numVotes")
+    parser.add_argument("--chunk-size", type=int, default=IMPORT_CONFIG["chunk_size"])
+    args = parser.parse_args()
+
+    if args.ratings_only:
+        kinds = ["ratings"]
+    elif args.only:
+        kinds = [k.strip() for k in args.only.split(",") if k.strip()]
+        unknown = [k for k in kinds if k not in FILES]
+        if unknown:
+            sys.exit(f"unknown kinds: {', '.join(unknown)}")
+    else:
+        kinds = list(FILES)
+    run(args.dir, kinds, args.chunk_size)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+# log_buffer.py
+"""
+Write-behind queue for telemetry writes (search logs).
+
+POST /api/search_logs/<user_id> only appends to an in-memory queue and returns.
+A background thread drains the queue with insert_many() whenever
+`batch_size` items are waiting or `flush_interval` seconds have passed, and
+feeds the same batch into the trending counters.
+
+Memory is bounded by `max_queue`. When the queue is full the `policy` decides:
+  drop_oldest - evict the oldest queued item (default; newest data wins)
+  drop_newest - reject the incoming item
+  block       - wait up to `block_timeout` seconds for room (backpressure),
+                then reject
+Call close() on shutdown (nosql.py registers it with atexit) to flush
+whatever is still queued.
+
+A flush_fn that writes only part of a batch (e.g. an unordered insert_many
+with some rejected documents) raises PartialFlush(written, cause), so only
+the rest is counted as dropped.
+"""
+import logging
+import threading
+import time
+from collections import deque
+
+log = logging.getLogger(__name__)
+
+LOG_BUFFER_CONFIG = {
+    "max_queue": 10000,
+    "batch_size": 500,
+    "flush_interval": 1.0,   # seconds
+    "policy": "drop_oldest",
+    "block_timeout": 0.05,   # seconds, only for policy == "block"
+}
+
+
+class PartialFlush(Exception):
+    """Raised by a flush_fn when only `written` items of its batch were stored."""
+
+    def __init__(self, written, cause):
+        super().__init__(f"{written} written, rest failed: {cause}")
+        self.written = written
+
+
+class WriteBehindQueue:
+    def __init__(self, flush_fn, name="write-behind", max_queue=10000, batch_size=500,
+                 flush_interval=1.0, policy="drop_oldest", block_timeout=0.05):
+        if policy not in ("drop_oldest", "drop_newest", "block"):
+            raise ValueError(f"unknown policy {policy!r}")
+        self.flush_fn = flush_fn
+        self.name = name
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.policy = policy
+        self.block_timeout = block_timeout
+
+        self._items = deque()
+        self._cond = threading.Condition()
+        self._thread = None
+        self._closed = False
+        self._flush_lock = threading.Lock()
+
+        self._stats = {
+            "enqueued": 0,
+            "flushed": 0,
+            "dropped": 0,
+            "batches": 0,
+            "flush_errors": 0,
+        }
+
+    def _start(self):
+        # started lazily so each (forked) worker process gets its own thread
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+
+    def put(self, item):
+        """Queue one item. Returns False if it was rejected."""
+        with self._cond:
+            if self._closed:
+                self._stats["dropped"] += 1
+                return False
+            self._start()
+
+            if len(self._items) >= self.max_queue:
+                if self.policy == "drop_oldest":
+                    self._items.popleft()
+                    self._stats["dropped"] += 1
+                elif self.policy == "drop_newest":
+                    self._stats["dropped"] += 1
+                    return False
+                else:
+                    self._cond.notify_all()  # wake the flusher early
+                    deadline = time.monotonic() + self.block_timeout
+                    while len(self._items) >= self.max_queue:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            self._stats["dropped"] += 1
+                            return False
+                        self._cond.wait(remaining)
+
+            self._items.append(item)
+            self._stats["enqueued"] += 1
+            if len(self._items) >= self.batch_size:
+                self._cond.notify_all()
+            return True
+
+    def _take_batch(self):
+        batch = []
+        while self._items and len(batch) < self.batch_size:
+            batch.append(self._items.popleft())
+        self._cond.notify_all()  # room for blocked producers
+        return batch
+
+    def _write(self, batch):
+        try:
+            self.flush_fn(batch)
+        except PartialFlush as e:
+            with self._cond:
+                self._stats["flush_errors"] += 1
+                self._stats["flushed"] += e.written
+                self._stats["dropped"] += len(batch) - e.written
+                self._stats["batches"] += 1
+            log.warning("%s: flush of %d items: %s", self.name, len(batch), e)
+            return
+        except Exception:
+            with self._cond:
+                self._stats["flush_errors"] += 1
+                self._stats["dropped"] += len(batch)
+            log.exception("%s: flush of %d items failed", self.name, len(batch))
+            return
+        with self._cond:
+            self._stats["flushed"] += len(batch)
+            self._stats["batches"] += 1
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._items and not self._closed:
+                    self._cond.wait(self.flush_interval)
+                elif len(self._items) < self.batch_size and not self._closed:
+                    self._cond.wait(self.flush_interval)
+                if self._closed and not self._items:
+                    return
+                batch = self._take_batch()
+            if batch:
+                with self._flush_lock:
+                    self._write(batch)
+
+    def flush(self):
+        """Synchronously write everything queued right now."""
+        with self._flush_lock:
+            while True:
+                with self._cond:
+                    batch = self._take_batch()
+                if not batch:
+                    return
+                self._write(batch)
+
+    def close(self, timeout=5.0):
+        """Stop accepting items and flush what is left."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self.flush()
+
+    def stats(self):
+        with self._cond:
+            out = dict(self._stats)
+            out["queued"] = len(self._items)
+        out["max_queue"] = self.max_queue
+        out["policy"] = self.policy
+        return out
+
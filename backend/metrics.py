@@ -0,0 +1,256 @@
+# metrics.py
+"""
+Per-request profiling.
+
+init_app(app) starts a record for every request. While it runs:
+  - db.py's cursor wrapper adds SQL time, query count and rows fetched
+    (record_sql / record_rows), so query_all, auth.py and everything else
+    that goes through get_connection() is covered the same way,
+  - mongo.py's command listener adds Mongo time and command count
+    (record_mongo),
+  - the JSON provider adds the time spent serializing the response body.
+
+When the request ends the totals are
+  - sent back in a Server-Timing header (visible in the browser devtools),
+  - folded into per-route counters and a latency histogram, exposed in the
+    Prometheus text format at GET /metrics.
+
+SQL statements slower than METRICS_CONFIG["slow_query_ms"] go into a small
+slow-query log (with their EXPLAIN plan, see db.py), readable at
+GET /api/metrics/slow_queries.
+
+The current record lives in a ContextVar. Code that hands work to a thread
+pool should submit it through run_in_context() so that work is counted too.
+"""
+import contextvars
+import threading
+import time
+from collections import deque
+
+from flask import jsonify, request
+from flask.json.provider import DefaultJSONProvider
+
+METRICS_CONFIG = {
+    "enabled": True,
+    "server_timing": True,
+    "slow_query_ms": 200,   # SQL slower than this goes into the slow log
+    "explain": True,        # run EXPLAIN for slow SELECTs
+    "slow_log_size": 100,
+    # request latency histogram buckets, seconds
+    "buckets": (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+}
+
+_current = contextvars.ContextVar("request_metrics", default=None)
+
+_lock = threading.Lock()
+_routes = {}   # (method, route) -> totals
+_slow_queries = deque(maxlen=METRICS_CONFIG["slow_log_size"])
+
+
+class RequestRecord:
+    __slots__ = ("started", "sql_s", "sql_n", "rows", "mongo_s", "mongo_n",
+                 "serialize_s", "lock")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.sql_s = 0.0
+        self.sql_n = 0
+        self.rows = 0
+        self.mongo_s = 0.0
+        self.mongo_n = 0
+        self.serialize_s = 0.0
+        # worker threads from run_in_context() may add to the same record
+        self.lock = threading.Lock()
+
+
+# ---- hooks used by db.py / mongo.py ----
+
+def record_sql(seconds):
+    rec = _current.get()
+    if rec is not None:
+        with rec.lock:
+            rec.sql_s += seconds
+            rec.sql_n += 1
+
+
+def record_rows(n):
+    rec = _current.get()
+    if rec is not None and n:
+        with rec.lock:
+            rec.rows += n
+
+
+def record_mongo(seconds):
+    rec = _current.get()
+    if rec is not None:
+        with rec.lock:
+            rec.mongo_s += seconds
+            rec.mongo_n += 1
+
+
+def record_slow_query(entry):
+    with _lock:
+        _slow_queries.append(entry)
+
+
+def slow_queries():
+    with _lock:
+        return list(_slow_queries)
+
+
+def run_in_context(executor, fn, *args, **kwargs):
+    """executor.submit() that keeps the current request record."""
+    ctx = contextvars.copy_context()
+    return executor.submit(ctx.run, fn, *args, **kwargs)
+
+
+# ---- JSON serialization timing ----
+
+class TimedJSONProvider(DefaultJSONProvider):
+    def dumps(self, obj, **kwargs):
+        started = time.perf_counter()
+        try:
+            return super().dumps(obj, **kwargs)
+        finally:
+            rec = _current.get()
+            if rec is not None:
+                with rec.lock:
+                    rec.serialize_s += time.perf_counter() - started
+
+
+# ---- per-route aggregation ----
+
+def _route_totals(method, route):
+    key = (method, route)
+    totals = _routes.get(key)
+    if totals is None:
+        totals = _routes[key] = {
+            "requests": 0,
+            "status": {},
+            "seconds": 0.0,
+            "sql_seconds": 0.0,
+            "sql_queries": 0,
+            "rows": 0,
+            "mongo_seconds": 0.0,
+            "mongo_commands": 0,
+            "serialize_seconds": 0.0,
+            "buckets": [0] * len(METRICS_CONFIG["buckets"]),
+        }
+    return totals
+
+
+def _observe(method, route, status, rec, elapsed):
+    with _lock:
+        t = _route_totals(method, route)
+        t["requests"] += 1
+        t["status"][status] = t["status"].get(status, 0) + 1
+        t["seconds"] += elapsed
+        t["sql_seconds"] += rec.sql_s
+        t["sql_queries"] += rec.sql_n
+        t["rows"] += rec.rows
+        t["mongo_seconds"] += rec.mongo_s
+        t["mongo_commands"] += rec.mongo_n
+        t["serialize_seconds"] += rec.serialize_s
+        for i, bound in enumerate(METRICS_CONFIG["buckets"]):
+            if elapsed <= bound:
+                t["buckets"][i] += 1
+
+
+def _server_timing(rec, elapsed):
+    return ", ".join([
+        f"total;dur={elapsed * 1000:.1f}",
+        f'sql;dur={rec.sql_s * 1000:.1f};desc="{rec.sql_n} queries, {rec.rows} rows"',
+        f'mongo;dur={rec.mongo_s * 1000:.1f};desc="{rec.mongo_n} commands"',
+        f"serialize;dur={rec.serialize_s * 1000:.1f}",
+    ])
+
+
+def _before():
+    request.environ["metrics.token"] = _current.set(RequestRecord())
+
+
+def _after(resp):
+    rec = _current.get()
+    if rec is None:
+        return resp
+    elapsed = time.perf_counter() - rec.started
+    route = request.url_rule.rule if request.url_rule else "<unmatched>"
+    _observe(request.method, route, resp.status_code, rec, elapsed)
+    if METRICS_CONFIG["server_timing"]:
+        resp.headers["Server-Timing"] = _server_timing(rec, elapsed)
+    return resp
+
+
+def _teardown(exc):
+    token = request.environ.pop("metrics.token", None)
+    if token is not None:
+        _current.reset(token)
+
+
+# ---- Prometheus text format ----
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"')
+
+
+def render_prometheus():
+    with _lock:
+        routes = {k: {**v, "status": dict(v["status"]), "buckets": list(v["buckets"])}
+                  for k, v in _routes.items()}
+
+    counters = [
+        ("sql_seconds_total", "sql_seconds", "Time spent in MySQL queries."),
+        ("sql_queries_total", "sql_queries", "MySQL statements executed."),
+        ("sql_rows_total", "rows", "Rows fetched from MySQL."),
+        ("mongo_seconds_total", "mongo_seconds", "Time spent in MongoDB commands."),
+        ("mongo_commands_total", "mongo_commands", "MongoDB commands executed."),
+        ("serialize_seconds_total", "serialize_seconds", "Time spent encoding JSON."),
+    ]
+    lines = [
+        "# HELP http_requests_total Requests handled, by route and status.",
+        "# TYPE http_requests_total counter",
+    ]
+    for (method, route), t in sorted(routes.items()):
+        for status, n in sorted(t["status"].items()):
+            lines.append(
+                f'http_requests_total{{method="{method}",route="{_label(route)}",'
+                f'status="{status}"}} {n}'
+            )
+
+    lines += [
+        "# HELP http_request_duration_seconds Request wall time.",
+        "# TYPE http_request_duration_seconds histogram",
+    ]
+    for (method, route), t in sorted(routes.items()):
+        labels = f'method="{method}",route="{_label(route)}"'
+        for bound, n in zip(METRICS_CONFIG["buckets"], t["buckets"]):
+            lines.append(f'http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {n}')
+        lines.append(f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} {t["requests"]}')
+        lines.append(f'http_request_duration_seconds_sum{{{labels}}} {t["seconds"]:.6f}')
+        lines.append(f'http_request_duration_seconds_count{{{labels}}} {t["requests"]}')
+
+    for name, field, help_text in counters:
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+        for (method, route), t in sorted(routes.items()):
+            value = t[field]
+            value = f"{value:.6f}" if isinstance(value, float) else value
+            lines.append(f'{name}{{method="{method}",route="{_label(route)}"}} {value}')
+    return "\n".join(lines) + "\n"
+
+
+def init_app(app):
+    if not METRICS_CONFIG["enabled"]:
+        return
+    app.json = TimedJSONProvider(app)
+    app.before_request(_before)
+    app.after_request(_after)
+    app.teardown_request(_teardown)
+
+    @app.get("/metrics")
+    def prometheus_metrics():
+        return render_prometheus(), 200, {"Content-Type": "text/plain; version=0.0.4"}
+
+    @app.get("/api/metrics/slow_queries")
+    def get_slow_queries():
+        """Most recent SQL statements over slow_query_ms, with EXPLAIN output."""
+        return jsonify(slow_queries())
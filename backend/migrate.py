@@ -0,0 +1,295 @@
+# migrate.py
+"""
+Versioned runner for migrations/NNNN_name.sql.
+
+    cd backend
+    python migrate.py              # apply pending migrations in order
+    python migrate.py --status     # list applied / pending
+    python migrate.py --baseline 2 # mark 0001..0002 as applied without running
+                                   # (for databases migrated by hand in Workbench)
+    python migrate.py --explain    # check the hot queries use the expected indexes
+
+Applied versions are recorded in `schema_migrations` with a checksum of the
+file, so an edited migration that already ran is reported instead of silently
+ignored. MySQL commits DDL implicitly, so a migration that fails halfway is
+not rolled back: the error names the statement, fix it and run again (the
+version is only recorded once every statement succeeded).
+
+Statements are split on `;` at the end of a statement, which is why the
+trigger migrations use single-statement bodies instead of DELIMITER blocks.
+"""
+import hashlib
+import os
+import re
+import sys
+import time
+
+from db import get_connection
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+_FILE_RE = re.compile(r"^(\d{4})_[\w-]+\.sql$")
+
+# (name, sql, {table alias: acceptable index names}, index gives the order)
+# for the endpoint queries the indexes were designed for, with typical values
+# filled in. When the last field is True a filesort also counts as a failure.
+EXPLAIN_CHECKS = [
+    (
+        "/api/movies list",
+        "SELECT t.tconst FROM title t "
+        "ORDER BY t.startYear DESC, t.primaryTitle, t.tconst LIMIT 201",
+        {"t": {"idx_title_year_title"}},
+        True,
+    ),
+    (
+        "/api/movies year range + genre",
+        "SELECT t.tconst FROM title t "
+        "WHERE t.startYear BETWEEN 1990 AND 2000 AND (t.genre_mask & 512) <> 0 "
+        "ORDER BY t.startYear DESC, t.primaryTitle, t.tconst LIMIT 51",
+        {"t": {"idx_title_year_title"}},
+        True,
+    ),
+    (
+        "/api/movies keyset page",
+        "SELECT t.tconst FROM title t "
+        "WHERE (t.startYear < 2000 OR t.startYear IS NULL OR (t.startYear = 2000 "
+        "AND (t.primaryTitle > 'M' OR (t.primaryTitle = 'M' AND t.tconst > 'tt0')))) "
+        "ORDER BY t.startYear DESC, t.primaryTitle, t.tconst LIMIT 51",
+        {"t": {"idx_title_year_title"}},
+        True,
+    ),
+    (
+        "/api/movies/above_genre_avg",
+        "SELECT tconst FROM genre_title_rating WHERE genreID = 9 AND numVotes >= 50 "
+        "ORDER BY averageRating DESC, numVotes DESC LIMIT 200",
+        {"genre_title_rating": {"idx_gtr_rating"}},
+        True,
+    ),
+    (
+        "/api/actors list",
+        "SELECT p.nconst FROM person p "
+        "WHERE (p.primaryName > 'M' OR (p.primaryName = 'M' AND p.nconst > 'nm0')) "
+        "ORDER BY p.primaryName, p.nconst LIMIT 201",
+        {"p": {"idx_person_name"}},
+        True,
+    ),
+    (
+        "genre lookup by name",
+        "SELECT genreID FROM genre WHERE genreName = 'drama'",
+        {"genre": {"genreName"}},
+        False,
+    ),
+    (
+        "/api/title principals",
+        "SELECT nconst FROM hasprincipal WHERE tconst = 'tt0000001' ORDER BY ordering",
+        {"hasprincipal": {"PRIMARY"}},
+        False,
+    ),
+    (
+        "/api/person filmography by year",
+        "SELECT pt.tconst FROM person_title pt WHERE pt.nconst = 'nm0000001' "
+        "ORDER BY startYear DESC, pt.tconst LIMIT 51",
+        {"pt": {"idx_pt_year"}},
+        True,
+    ),
+    (
+        "/api/person collaborators",
+        "SELECT c.other_nconst FROM person_collab c WHERE c.nconst = 'nm0000001' "
+        "ORDER BY c.shared DESC, c.other_nconst LIMIT 20",
+        {"c": {"idx_pc_shared"}},
+        True,
+    ),
+    (
+        "/api/person known-for",
+        "SELECT t.tconst FROM knownfor k JOIN title t ON t.tconst = k.tconst "
+        "WHERE k.nconst = 'nm0000001' ORDER BY t.startYear",
+        {"k": {"PRIMARY"}, "t": {"PRIMARY"}},
+        False,
+    ),
+]
+
+
+def discover():
+    """[(version, filename)] of every migration file, in order."""
+    found = []
+    for name in sorted(os.listdir(MIGRATIONS_DIR)):
+        m = _FILE_RE.match(name)
+        if m:
+            found.append((int(m.group(1)), name))
+    versions = [v for v, _ in found]
+    if len(versions) != len(set(versions)):
+        raise SystemExit("duplicate migration version numbers in " + MIGRATIONS_DIR)
+    return found
+
+
+def split_statements(sql):
+    """Split a script on `;`, ignoring ones inside quotes or `--` comments."""
+    statements, buf = [], []
+    quote = None
+    i = 0
+    while i < len(sql):
+        ch = sql[i]
+        if quote:
+            buf.append(ch)
+            if ch == "\\":
+                buf.append(sql[i + 1:i + 2])
+                i += 1
+            elif ch == quote:
+                quote = None
+        elif ch in ("'", '"', "`"):
+            quote = ch
+            buf.append(ch)
+        elif sql.startswith("--", i):
+            end = sql.find("\n", i)
+            i = len(sql) if end == -1 else end
+            continue
+        elif ch == ";":
+            statements.append("".join(buf).strip())
+            buf = []
+        else:
+            buf.append(ch)
+        i += 1
+    statements.append("".join(buf).strip())
+    return [s for s in statements if s]
+
+
+def _checksum(text):
+    return hashlib.sha256(text.encode("utf8")).hexdigest()
+
+
+def _read(name):
+    with open(os.path.join(MIGRATIONS_DIR, name), encoding="utf8") as f:
+        return f.read()
+
+
+def ensure_table(cur):
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+          version int NOT NULL,
+          name varchar(255) NOT NULL,
+          checksum char(64) NOT NULL,
+          applied_at datetime NOT NULL DEFAULT CURRENT_TIMESTAMP,
+          duration_ms int DEFAULT NULL,
+          PRIMARY KEY (version)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci
+        """
+    )
+
+
+def applied(cur):
+    cur.execute("SELECT version, name, checksum FROM schema_migrations ORDER BY version")
+    return {v: (name, checksum) for v, name, checksum in cur.fetchall()}
+
+
+def _record(cur, version, name, checksum, duration_ms):
+    cur.execute(
+        "INSERT INTO schema_migrations (version, name, checksum, duration_ms) "
+        "VALUES (%s, %s, %s, %s)",
+        (version, name, checksum, duration_ms),
+    )
+
+
+def migrate(conn, baseline=None):
+    """Apply pending migrations (or just record them up to `baseline`)."""
+    cur = conn.cursor()
+    try:
+        ensure_table(cur)
+        done = applied(cur)
+        for version, name in discover():
+            text = _read(name)
+            checksum = _checksum(text)
+            if version in done:
+                if done[version][1] != checksum:
+                    print(f"warning: {name} changed after it was applied")
+                continue
+
+            if baseline is not None and version <= baseline:
+                _record(cur, version, name, checksum, None)
+                conn.commit()
+                print(f"baselined {name}")
+                continue
+
+            started = time.monotonic()
+            for n, statement in enumerate(split_statements(text), 1):
+                try:
+                    cur.execute(statement)
+                    if cur.with_rows:
+                        cur.fetchall()
+                except Exception as e:
+                    conn.rollback()
+                    first_line = statement.splitlines()[0]
+                    raise SystemExit(
+                        f"{name}: statement {n} failed ({first_line} ...): {e}"
+                    )
+            duration_ms = int((time.monotonic() - started) * 1000)
+            _record(cur, version, name, checksum, duration_ms)
+            conn.commit()
+            print(f"applied {name} ({duration_ms} ms)")
+    finally:
+        cur.close()
+
+
+def status(conn):
+    cur = conn.cursor()
+    try:
+        ensure_table(cur)
+        done = applied(cur)
+    finally:
+        cur.close()
+    for version, name in discover():
+        state = "applied" if version in done else "pending"
+        if version in done and done[version][1] != _checksum(_read(name)):
+            state = "applied (file changed since)"
+        print(f"{name:40} {state}")
+
+
+def explain(conn):
+    """Run EXPLAIN for EXPLAIN_CHECKS. Returns the number of failed checks."""
+    cur = conn.cursor(dictionary=True)
+    failures = 0
+    try:
+        for label, sql, expected, ordered in EXPLAIN_CHECKS:
+            cur.execute("EXPLAIN " + sql)
+            plan = cur.fetchall()
+            problems = []
+            for row in plan:
+                want = expected.get(row["table"])
+                if want is None:
+                    continue
+                if row["key"] not in want:
+                    problems.append(
+                        f"{row['table']} uses {row['key'] or 'no index'} "
+                        f"(type={row['type']}), expected {'/'.join(sorted(want))}"
+                    )
+                if ordered and "filesort" in (row.get("Extra") or ""):
+                    problems.append(f"{row['table']} needs a filesort")
+            if problems:
+                failures += 1
+                print(f"FAIL  {label}: " + "; ".join(problems))
+            else:
+                print(f"ok    {label}")
+    finally:
+        cur.close()
+    if failures:
+        print("(on a near-empty table MySQL may prefer a full scan; "
+              "re-check after loading data)")
+    return failures
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    conn = get_connection()
+    try:
+        if "--status" in args:
+            status(conn)
+        elif "--explain" in args:
+            sys.exit(1 if explain(conn) else 0)
+        elif "--baseline" in args:
+            i = args.index("--baseline")
+            if i + 1 >= len(args) or not args[i + 1].isdigit():
+                sys.exit("usage: python migrate.py --baseline VERSION")
+            migrate(conn, baseline=int(args[i + 1]))
+        else:
+            migrate(conn)
+    finally:
+        conn.close()
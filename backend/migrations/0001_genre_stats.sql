@@ -0,0 +1,82 @@
+-- 0001_genre_stats.sql
+-- Materialized genre rating layer for /api/movies/above_genre_avg.
+--
+-- genre_title_rating: one row per (genre, title) carrying the title's rating,
+--   indexed on (genreID, averageRating, numVotes) so "titles of genre X rated
+--   above Y" is a single range scan. Kept in sync with title/hasgenre by the
+--   triggers below.
+-- genre_stats: avg / count / percentiles per (genreID, min_votes bucket).
+--   Triggers only flag rows as dirty; genre_stats.py recomputes dirty genres
+--   on the next request (or via `python genre_stats.py`).
+
+CREATE TABLE IF NOT EXISTS genre_title_rating (
+  genreID int NOT NULL,
+  tconst varchar(20) NOT NULL,
+  averageRating float DEFAULT NULL,
+  numVotes int DEFAULT NULL,
+  PRIMARY KEY (genreID, tconst),
+  KEY idx_gtr_rating (genreID, averageRating, numVotes),
+  KEY idx_gtr_title (tconst),
+  CONSTRAINT fk_gtr_genre FOREIGN KEY (genreID) REFERENCES genre (genreID) ON DELETE CASCADE,
+  CONSTRAINT fk_gtr_title FOREIGN KEY (tconst) REFERENCES title (tconst) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+CREATE TABLE IF NOT EXISTS genre_stats (
+  genreID int NOT NULL,
+  min_votes int NOT NULL,
+  avgRating double DEFAULT NULL,
+  titleCount int NOT NULL DEFAULT 0,
+  p25 float DEFAULT NULL,
+  p50 float DEFAULT NULL,
+  p75 float DEFAULT NULL,
+  p90 float DEFAULT NULL,
+  dirty tinyint(1) NOT NULL DEFAULT 0,
+  updated_at datetime NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+  PRIMARY KEY (genreID, min_votes),
+  CONSTRAINT fk_genre_stats_genre FOREIGN KEY (genreID) REFERENCES genre (genreID) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+INSERT IGNORE INTO genre_title_rating (genreID, tconst, averageRating, numVotes)
+SELECT hg.genreID, hg.tconst, t.averageRating, t.numVotes
+FROM hasgenre hg
+JOIN title t ON t.tconst = hg.tconst;
+
+-- keep genre_title_rating in sync (single-statement triggers, no DELIMITER needed)
+DROP TRIGGER IF EXISTS trg_hasgenre_ai_gtr;
+CREATE TRIGGER trg_hasgenre_ai_gtr AFTER INSERT ON hasgenre FOR EACH ROW
+  INSERT IGNORE INTO genre_title_rating (genreID, tconst, averageRating, numVotes)
+  SELECT NEW.genreID, t.tconst, t.averageRating, t.numVotes
+  FROM title t WHERE t.tconst = NEW.tconst;
+
+DROP TRIGGER IF EXISTS trg_hasgenre_ad_gtr;
+CREATE TRIGGER trg_hasgenre_ad_gtr AFTER DELETE ON hasgenre FOR EACH ROW
+  DELETE FROM genre_title_rating WHERE genreID = OLD.genreID AND tconst = OLD.tconst;
+
+DROP TRIGGER IF EXISTS trg_title_au_gtr;
+CREATE TRIGGER trg_title_au_gtr AFTER UPDATE ON title FOR EACH ROW
+  UPDATE genre_title_rating
+  SET averageRating = NEW.averageRating, numVotes = NEW.numVotes
+  WHERE tconst = NEW.tconst
+    AND NOT (NEW.averageRating <=> OLD.averageRating AND NEW.numVotes <=> OLD.numVotes);
+
+-- flag affected genres so their stats get recomputed
+DROP TRIGGER IF EXISTS trg_hasgenre_ai_stats;
+CREATE TRIGGER trg_hasgenre_ai_stats AFTER INSERT ON hasgenre FOR EACH ROW
+  UPDATE genre_stats SET dirty = 1 WHERE genreID = NEW.genreID;
+
+DROP TRIGGER IF EXISTS trg_hasgenre_ad_stats;
+CREATE TRIGGER trg_hasgenre_ad_stats AFTER DELETE ON hasgenre FOR EACH ROW
+  UPDATE genre_stats SET dirty = 1 WHERE genreID = OLD.genreID;
+
+DROP TRIGGER IF EXISTS trg_title_au_stats;
+CREATE TRIGGER trg_title_au_stats AFTER UPDATE ON title FOR EACH ROW
+  UPDATE genre_stats SET dirty = 1
+  WHERE genreID IN (SELECT genreID FROM hasgenre WHERE tconst = NEW.tconst)
+    AND NOT (NEW.averageRating <=> OLD.averageRating AND NEW.numVotes <=> OLD.numVotes);
+
+-- hasgenre rows removed by ON DELETE CASCADE don't fire triggers, so catch
+-- title deletes here (BEFORE, while the hasgenre rows still exist)
+DROP TRIGGER IF EXISTS trg_title_bd_stats;
+CREATE TRIGGER trg_title_bd_stats BEFORE DELETE ON title FOR EACH ROW
+  UPDATE genre_stats SET dirty = 1
+  WHERE genreID IN (SELECT genreID FROM hasgenre WHERE tconst = OLD.tconst);
@@ -0,0 +1,32 @@
+-- 0002_title_genre_mask.sql
+-- Denormalized genre bitmask on title: bit N is set when the title has
+-- genreID N (genre IDs are 1..28, so they fit in 64 bits).
+-- List queries read genres from this column instead of
+-- LEFT JOIN HasGenre/Genre + GROUP_CONCAT + GROUP BY, and the genre filter
+-- becomes (genre_mask & bit) <> 0 instead of a correlated EXISTS.
+-- Triggers on hasgenre keep it in sync.
+
+ALTER TABLE title ADD COLUMN genre_mask BIGINT UNSIGNED NOT NULL DEFAULT 0;
+
+UPDATE title t
+JOIN (
+  SELECT tconst, BIT_OR(1 << genreID) AS mask
+  FROM hasgenre
+  GROUP BY tconst
+) hg ON hg.tconst = t.tconst
+SET t.genre_mask = hg.mask;
+
+DROP TRIGGER IF EXISTS trg_hasgenre_ai_mask;
+CREATE TRIGGER trg_hasgenre_ai_mask AFTER INSERT ON hasgenre FOR EACH ROW
+  UPDATE title SET genre_mask = genre_mask | (1 << NEW.genreID)
+  WHERE tconst = NEW.tconst;
+
+DROP TRIGGER IF EXISTS trg_hasgenre_ad_mask;
+CREATE TRIGGER trg_hasgenre_ad_mask AFTER DELETE ON hasgenre FOR EACH ROW
+  UPDATE title SET genre_mask = genre_mask & ~(1 << OLD.genreID)
+  WHERE tconst = OLD.tconst;
+
+DROP TRIGGER IF EXISTS trg_hasgenre_au_mask;
+CREATE TRIGGER trg_hasgenre_au_mask AFTER UPDATE ON hasgenre FOR EACH ROW
+  UPDATE title SET genre_mask = (genre_mask & ~(1 << OLD.genreID)) | (1 << NEW.genreID)
+  WHERE tconst = NEW.tconst;
@@ -0,0 +1,20 @@
+-- 0003_query_indexes.sql
+-- Indexes for the query shapes the API actually runs (check them with
+-- `python migrate.py --explain`).
+--
+-- /api/movies: ORDER BY startYear DESC, primaryTitle, tconst with optional
+--   startYear range and keyset cursor. A descending first column (MySQL 8)
+--   matches that order exactly, so the list is an index range scan that stops
+--   after LIMIT rows instead of a filesort over the whole table. genre_mask and
+--   averageRating ride along so the genre / min_rating filters are checked in
+--   the index (index condition pushdown) before any row lookup.
+-- /api/actors: ORDER BY primaryName, nconst with a keyset cursor.
+--
+-- Genre lookups need no new index: genreName already has a UNIQUE key with
+-- the case-insensitive utf8mb4_0900_ai_ci collation, and find_genre() /
+-- genres.py compare with `genreName = %s` instead of LOWER(genreName).
+
+CREATE INDEX idx_title_year_title
+  ON title (startYear DESC, primaryTitle, tconst, genre_mask, averageRating);
+
+CREATE INDEX idx_person_name ON person (primaryName, nconst);
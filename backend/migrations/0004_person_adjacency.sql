@@ -0,0 +1,107 @@
+-- 0004_person_adjacency.sql
+-- Precomputed person <-> title graph for /api/person/<nconst>/filmography
+-- and /api/person/<nconst>/collaborators (see filmography.py).
+--
+-- person_title: one row per (person, title) from hasprincipal, with the
+--   person's categories on that title and the title's year / rating copied in,
+--   so a filmography page is a range scan on (nconst, sort column) without
+--   touching hasprincipal or title.
+-- person_collab: for each person, the people they share the most titles with
+--   (top FILMOGRAPHY_CONFIG["collab_keep"]). Filled per person on first
+--   request or by `python filmography.py --collab`, never at query time.
+-- person_adjacency_state: triggers on hasprincipal / title flag every person
+--   whose rows or collaborator counts changed (the edited person plus the
+--   other principals of that title). filmography.py recomputes a flagged
+--   person on the next request. collab_at is NULL until person_collab was built.
+
+CREATE TABLE IF NOT EXISTS person_title (
+  nconst varchar(20) NOT NULL,
+  tconst varchar(20) NOT NULL,
+  categories varchar(255) DEFAULT NULL,
+  startYear int DEFAULT NULL,
+  averageRating float DEFAULT NULL,
+  PRIMARY KEY (nconst, tconst),
+  KEY idx_pt_year (nconst, startYear DESC, tconst),
+  KEY idx_pt_rating (nconst, averageRating DESC, tconst),
+  KEY idx_pt_title (tconst, nconst),
+  CONSTRAINT fk_pt_person FOREIGN KEY (nconst) REFERENCES person (nconst) ON DELETE CASCADE,
+  CONSTRAINT fk_pt_title FOREIGN KEY (tconst) REFERENCES title (tconst) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+CREATE TABLE IF NOT EXISTS person_collab (
+  nconst varchar(20) NOT NULL,
+  other_nconst varchar(20) NOT NULL,
+  shared int NOT NULL,
+  PRIMARY KEY (nconst, other_nconst),
+  KEY idx_pc_shared (nconst, shared DESC, other_nconst),
+  CONSTRAINT fk_pc_person FOREIGN KEY (nconst) REFERENCES person (nconst) ON DELETE CASCADE,
+  CONSTRAINT fk_pc_other FOREIGN KEY (other_nconst) REFERENCES person (nconst) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+CREATE TABLE IF NOT EXISTS person_adjacency_state (
+  nconst varchar(20) NOT NULL,
+  dirty tinyint(1) NOT NULL DEFAULT 0,
+  collab_at datetime DEFAULT NULL,
+  PRIMARY KEY (nconst),
+  KEY idx_pas_dirty (dirty)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+INSERT IGNORE INTO person_title (nconst, tconst, categories, startYear, averageRating)
+SELECT h.nconst, h.tconst,
+       GROUP_CONCAT(DISTINCT h.category ORDER BY h.category),
+       MAX(t.startYear), MAX(t.averageRating)
+FROM hasprincipal h
+JOIN title t ON t.tconst = h.tconst
+WHERE h.nconst IS NOT NULL
+GROUP BY h.nconst, h.tconst;
+
+-- flag the principal and everyone already on that title (their shared counts
+-- change too); single-statement triggers, no DELIMITER needed
+DROP TRIGGER IF EXISTS trg_hasprincipal_ai_adj;
+CREATE TRIGGER trg_hasprincipal_ai_adj AFTER INSERT ON hasprincipal FOR EACH ROW
+  INSERT INTO person_adjacency_state (nconst, dirty)
+  SELECT d.nconst, 1 FROM (
+    SELECT NEW.nconst AS nconst
+    UNION SELECT nconst FROM person_title WHERE tconst = NEW.tconst
+  ) d
+  WHERE d.nconst IS NOT NULL
+  ON DUPLICATE KEY UPDATE dirty = 1;
+
+DROP TRIGGER IF EXISTS trg_hasprincipal_ad_adj;
+CREATE TRIGGER trg_hasprincipal_ad_adj AFTER DELETE ON hasprincipal FOR EACH ROW
+  INSERT INTO person_adjacency_state (nconst, dirty)
+  SELECT d.nconst, 1 FROM (
+    SELECT OLD.nconst AS nconst
+    UNION SELECT nconst FROM person_title WHERE tconst = OLD.tconst
+  ) d
+  WHERE d.nconst IS NOT NULL
+  ON DUPLICATE KEY UPDATE dirty = 1;
+
+DROP TRIGGER IF EXISTS trg_hasprincipal_au_adj;
+CREATE TRIGGER trg_hasprincipal_au_adj AFTER UPDATE ON hasprincipal FOR EACH ROW
+  INSERT INTO person_adjacency_state (nconst, dirty)
+  SELECT d.nconst, 1 FROM (
+    SELECT NEW.nconst AS nconst
+    UNION SELECT OLD.nconst
+    UNION SELECT nconst FROM person_title WHERE tconst IN (NEW.tconst, OLD.tconst)
+  ) d
+  WHERE d.nconst IS NOT NULL
+    AND NOT (NEW.nconst <=> OLD.nconst AND NEW.tconst <=> OLD.tconst
+             AND NEW.category <=> OLD.category)
+  ON DUPLICATE KEY UPDATE dirty = 1;
+
+-- keep the copied sort columns in step with title
+DROP TRIGGER IF EXISTS trg_title_au_adj;
+CREATE TRIGGER trg_title_au_adj AFTER UPDATE ON title FOR EACH ROW
+  UPDATE person_title
+  SET startYear = NEW.startYear, averageRating = NEW.averageRating
+  WHERE tconst = NEW.tconst
+    AND NOT (NEW.startYear <=> OLD.startYear AND NEW.averageRating <=> OLD.averageRating);
+
+-- hasprincipal / person_title rows removed by ON DELETE CASCADE don't fire
+-- triggers, so flag the title's people here (BEFORE, while the rows exist)
+DROP TRIGGER IF EXISTS trg_title_bd_adj;
+CREATE TRIGGER trg_title_bd_adj BEFORE DELETE ON title FOR EACH ROW
+  INSERT INTO person_adjacency_state (nconst, dirty)
+  SELECT nconst, 1 FROM person_title WHERE tconst = OLD.tconst
+  ON DUPLICATE KEY UPDATE dirty = 1;
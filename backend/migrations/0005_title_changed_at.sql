@@ -0,0 +1,35 @@
+-- 0005_title_changed_at.sql
+-- Change marker for the in-process search index (search.py).
+--
+-- The index used to pick up new titles with `tconst > last indexed tconst`,
+-- but tconst is a string: tt10000000 sorts below tt9999999, and ids with
+-- another prefix sort anywhere, so those titles were never added
+-- incrementally. title.changed_at is set on insert and bumped when a title's
+-- names or its AKAs change. The index pages through
+-- (changed_at, tconst) instead, which also picks up renames.
+-- Rating / vote updates don't touch it.
+
+ALTER TABLE title
+  ADD COLUMN changed_at datetime(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6),
+  ADD KEY idx_title_changed (changed_at, tconst);
+
+DROP TRIGGER IF EXISTS trg_title_bu_changed;
+CREATE TRIGGER trg_title_bu_changed BEFORE UPDATE ON title FOR EACH ROW
+  SET NEW.changed_at = IF(
+    NEW.primaryTitle <=> OLD.primaryTitle AND NEW.originalTitle <=> OLD.originalTitle,
+    NEW.changed_at, NOW(6)
+  );
+
+DROP TRIGGER IF EXISTS trg_titleakas_ai_changed;
+CREATE TRIGGER trg_titleakas_ai_changed AFTER INSERT ON titleakas FOR EACH ROW
+  UPDATE title SET changed_at = NOW(6) WHERE tconst = NEW.titleId;
+
+DROP TRIGGER IF EXISTS trg_titleakas_au_changed;
+CREATE TRIGGER trg_titleakas_au_changed AFTER UPDATE ON titleakas FOR EACH ROW
+  UPDATE title SET changed_at = NOW(6)
+  WHERE tconst IN (NEW.titleId, OLD.titleId)
+    AND NOT (NEW.title <=> OLD.title AND NEW.titleId <=> OLD.titleId);
+
+DROP TRIGGER IF EXISTS trg_titleakas_ad_changed;
+CREATE TRIGGER trg_titleakas_ad_changed AFTER DELETE ON titleakas FOR EACH ROW
+  UPDATE title SET changed_at = NOW(6) WHERE tconst = OLD.titleId;
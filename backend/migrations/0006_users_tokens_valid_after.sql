@@ -0,0 +1,10 @@
+-- 0006_users_tokens_valid_after.sql
+-- Persistent token revocation (see tokens.py).
+--
+-- tokens.revoke(user_id) stores the revocation time (Unix seconds, the same
+-- clock as the tokens' iat claim) here. Access and refresh tokens issued
+-- before it are rejected by every worker and after a restart, not just by
+-- the process that revoked them. NULL = nothing revoked.
+
+ALTER TABLE users
+  ADD COLUMN tokens_valid_after double DEFAULT NULL;
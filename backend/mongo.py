@@ -0,0 +1,183 @@
+# mongo.py
+"""
+Shared MongoDB client and collections.
+
+All Mongo settings live here so nosql.py / trending.py / review_stats.py don't
+hard-code anything:
+
+  MONGO_CONFIG    - client pool / idle / connect settings
+  MONGO_TIMEOUTS  - maxTimeMS per class of operation, see op_ms()
+  MONGO_READS     - read preference + read concern profiles
+  ENDPOINT_READS  - which profile each read path uses, see reading()
+  MONGO_WRITES    - write concern profiles, see writing()
+
+Trending and top-rated are precomputed counters that can be a few seconds
+stale, so they read from secondaries when there are any (secondaryPreferred
+falls back to the primary on a standalone server). Search logs are telemetry
+and use a lighter write concern than reviews.
+
+A CommandListener times every command and adds it to the current request's
+metrics (see metrics.py); commands slower than MONGO_CONFIG["slow_ms"] are
+kept in a small ring buffer for GET /api/metrics/mongo.
+"""
+import os
+import threading
+import time
+from collections import deque
+
+from pymongo import MongoClient, monitoring
+from pymongo.errors import OperationFailure
+from pymongo.read_concern import ReadConcern
+from pymongo.read_preferences import Primary, SecondaryPreferred
+from pymongo.write_concern import WriteConcern
+
+from metrics import record_mongo
+
+# --- Mongo client / DB ---
+MONGO_URI = os.environ.get("MONGO_URI", "mongodb://localhost:27017")  # adjust if needed
+MONGO_DB = "project2_nosql"              # separate logical DB for NoSQL part
+
+# Client settings.
+#   max_pool_size / min_pool_size - connections per server kept by pymongo
+#   max_idle_ms      - close pooled connections idle for longer than this
+#   wait_queue_ms    - how long a request waits for a free connection
+#   slow_ms          - commands slower than this are recorded as slow ops
+MONGO_CONFIG = {
+    "max_pool_size": 50,
+    "min_pool_size": 0,
+    "max_idle_ms": 300000,
+    "wait_queue_ms": 5000,
+    "connect_timeout_ms": 5000,
+    "server_selection_ms": 5000,
+    "slow_ms": 100,
+    "slow_log_size": 200,
+}
+
+# maxTimeMS per operation class: the server aborts the command after this long
+MONGO_TIMEOUTS = {
+    "read": 2000,       # point reads / short finds
+    "aggregate": 5000,  # pipelines (paged reviews, trending)
+    "search": 5000,     # $text review search
+    "write": 3000,      # findAndModify
+}
+
+MONGO_READS = {
+    "primary": {"read_preference": Primary(), "read_concern": ReadConcern("local")},
+    "analytics": {
+        "read_preference": SecondaryPreferred(max_staleness=120),
+        "read_concern": ReadConcern("local"),
+    },
+}
+
+ENDPOINT_READS = {
+    "trending": "analytics",
+    "top_user_rated": "analytics",
+    "export": "analytics",
+}
+
+MONGO_WRITES = {
+    "default": WriteConcern(w=1),
+    # search logs: acknowledged but not journaled; use w=0 for fire-and-forget
+    "telemetry": WriteConcern(w=1, j=False, wtimeout=1000),
+}
+
+
+class SlowOpListener(monitoring.CommandListener):
+    """Counts commands and keeps the last few slow ones."""
+
+    def __init__(self, slow_ms, size):
+        self.slow_ms = slow_ms
+        self._lock = threading.Lock()
+        self._started = {}
+        self._slow = deque(maxlen=size)
+        self._stats = {"commands": 0, "failed": 0, "slow": 0, "seconds_total": 0.0}
+
+    def started(self, event):
+        target = event.command.get(event.command_name)
+        with self._lock:
+            self._started[(event.connection_id, event.request_id)] = (
+                target if isinstance(target, str) else None
+            )
+
+    def _finish(self, event, failed):
+        ms = event.duration_micros / 1000.0
+        record_mongo(ms / 1000.0)  # per-request totals (runs on the calling thread)
+        with self._lock:
+            target = self._started.pop((event.connection_id, event.request_id), None)
+            self._stats["commands"] += 1
+            self._stats["seconds_total"] += ms / 1000.0
+            if failed:
+                self._stats["failed"] += 1
+            if ms >= self.slow_ms:
+                self._stats["slow"] += 1
+                self._slow.append({
+                    "command": event.command_name,
+                    "collection": target,
+                    "ms": round(ms, 2),
+                    "failed": failed,
+                    "at": time.time(),
+                })
+
+    def succeeded(self, event):
+        self._finish(event, False)
+
+    def failed(self, event):
+        self._finish(event, True)
+
+    def stats(self):
+        with self._lock:
+            out = dict(self._stats)
+            out["slow_ops"] = list(self._slow)
+        out["slow_ms"] = self.slow_ms
+        return out
+
+
+command_listener = SlowOpListener(MONGO_CONFIG["slow_ms"], MONGO_CONFIG["slow_log_size"])
+
+client = MongoClient(
+    MONGO_URI,
+    maxPoolSize=MONGO_CONFIG["max_pool_size"],
+    minPoolSize=MONGO_CONFIG["min_pool_size"],
+    maxIdleTimeMS=MONGO_CONFIG["max_idle_ms"],
+    waitQueueTimeoutMS=MONGO_CONFIG["wait_queue_ms"],
+    connectTimeoutMS=MONGO_CONFIG["connect_timeout_ms"],
+    serverSelectionTimeoutMS=MONGO_CONFIG["server_selection_ms"],
+    event_listeners=[command_listener],
+)
+db = client[MONGO_DB]
+
+reviews_col = db["reviews"]
+watchlists_col = db["watchlists"]
+logs_col = db["search_logs"]
+review_stats_col = db["review_stats"]
+search_trends_col = db["search_trends"]
+
+
+def op_ms(kind):
+    """maxTimeMS for an operation class in MONGO_TIMEOUTS."""
+    return MONGO_TIMEOUTS[kind]
+
+
+def reading(col, endpoint):
+    """`col` with the read preference / concern configured for `endpoint`."""
+    profile = MONGO_READS[ENDPOINT_READS.get(endpoint, "primary")]
+    return col.with_options(**profile)
+
+
+def writing(col, profile):
+    """`col` with one of the MONGO_WRITES write concerns."""
+    return col.with_options(write_concern=MONGO_WRITES[profile])
+
+
+def ensure_index(col, keys, **kwargs):
+    """create_index(), where the same index already built under another name
+    (e.g. by the mongosh setup in the README) counts as present."""
+    try:
+        col.create_index(keys, **kwargs)
+    except OperationFailure as e:
+        if e.code != 85:  # IndexOptionsConflict: same keys, different name
+            raise
+
+
+def mongo_stats():
+    return command_listener.stats()
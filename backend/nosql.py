@@ -1,25 +1,84 @@
 # nosql.py
+import atexit
+import logging
+import re
 from flask import Blueprint, request, jsonify
-from pymongo import MongoClient
+from pymongo import ASCENDING, DESCENDING, ReturnDocument
+from pymongo.errors import BulkWriteError, ExecutionTimeout
+from bson import ObjectId
+from bson.errors import InvalidId
 from datetime import datetime
-from db import get_connection
+from titles import title_cards, get_title_cards
+from cache import cached, invalidate_tags
+from mongo import reviews_col, watchlists_col, logs_col, ensure_index, op_ms, writing, mongo_stats
+import review_stats
+import trending
+from log_buffer import PartialFlush, WriteBehindQueue, LOG_BUFFER_CONFIG
+from pagination import read_page_args, page_response
+from tokens import require_user
 
 nosql_bp = Blueprint("nosql", __name__)
-
-# --- Mongo client / DB ---
-client = MongoClient("mongodb://localhost:27017")  # adjust if needed
-db = client["project2_nosql"]  # separate logical DB for NoSQL part
-
-reviews_col = db["reviews"]
-watchlists_col = db["watchlists"]
-logs_col = db["search_logs"]
+log = logging.getLogger(__name__)
+
+# paged review listing: sort orders follow the reviews indexes
+# {tconst: 1, created_at: -1} and {tconst: 1, stars: -1, created_at: -1}
+REVIEW_SORTS = {
+    "newest": {"created_at": -1, "_id": -1},
+    "stars": {"stars": -1, "created_at": -1, "_id": -1},
+}
+REVIEW_SNIPPET_LEN = 280
+REVIEW_SEARCH_MAX_RESULTS = 1000
+
+
+_log_writer = writing(logs_col, "telemetry")
+
+
+def _record_trending(docs):
+  # best effort: the logs are stored either way, so a counter failure must
+  # not turn the flush into a failed / partial one
+  try:
+    trending.record_many((doc["q"], doc["ts"]) for doc in docs)
+  except Exception:
+    log.exception("trending update for %d search logs failed", len(docs))
+
+
+def _write_search_logs(batch):
+  try:
+    _log_writer.insert_many(batch, ordered=False)
+  except BulkWriteError as e:
+    # unordered: every document not listed in writeErrors was inserted
+    failed = {err["index"] for err in e.details.get("writeErrors", [])}
+    inserted = [doc for i, doc in enumerate(batch) if i not in failed]
+    _record_trending(inserted)
+    raise PartialFlush(e.details.get("nInserted", len(inserted)), e) from e
+  _record_trending(batch)
+
+
+# search logs are telemetry: queue them and write in batches off the request thread
+search_log_queue = WriteBehindQueue(
+    _write_search_logs, name="search-log-writer", **LOG_BUFFER_CONFIG
+)
+atexit.register(search_log_queue.close)
+
+
+def ensure_indexes():
+  """Create the indexes the Mongo endpoints rely on. Idempotent; app.py calls
+  it at startup."""
+  # REVIEW_SORTS orders (same keys as the README's mongosh setup)
+  ensure_index(reviews_col, [("tconst", ASCENDING), ("created_at", DESCENDING)])
+  ensure_index(
+      reviews_col, [("tconst", ASCENDING), ("stars", DESCENDING), ("created_at", DESCENDING)]
+  )
+  review_stats.ensure_indexes()
+  trending.ensure_indexes()
 
 
 def _now_iso():
   return datetime.utcnow()
 
 
-def _clean_review(doc):
+def clean_review(doc):
+  """Review document shaped for the API (string id); also used by export.py."""
   return {
       "id": str(doc.get("_id")),
       "tconst": doc.get("tconst"),
@@ -34,18 +93,254 @@ def _clean_review(doc):
   }
 
 
+@nosql_bp.errorhandler(ExecutionTimeout)
+def mongo_timeout(e):
+  # maxTimeMS (see MONGO_TIMEOUTS in mongo.py) ran out
+  return jsonify({"error": "database query timed out"}), 503
+
+
 # ==========================
 #  REVIEWS API (Mongo)
 # ==========================
 
 @nosql_bp.get("/api/reviews/<tconst>")
+@cached(ttl=60, tags=lambda tconst: [f"reviews:{tconst}"])
 def get_reviews(tconst):
-  """Return all reviews for a given movie."""
-  docs = list(reviews_col.find({"tconst": tconst}))
-  return jsonify([_clean_review(d) for d in docs]), 200
+  """Return reviews for a given movie.
+
+  Without paging params this returns the full list (old behaviour).
+  Query params (any of them switch to the paged response):
+    limit   - page size (default 20, max 100)
+    cursor  - next_cursor from the previous page
+    sort    - newest (default) or stars
+    text    - snippet (default, first REVIEW_SNIPPET_LEN chars) or full
+
+  Paged response: {"summary": {count, avgStars, histogram},
+                   "items": [...], "limit": n, "next_cursor": "..."}
+  """
+  if not any(k in request.args for k in ("limit", "cursor", "sort", "text")):
+    docs = list(reviews_col.find({"tconst": tconst}).max_time_ms(op_ms("read")))
+    return jsonify([clean_review(d) for d in docs]), 200
+
+  try:
+    _, limit, cursor = read_page_args(request.args, default_limit=20, max_limit=100)
+  except ValueError as e:
+    return jsonify({"error": str(e)}), 400
+
+  sort = request.args.get("sort") or "newest"
+  if sort not in REVIEW_SORTS:
+    return jsonify({"error": f"sort must be one of {', '.join(REVIEW_SORTS)}"}), 400
+  full_text = request.args.get("text") == "full"
+
+  match = {"tconst": tconst}
+  if cursor:
+    try:
+      match.update(_review_after(sort, cursor))
+    except (TypeError, ValueError, InvalidId):
+      return jsonify({"error": "invalid cursor"}), 400
+
+  project = {
+      "tconst": 1, "user_id": 1, "username": 1, "stars": 1, "spoiler": 1,
+      "tags": 1, "created_at": 1, "updated_at": 1, "text": 1,
+  }
+  if not full_text:
+    # cut the (up to 2000 char) text server-side so list views stay small
+    project["text"] = {"$substrCP": ["$text", 0, REVIEW_SNIPPET_LEN]}
+    project["truncated"] = {
+        "$gt": [{"$strLenCP": {"$ifNull": ["$text", ""]}}, REVIEW_SNIPPET_LEN]
+    }
+
+  pipeline = [
+      {"$match": match},
+      {"$sort": REVIEW_SORTS[sort]},
+      {"$limit": limit + 1},
+      {"$project": project},
+  ]
+  docs = list(reviews_col.aggregate(pipeline, maxTimeMS=op_ms("aggregate")))
+
+  next_key = None
+  if len(docs) > limit:
+    docs = docs[:limit]
+    last = docs[-1]
+    next_key = [last["created_at"].isoformat(), str(last["_id"])]
+    if sort == "stars":
+      next_key.insert(0, last.get("stars", 0))
+
+  items = []
+  for d in docs:
+    item = clean_review(d)
+    item["truncated"] = d.get("truncated", False)
+    items.append(item)
+
+  stats = review_stats.get_stats(tconst) or {}
+  out = page_response(items, limit, next_key)
+  out["summary"] = {
+      "count": stats.get("reviewCount", 0),
+      "avgStars": round(stats["avgStars"], 2) if stats.get("avgStars") is not None else None,
+      "histogram": stats.get("hist", {}),
+  }
+  return jsonify(out), 200
+
+
+def _review_after(sort, cursor):
+  """Keyset condition for the page after `cursor` (see REVIEW_SORTS)."""
+  if sort == "stars":
+    stars, created, oid = cursor
+  else:
+    created, oid = cursor
+  created = datetime.fromisoformat(created)
+  oid = ObjectId(oid)
+  after_created = [
+      {"created_at": {"$lt": created}},
+      {"created_at": created, "_id": {"$lt": oid}},
+  ]
+  if sort != "stars":
+    return {"$or": after_created}
+  return {"$or": [
+      {"stars": {"$lt": stars}},
+      {"stars": stars, "$or": after_created},
+  ]}
+
+
+def review_summary(tconst, latest=5):
+  """Count / average stars plus the newest few reviews for one title.
+  Used by /api/title/<tconst>?fields=reviews."""
+  stats = review_stats.get_stats(tconst) or {}
+  docs = (
+      reviews_col
+      .find({"tconst": tconst})
+      .sort("created_at", -1)
+      .limit(latest)
+      .max_time_ms(op_ms("read"))
+  )
+  return {
+      "count": stats.get("reviewCount", 0),
+      "avgStars": round(stats["avgStars"], 2) if stats.get("avgStars") is not None else None,
+      "histogram": stats.get("hist", {}),
+      "latest": [clean_review(d) for d in docs],
+  }
+
+
+def _search_terms(q):
+  """Plain terms from a $text query (drops negated -terms and operators)."""
+  return [
+      t.lower() for t in re.findall(r"-?[\w']+", q)
+      if not t.startswith("-") and len(t) > 1
+  ]
+
+
+def _snippet(text, terms, width=REVIEW_SNIPPET_LEN):
+  """Cut `text` around the first matching term and return the snippet plus
+  [start, end] offsets of every term match inside it. Terms match as word
+  prefixes, roughly like the text index's stemming."""
+  if not text:
+    return "", []
+  pattern = re.compile(
+      r"\b(" + "|".join(re.escape(t) for t in terms) + r")\w*", re.IGNORECASE
+  ) if terms else None
+
+  start = 0
+  first = pattern.search(text) if pattern else None
+  if first and len(text) > width:
+    start = max(0, min(first.start() - width // 3, len(text) - width))
+  snippet = text[start:start + width]
+
+  highlights = []
+  if pattern:
+    highlights = [[m.start(), m.end()] for m in pattern.finditer(snippet)]
+  if start > 0:
+    snippet = "…" + snippet
+    highlights = [[s + 1, e + 1] for s, e in highlights]
+  if start + width < len(text):
+    snippet += "…"
+  return snippet, highlights
+
+
+@nosql_bp.get("/api/reviews/search")
+def search_reviews():
+  """Full-text search over review text using the reviews text index.
+
+  Query params:
+    q          - search string (required; supports "phrases" and -negation)
+    tconst     - only this title
+    tags       - comma list, review must have all of them
+    spoiler    - 0 / 1
+    min_stars, max_stars
+    limit      - page size (default 20, max 50)
+    page       - 1-based page number (textScore order can't be keyset-paged)
+
+  Each hit carries a relevance `score`, a `snippet` around the first match
+  with `highlights` ([start, end] offsets), and the title name/year.
+  """
+  q = (request.args.get("q") or "").strip()
+  if not q:
+    return jsonify({"error": "q is required"}), 400
+
+  limit = min(max(request.args.get("limit", default=20, type=int), 1), 50)
+  page = max(request.args.get("page", default=1, type=int), 1)
+  if page * limit > REVIEW_SEARCH_MAX_RESULTS:
+    return jsonify({"error": f"only the first {REVIEW_SEARCH_MAX_RESULTS} results can be paged"}), 400
+
+  match = {"$text": {"$search": q}}
+  tconst = (request.args.get("tconst") or "").strip()
+  if tconst:
+    match["tconst"] = tconst
+  tags = [t.strip() for t in (request.args.get("tags") or "").split(",") if t.strip()]
+  if tags:
+    match["tags"] = {"$all": tags}
+  spoiler = request.args.get("spoiler")
+  if spoiler in ("0", "1"):
+    match["spoiler"] = {"$eq": True} if spoiler == "1" else {"$ne": True}
+  stars = {}
+  min_stars = request.args.get("min_stars", type=float)
+  max_stars = request.args.get("max_stars", type=float)
+  if min_stars is not None:
+    stars["$gte"] = min_stars
+  if max_stars is not None:
+    stars["$lte"] = max_stars
+  if stars:
+    match["stars"] = stars
+
+  pipeline = [
+      {"$match": match},
+      {"$sort": {"score": {"$meta": "textScore"}, "_id": -1}},
+      {"$skip": (page - 1) * limit},
+      {"$limit": limit + 1},
+      {"$addFields": {"score": {"$meta": "textScore"}}},
+  ]
+  docs = list(reviews_col.aggregate(pipeline, maxTimeMS=op_ms("search")))
+  has_more = len(docs) > limit
+  docs = docs[:limit]
+
+  # one batched MySQL lookup for every title on the page
+  cards = get_title_cards({d["tconst"] for d in docs})
+  terms = _search_terms(q)
+
+  items = []
+  for d in docs:
+    item = clean_review(d)
+    item["score"] = round(d.get("score", 0), 4)
+    item["snippet"], item["highlights"] = _snippet(d.get("text", ""), terms)
+    del item["text"]
+    card = cards.get(d["tconst"])
+    item["title"] = card["title"] if card else None
+    item["year"] = card["year"] if card else None
+    items.append(item)
+
+  return jsonify({
+      "items": items,
+      "page": page,
+      "limit": limit,
+      "has_more": has_more,
+  }), 200
+
+
+def _body_user_id():
+  return (request.get_json(silent=True) or {}).get("user_id")
 
 
 @nosql_bp.post("/api/reviews/<tconst>")
+@require_user(_body_user_id)
 def upsert_review(tconst):
   """Create or update a review for a movie by user_id."""
 
@@ -62,7 +357,8 @@ def upsert_review(tconst):
 
   now = _now_iso()
 
-  result = reviews_col.find_one_and_update(
+  # BEFORE so we know the old star value for the review_stats delta
+  before = reviews_col.find_one_and_update(
       {
           "tconst": tconst,
           "user_id": user_id,
@@ -83,20 +379,31 @@ def upsert_review(tconst):
           },
       },
       upsert=True,
-      return_document=True,
+      return_document=ReturnDocument.BEFORE,
+      maxTimeMS=op_ms("write"),
+  )
+  review_stats.apply_change(
+      tconst, before.get("stars", 0) if before else None, stars
   )
 
-  # result might be None if older pymongo; re-query if needed
-  if result is None:
-    result = reviews_col.find_one({"tconst": tconst, "user_id": user_id})
+  result = reviews_col.find_one(
+      {"tconst": tconst, "user_id": user_id}, max_time_ms=op_ms("read")
+  )
 
-  return jsonify(_clean_review(result)), 200
+  invalidate_tags(f"reviews:{tconst}", "top_rated")
+  return jsonify(clean_review(result)), 200
 
 
 @nosql_bp.delete("/api/reviews/<tconst>/<int:user_id>")
+@require_user()
 def delete_review(tconst, user_id):
   """Delete a user's review for a movie."""
-  reviews_col.delete_one({"tconst": tconst, "user_id": user_id})
+  deleted = reviews_col.find_one_and_delete(
+      {"tconst": tconst, "user_id": user_id}, maxTimeMS=op_ms("write")
+  )
+  if deleted:
+    review_stats.apply_change(tconst, deleted.get("stars", 0), None)
+  invalidate_tags(f"reviews:{tconst}", "top_rated")
   return jsonify({"message": "deleted"}), 200
 
 
@@ -106,8 +413,9 @@ def delete_review(tconst, user_id):
 # ==========================
 
 @nosql_bp.get("/api/watchlist/<int:user_id>")
+@require_user()
 def get_watchlist(user_id):
-    doc = watchlists_col.find_one({"user_id": user_id})
+    doc = watchlists_col.find_one({"user_id": user_id}, max_time_ms=op_ms("read"))
     if not doc or not doc.get("items"):
         return jsonify([]), 200
 
@@ -116,48 +424,21 @@ def get_watchlist(user_id):
     if not tconsts:
         return jsonify([]), 200
 
-    conn = get_connection()
-    cur = conn.cursor(dictionary=True)
-
-    format_strings = ",".join(["%s"] * len(tconsts))
-    cur.execute(
-        f"""
-        SELECT
-          t.tconst,
-          t.primaryTitle AS title,
-          t.startYear    AS year,
-          t.averageRating AS rating,
-          GROUP_CONCAT(DISTINCT g.genreName ORDER BY g.genreName) AS genres
-        FROM Title t
-        LEFT JOIN HasGenre hg ON hg.tconst = t.tconst
-        LEFT JOIN Genre    g  ON g.genreID = hg.genreID
-        WHERE t.tconst IN ({format_strings})
-        GROUP BY
-          t.tconst,
-          t.primaryTitle,
-          t.startYear,
-          t.averageRating
-        """,
-        tconsts,
-    )
-    rows = cur.fetchall()
-    cur.close()
-    conn.close()
-
-    result = []
-    for r in rows:
-        genres_list = r["genres"].split(",") if r["genres"] else []
-        result.append({
-            "tconst": r["tconst"],
-            "title":  r["title"],
-            "year":   r["year"],
-            "genres": genres_list,
-            "rating": r["rating"],
-        })
+    result = [
+        {
+            "tconst": c["tconst"],
+            "title":  c["title"],
+            "year":   c["year"],
+            "genres": c["genres"],
+            "rating": c["rating"],
+        }
+        for c in title_cards(tconsts)
+    ]
 
     return jsonify(result), 200
 
 @nosql_bp.post("/api/watchlist/<int:user_id>")
+@require_user()
 def add_watchlist_item(user_id):
     data = request.get_json() or {}
     tconst = (data.get("tconst") or "").strip()
@@ -186,6 +467,7 @@ def add_watchlist_item(user_id):
 
 
 @nosql_bp.delete("/api/watchlist/<int:user_id>")
+@require_user()
 def remove_watchlist_item(user_id):
     data = request.get_json() or {}
     tconst = (data.get("tconst") or "").strip()
@@ -202,6 +484,7 @@ def remove_watchlist_item(user_id):
 
 
 @nosql_bp.post("/api/search_logs/<int:user_id>")
+@require_user()
 def log_search(user_id):
     data = request.get_json() or {}
     q = (data.get("q") or "").strip()
@@ -215,16 +498,31 @@ def log_search(user_id):
         "q": q,
         "ts": _now_iso(),
     }
-    logs_col.insert_one(doc)
-    return jsonify({"message": "logged"}), 201
+    if not search_log_queue.put(doc):
+        return jsonify({"error": "search log queue is full, not logged"}), 503
+    return jsonify({"message": "queued"}), 202
+
+@nosql_bp.get("/api/metrics/search_log_queue")
+def get_search_log_queue_metrics():
+    """Queued / flushed / dropped counters for the search log writer."""
+    return jsonify(search_log_queue.stats()), 200
+
+
+@nosql_bp.get("/api/metrics/mongo")
+def get_mongo_metrics():
+    """Command counts and the most recent slow Mongo operations."""
+    return jsonify(mongo_stats()), 200
+
 
 @nosql_bp.get("/api/search_logs/<int:user_id>")
+@require_user()
 def get_user_logs(user_id):
     cursor = (
         logs_col
         .find({"user_id": user_id})
         .sort("ts", -1)
         .limit(200)
+        .max_time_ms(op_ms("read"))
     )
     out = []
     for d in cursor:
@@ -235,30 +533,31 @@ def get_user_logs(user_id):
     return jsonify(out), 200
 
 @nosql_bp.get("/api/search_trending")
+@cached(ttl=30, tags=lambda: ["trending"])
 def get_trending_searches():
     """
-    Return globally trending search queries based on recent logs.
-    TTL on search_logs (ts field) ensures these only cover the last N days.
-    
+    Return globally trending search queries from the bucketed counters in
+    search_trends (see trending.py), not from the raw logs.
+
     Query params (optional):
       limit      - max number of rows (default 10)
-      min_count  - minimum occurrences to be considered trending (default 2)
+      min_count  - minimum occurrences to be considered trending (default 1)
+      window     - 1h, 24h or 7d (default 24h)
+      decay      - 1 (default) weights recent buckets higher, 0 ranks by raw count
     """
     limit = request.args.get("limit", type=int) or 10
     min_count = request.args.get("min_count", type=int) or 1
+    window = request.args.get("window") or trending.DEFAULT_WINDOW
+    decay = request.args.get("decay", default="1") not in ("0", "false")
 
-    pipeline = [
-        {"$group": {"_id": "$q", "count": {"$sum": 1}}},
-        {"$match": {"count": {"$gte": min_count}}},
-        {"$sort": {"count": -1}},
-        {"$limit": limit},
-    ]
+    if window not in trending.WINDOWS:
+        return jsonify({"error": f"window must be one of {', '.join(trending.WINDOWS)}"}), 400
 
-    docs = list(logs_col.aggregate(pipeline))
-    out = [{"q": d.get("_id", ""), "count": d.get("count", 0)} for d in docs]
+    out = trending.trending(window, limit=limit, min_count=min_count, decay=decay)
     return jsonify(out), 200
 
 @nosql_bp.get("/api/top_user_rated")
+@cached(ttl=60, tags=lambda: ["top_rated"])
 def get_top_user_rated():
     """
     Returns top movies ranked by average user 'stars' from Mongo reviews.
@@ -269,52 +568,14 @@ def get_top_user_rated():
     limit = request.args.get("limit", default=10, type=int)
     min_reviews = request.args.get("min_reviews", default=2, type=int)
 
-    pipeline = [
-        {
-            "$group": {
-                "_id": "$tconst",
-                "avgStars": {"$avg": "$stars"},
-                "reviewCount": {"$sum": 1},
-            }
-        },
-        {"$match": {"reviewCount": {"$gte": min_reviews}}},
-        {"$sort": {"avgStars": -1, "reviewCount": -1}},
-        {"$limit": limit},
-    ]
-
-    agg = list(reviews_col.aggregate(pipeline))
+    # indexed read of the incrementally maintained review_stats collection
+    agg = review_stats.top_rated(limit, min_reviews)
 
     if not agg:
         return jsonify([]), 200
 
     tconsts = [doc["_id"] for doc in agg]
-
-    conn = get_connection()
-    cur = conn.cursor(dictionary=True)
-
-    format_strings = ",".join(["%s"] * len(tconsts))
-    cur.execute(
-        f"""
-        SELECT
-          t.tconst,
-          t.primaryTitle AS title,
-          t.startYear    AS year,
-          t.averageRating AS rating,
-          GROUP_CONCAT(DISTINCT g.genreName ORDER BY g.genreName) AS genres
-        FROM Title t
-        LEFT JOIN HasGenre hg ON hg.tconst = t.tconst
-        LEFT JOIN Genre    g  ON g.genreID = hg.genreID
-        WHERE t.tconst IN ({format_strings})
-        GROUP BY
-          t.tconst, t.primaryTitle, t.startYear, t.averageRating
-        """,
-        tconsts,
-    )
-    rows = cur.fetchall()
-    cur.close()
-    conn.close()
-
-    row_by_tconst = {r["tconst"]: r for r in rows}
+    row_by_tconst = get_title_cards(tconsts)
 
     result = []
     for doc in agg:
@@ -325,14 +586,13 @@ def get_top_user_rated():
         if not r:
             continue
 
-        genres_list = r["genres"].split(",") if r["genres"] else []
         result.append({
             "tconst": tconst,
             "title": r["title"],
             "year": r["year"],
-            "genres": genres_list,
-            "rating_system": r["rating"],     
-            "rating_users": round(avg_stars, 1),  
+            "genres": r["genres"],
+            "rating_system": r["rating"],
+            "rating_users": round(avg_stars, 1),
             "reviewCount": count,
         })
 
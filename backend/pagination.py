@@ -0,0 +1,60 @@
+# pagination.py
+"""
+Keyset (cursor) pagination helpers.
+
+A cursor is the sort key of the last row on the previous page, JSON-encoded and
+base64url'd so clients treat it as opaque. Routes add a
+"(sort cols) > (cursor values)" condition instead of OFFSET, so page 500
+costs the same as page 1.
+
+Paging is opt-in: list endpoints only switch to the
+{"items": [...], "limit": n, "next_cursor": "..."} envelope when the caller
+passes `limit` or `cursor`, so older callers that expect a bare list still work.
+"""
+import base64
+import json
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 200
+
+
+def encode_cursor(values):
+    raw = json.dumps(values, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def decode_cursor(token):
+    """Inverse of encode_cursor. Raises ValueError on anything malformed."""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except Exception:
+        raise ValueError("invalid cursor")
+    if not isinstance(values, list):
+        raise ValueError("invalid cursor")
+    return values
+
+
+def read_page_args(args, default_limit=DEFAULT_LIMIT, max_limit=MAX_LIMIT):
+    """Parse `limit` / `cursor` from request.args.
+
+    Returns (paged, limit, cursor_values). `paged` is False when neither
+    param was given, in which case cursor_values is None and the caller keeps
+    its legacy response shape.
+    """
+    paged = "limit" in args or "cursor" in args
+    limit = args.get("limit", type=int) or default_limit
+    limit = max(1, min(limit, max_limit))
+    token = args.get("cursor") or ""
+    cursor = decode_cursor(token) if token else None
+    return paged, limit, cursor
+
+
+def page_response(items, limit, next_key):
+    """Build the paged envelope. next_key is the sort key of the last row,
+    or None when there are no more rows."""
+    return {
+        "items": items,
+        "limit": limit,
+        "next_cursor": encode_cursor(next_key) if next_key is not None else None,
+    }
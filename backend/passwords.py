@@ -0,0 +1,125 @@
+# passwords.py
+"""
+Password hashing for register / login / profile updates.
+
+PASSWORD_CONFIG["scheme"] picks the KDF for new hashes:
+  scrypt - Werkzeug's scrypt with the n / r / p below (default)
+  argon2 - argon2id via the optional `argon2-cffi` package
+Existing hashes of any supported kind (Werkzeug pbkdf2 / scrypt, argon2)
+keep verifying. After a successful login, needs_rehash() says whether the
+stored hash was made with a different scheme or different parameters, and
+auth.py then stores a fresh hash, so changing the config upgrades users as
+they log in.
+
+Hashing is deliberately slow and memory hungry (scrypt n=2^15, r=8 takes
+~32 MB per hash), so it runs on a small dedicated pool of
+PASSWORD_CONFIG["workers"] threads instead of on every request thread. At
+most `max_pending` hash jobs may be queued. Beyond that, or after
+`wait_timeout` seconds, hash_password / check_password raise PasswordBusy
+(auth.py answers 503). A burst of logins then can't use up all the
+CPU / memory the other endpoints need.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+try:
+    from argon2 import PasswordHasher
+    from argon2.exceptions import InvalidHashError, VerificationError
+except ImportError:  # optional dependency
+    PasswordHasher = None
+
+PASSWORD_CONFIG = {
+    "scheme": "scrypt",
+    "scrypt": {"n": 2 ** 15, "r": 8, "p": 1},
+    "argon2": {"time_cost": 3, "memory_cost": 65536, "parallelism": 1},
+    "workers": 4,          # KDF threads
+    "max_pending": 64,     # queued + running hash jobs before PasswordBusy
+    "wait_timeout": 10,    # seconds a request waits for its hash job
+}
+
+
+class PasswordBusy(Exception):
+    """Too many hash jobs queued; try again later."""
+
+
+_pool = ThreadPoolExecutor(max_workers=PASSWORD_CONFIG["workers"],
+                           thread_name_prefix="password-kdf")
+_slots = threading.BoundedSemaphore(PASSWORD_CONFIG["max_pending"])
+_dummy_hash = None
+
+
+def _scrypt_method():
+    c = PASSWORD_CONFIG["scrypt"]
+    return f"scrypt:{c['n']}:{c['r']}:{c['p']}"
+
+
+def _argon2():
+    if PasswordHasher is None:
+        raise RuntimeError("PASSWORD_CONFIG['scheme'] is argon2 but argon2-cffi is not installed")
+    return PasswordHasher(**PASSWORD_CONFIG["argon2"])
+
+
+def _hash(password):
+    if PASSWORD_CONFIG["scheme"] == "argon2":
+        return _argon2().hash(password)
+    return generate_password_hash(password, method=_scrypt_method())
+
+
+def _verify(stored, password):
+    if stored.startswith("$argon2"):
+        if PasswordHasher is None:
+            return False
+        try:
+            return PasswordHasher().verify(stored, password)
+        except (VerificationError, InvalidHashError):
+            return False
+    return check_password_hash(stored, password)
+
+
+def _run(fn, *args):
+    if not _slots.acquire(blocking=False):
+        raise PasswordBusy()
+    try:
+        future = _pool.submit(fn, *args)
+    except BaseException:
+        _slots.release()
+        raise
+    future.add_done_callback(lambda _: _slots.release())
+    try:
+        return future.result(timeout=PASSWORD_CONFIG["wait_timeout"])
+    except FutureTimeout:
+        raise PasswordBusy()
+
+
+def hash_password(password):
+    """Hash with the configured scheme (on the KDF pool)."""
+    return _run(_hash, password)
+
+
+def check_password(stored, password):
+    """Verify a password (on the KDF pool). stored=None (unknown user) still
+    does one hash's worth of work so the response time doesn't reveal it."""
+    global _dummy_hash
+    if stored is None:
+        if _dummy_hash is None:
+            _dummy_hash = _run(_hash, "dummy password")
+        _run(_verify, _dummy_hash, password)
+        return False
+    return _run(_verify, stored, password)
+
+
+def needs_rehash(stored):
+    """True if `stored` wasn't made with the current scheme / parameters."""
+    if PASSWORD_CONFIG["scheme"] == "argon2":
+        if PasswordHasher is None:
+            return False
+        if not stored.startswith("$argon2"):
+            return True
+        try:
+            return _argon2().check_needs_rehash(stored)
+        except InvalidHashError:
+            return True
+    return stored.split("$", 1)[0] != _scrypt_method()
@@ -0,0 +1,157 @@
+# review_stats.py
+"""
+Per-title review aggregates kept in the `review_stats` collection:
+
+    { _id: "tt0111161", starsSum: 37, reviewCount: 4, avgStars: 9.25,
+      hist: {"8": 1, "9": 1, "10": 2}, updated_at: ... }
+
+upsert_review / delete_review call apply_change(tconst, old_stars, new_stars)
+which updates the document with one atomic pipeline update (so the sum,
+count, histogram and average can't drift apart under concurrent writes).
+/api/top_user_rated then reads the top of the (avgStars, reviewCount) index
+instead of $group-ing every review on each request.
+
+The review write and the stats update are two separate operations, so a
+crash in between can leave a title off by one review. Repair with:
+
+    python review_stats.py --rebuild            # everything
+    python review_stats.py tt0111161 tt0068646  # specific titles
+"""
+import sys
+from datetime import datetime
+
+from pymongo import DESCENDING, ReplaceOne
+
+from mongo import reviews_col, review_stats_col, ensure_index, op_ms, reading
+
+
+def ensure_indexes():
+    """The (avgStars, reviewCount) index top_rated() reads. Called at app
+    startup through nosql.ensure_indexes()."""
+    ensure_index(
+        review_stats_col,
+        [("avgStars", DESCENDING), ("reviewCount", DESCENDING)],
+        name="avgStars_reviewCount",
+    )
+
+
+def _bucket(stars):
+    return str(int(round(stars)))
+
+
+def _ifnull(field):
+    return {"$ifNull": [f"${field}", 0]}
+
+
+def apply_change(tconst, old_stars, new_stars):
+    """Fold one review insert/update/delete into the title's stats.
+
+    old_stars is None for a new review, new_stars is None for a delete.
+    """
+    if old_stars is None and new_stars is None:
+        return
+
+    d_count = (new_stars is not None) - (old_stars is not None)
+    d_sum = (new_stars or 0) - (old_stars or 0)
+
+    fields = {
+        "starsSum": {"$add": [_ifnull("starsSum"), d_sum]},
+        "reviewCount": {"$add": [_ifnull("reviewCount"), d_count]},
+        "updated_at": datetime.utcnow(),
+    }
+    hist = {}
+    if old_stars is not None:
+        hist[_bucket(old_stars)] = hist.get(_bucket(old_stars), 0) - 1
+    if new_stars is not None:
+        hist[_bucket(new_stars)] = hist.get(_bucket(new_stars), 0) + 1
+    for key, delta in hist.items():
+        if delta:
+            fields[f"hist.{key}"] = {"$add": [_ifnull(f"hist.{key}"), delta]}
+
+    review_stats_col.update_one(
+        {"_id": tconst},
+        [
+            {"$set": fields},
+            {"$set": {
+                "avgStars": {
+                    "$cond": [
+                        {"$gt": ["$reviewCount", 0]},
+                        {"$divide": ["$starsSum", "$reviewCount"]},
+                        None,
+                    ]
+                }
+            }},
+        ],
+        upsert=True,
+    )
+
+
+def get_stats(tconst):
+    return review_stats_col.find_one({"_id": tconst}, max_time_ms=op_ms("read"))
+
+
+def top_rated(limit, min_reviews):
+    """Highest avgStars first, ties broken by reviewCount (index order)."""
+    return list(
+        reading(review_stats_col, "top_user_rated")
+        .find({"reviewCount": {"$gte": max(min_reviews, 1)}})
+        .sort([("avgStars", DESCENDING), ("reviewCount", DESCENDING)])
+        .limit(limit)
+        .max_time_ms(op_ms("read"))
+    )
+
+
+def rebuild(tconsts=None):
+    """Recompute stats from the reviews collection (all titles or a subset)."""
+    match = {"tconst": {"$in": list(tconsts)}} if tconsts else {}
+    pipeline = [
+        {"$match": match},
+        {"$group": {
+            "_id": {"tconst": "$tconst", "stars": "$stars"},
+            "n": {"$sum": 1},
+        }},
+    ]
+
+    stats = {}
+    for row in reviews_col.aggregate(pipeline, allowDiskUse=True):
+        tconst = row["_id"]["tconst"]
+        stars = row["_id"]["stars"] or 0
+        s = stats.setdefault(tconst, {"starsSum": 0, "reviewCount": 0, "hist": {}})
+        s["starsSum"] += stars * row["n"]
+        s["reviewCount"] += row["n"]
+        key = _bucket(stars)
+        s["hist"][key] = s["hist"].get(key, 0) + row["n"]
+
+    now = datetime.utcnow()
+    ops = [
+        ReplaceOne(
+            {"_id": tconst},
+            {
+                **s,
+                "avgStars": s["starsSum"] / s["reviewCount"],
+                "updated_at": now,
+            },
+            upsert=True,
+        )
+        for tconst, s in stats.items()
+    ]
+    for i in range(0, len(ops), 1000):
+        review_stats_col.bulk_write(ops[i:i + 1000], ordered=False)
+
+    # drop stats for titles that no longer have any reviews
+    if tconsts:
+        review_stats_col.delete_many(
+            {"_id": {"$in": list(tconsts), "$nin": list(stats)}}
+        )
+    else:
+        review_stats_col.delete_many({"updated_at": {"$lt": now}})
+    return len(stats)
+
+
+if __name__ == "__main__":
+    ensure_indexes()
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    if "--rebuild" in sys.argv or args:
+        print(f"rebuilt stats for {rebuild(args or None)} titles")
+    else:
+        print(__doc__)
@@ -0,0 +1,289 @@
+# search.py
+"""
+In-process trigram index over Title.primaryTitle / originalTitle and TitleAkas.
+
+/api/movies?q= used to run LOWER(...) LIKE '%q%' which can't use an index and
+scans `title` on every keystroke. Instead we keep an inverted index
+trigram -> set(doc ids) in memory, intersect the postings for the query's
+trigrams and verify the substring on the (few) surviving candidates.
+
+The index is built in a background thread the first time it is needed, and
+then refreshed incrementally every `refresh_interval` seconds. The refresh
+re-reads titles whose title.changed_at (migrations/0005: set on insert,
+bumped on a rename or an AKA change) is past the last one indexed. It pages
+through (changed_at, tconst), not tconst alone, because tconst strings
+don't sort in insertion order (tt10000000 < tt9999999). Rows newer than
+`settle_seconds` are left for the next refresh, so a transaction that
+commits late with an older timestamp isn't skipped. Deleted titles drop out
+at the full rebuild every `full_rebuild_interval` seconds. Until the first
+build finishes callers get None back and fall back to the old SQL LIKE path.
+"""
+import logging
+import threading
+import time
+import unicodedata
+from collections import defaultdict
+
+from db import get_connection
+
+log = logging.getLogger(__name__)
+
+SEARCH_CONFIG = {
+    "enabled": True,
+    "include_akas": True,
+    "refresh_interval": 300,          # seconds between incremental refreshes
+    "full_rebuild_interval": 6 * 3600,  # seconds between full rebuilds (drops deleted titles)
+    "settle_seconds": 60,             # only read changes at least this old
+    "chunk_size": 50000,              # titles loaded per round-trip while building
+    "max_candidates": 5000,           # above this, /api/movies falls back to SQL
+}
+
+MIN_QUERY_LEN = 3  # shortest query the trigram index can answer
+
+
+def normalize(text):
+    """Lowercase and strip accents, like MySQL's utf8mb4_0900_ai_ci does."""
+    if not text:
+        return ""
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return " ".join(text.casefold().split())
+
+
+def trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class TitleSearchIndex:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._schedule_lock = threading.Lock()   # guards the _building check-and-set
+        self._doc_by_tconst = {}   # tconst -> doc id
+        self._docs = []            # doc id -> (tconst, primaryTitle, startYear, numVotes)
+        self._names = []           # doc id -> tuple of normalized names (primary first)
+        self._grams = defaultdict(set)
+        self._last_key = None      # (changed_at, tconst) of the newest indexed change
+
+        self.ready = False
+        self._building = False
+        self._last_refresh = 0.0   # monotonic time of the last build/refresh attempt
+        self._last_build = 0.0     # monotonic time of the last full build
+
+    # ---------- building ----------
+
+    def _add_doc(self, tconst, title, year, votes, names):
+        names = tuple(dict.fromkeys(n for n in (normalize(x) for x in names) if n))
+        doc_id = self._doc_by_tconst.get(tconst)
+        if doc_id is None:
+            doc_id = len(self._docs)
+            self._doc_by_tconst[tconst] = doc_id
+            self._docs.append((tconst, title, year, votes))
+            self._names.append(())
+        else:
+            self._remove_grams(doc_id)
+            self._docs[doc_id] = (tconst, title, year, votes)
+
+        self._names[doc_id] = names
+        for name in names:
+            for g in trigrams(name):
+                self._grams[g].add(doc_id)
+
+    def _remove_grams(self, doc_id):
+        for name in self._names[doc_id]:
+            for g in trigrams(name):
+                posting = self._grams.get(g)
+                if posting is not None:
+                    posting.discard(doc_id)
+                    if not posting:
+                        del self._grams[g]
+        self._names[doc_id] = ()
+
+    def _load(self, after, limit):
+        """Titles changed after `after` = (changed_at, tconst) or None, oldest
+        first: [(changed_at, tconst, primaryTitle, startYear, numVotes, [names])]."""
+        conn = get_connection()
+        try:
+            cur = conn.cursor()
+            where = "changed_at < NOW(6) - INTERVAL %s SECOND"
+            params = [SEARCH_CONFIG["settle_seconds"]]
+            if after is not None:
+                where += " AND (changed_at > %s OR (changed_at = %s AND tconst > %s))"
+                params += [after[0], after[0], after[1]]
+            cur.execute(
+                f"""
+                SELECT changed_at, tconst, primaryTitle, originalTitle, startYear, numVotes
+                FROM Title
+                WHERE {where}
+                ORDER BY changed_at, tconst
+                LIMIT %s
+                """,
+                params + [limit],
+            )
+            titles = cur.fetchall()
+            cur.close()
+
+            akas = defaultdict(list)
+            if SEARCH_CONFIG["include_akas"] and titles:
+                wanted = [t[1] for t in titles]
+                cur = conn.cursor()
+                for i in range(0, len(wanted), 1000):
+                    part = wanted[i:i + 1000]
+                    marks = ",".join(["%s"] * len(part))
+                    cur.execute(
+                        f"SELECT titleId, title FROM TitleAkas WHERE titleId IN ({marks})",
+                        part,
+                    )
+                    for title_id, aka in cur.fetchall():
+                        akas[title_id].append(aka)
+                cur.close()
+        finally:
+            conn.close()
+
+        return [
+            (changed_at, tconst, primary, year, votes or 0,
+             [primary, original] + akas.get(tconst, []))
+            for changed_at, tconst, primary, original, year, votes in titles
+        ]
+
+    def _append_new(self):
+        """(Re)index every title changed since the last one we've seen, in chunks."""
+        chunk = SEARCH_CONFIG["chunk_size"]
+        while True:
+            rows = self._load(self._last_key, chunk)
+            if not rows:
+                return
+            with self._lock:
+                for _changed, tconst, title, year, votes, names in rows:
+                    self._add_doc(tconst, title, year, votes, names)
+                self._last_key = (rows[-1][0], rows[-1][1])
+            if len(rows) < chunk:
+                return
+
+    def build(self):
+        """Full (re)build. Safe to call from a background thread."""
+        fresh = TitleSearchIndex()
+        fresh._append_new()
+        with self._lock:
+            self._doc_by_tconst = fresh._doc_by_tconst
+            self._docs = fresh._docs
+            self._names = fresh._names
+            self._grams = fresh._grams
+            self._last_key = fresh._last_key
+            self._last_refresh = self._last_build = time.monotonic()
+            self.ready = True
+
+    def refresh(self):
+        """Incremental refresh: pick up titles added or renamed since the last pass."""
+        self._append_new()
+        self._last_refresh = time.monotonic()
+
+    def _run_in_background(self, fn):
+        def runner():
+            try:
+                fn()
+            except Exception:  # keep serving from SQL / the old index if it fails
+                log.exception("search index %s failed", fn.__name__)
+            finally:
+                self._building = False
+
+        self._building = True
+        self._last_refresh = time.monotonic()  # also throttles retries after a failure
+        threading.Thread(target=runner, name="title-search-index", daemon=True).start()
+
+    def ensure_fresh(self):
+        """Kick off a build/refresh in the background if one is due."""
+        if not SEARCH_CONFIG["enabled"]:
+            return
+        with self._schedule_lock:
+            if self._building:
+                return
+            now = time.monotonic()
+            due = now - self._last_refresh > SEARCH_CONFIG["refresh_interval"]
+            if not self.ready and (due or self._last_refresh == 0.0):
+                self._run_in_background(self.build)
+            elif self.ready and due:
+                if now - self._last_build > SEARCH_CONFIG["full_rebuild_interval"]:
+                    self._run_in_background(self.build)
+                else:
+                    self._run_in_background(self.refresh)
+
+    # ---------- querying ----------
+
+    def _match(self, q):
+        """(doc, names) of every title whose names contain q (q already
+        normalized, len >= 3). Read in one locked section, so a build()
+        swapping in new lists can't mix doc ids of two indexes."""
+        with self._lock:
+            postings = []
+            for g in trigrams(q):
+                posting = self._grams.get(g)
+                if not posting:
+                    return []
+                postings.append(posting)
+            postings.sort(key=len)
+            candidates = set(postings[0])
+            for posting in postings[1:]:
+                candidates &= posting
+                if not candidates:
+                    return []
+            return [
+                (self._docs[d], self._names[d]) for d in candidates
+                if any(q in name for name in self._names[d])
+            ]
+
+    def _rank(self, names, q):
+        """Lower is better: exact, prefix, word-prefix, then plain substring."""
+        best = 3
+        for name in names:
+            if name == q:
+                best = 0
+                break
+            if name.startswith(q):
+                best = min(best, 1)
+            elif f" {q}" in name:
+                best = min(best, 2)
+        return best
+
+    def candidates(self, q):
+        """Set of tconsts containing q, or None if the index can't answer.
+
+        None means: index not ready, query too short, or too many matches to
+        be worth an IN (...) list. The caller should use the SQL path then.
+        """
+        q = normalize(q)
+        self.ensure_fresh()
+        if not self.ready or len(q) < MIN_QUERY_LEN:
+            return None
+        hits = self._match(q)
+        if len(hits) > SEARCH_CONFIG["max_candidates"]:
+            return None
+        return {doc[0] for doc, _names in hits}
+
+    def search(self, q, limit=10):
+        """Ranked typeahead results, or None if the index isn't ready yet."""
+        q = normalize(q)
+        self.ensure_fresh()
+        if not self.ready:
+            return None
+        if len(q) < MIN_QUERY_LEN:
+            return []
+        ranked = sorted(
+            self._match(q),
+            key=lambda hit: (self._rank(hit[1], q), -(hit[0][3] or 0), hit[0][1]),
+        )[:limit]
+        return [
+            {"tconst": doc[0], "title": doc[1], "year": doc[2], "numVotes": doc[3]}
+            for doc, _names in ranked
+        ]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "ready": self.ready,
+                "titles": len(self._doc_by_tconst),
+                "trigrams": len(self._grams),
+                "last_changed": self._last_key[0].isoformat() if self._last_key else None,
+            }
+
+
+title_index = TitleSearchIndex()
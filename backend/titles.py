@@ -0,0 +1,88 @@
+# titles.py
+"""
+Batch title "card" lookups (title, year, genres, rating) shared by
+POST /api/titles/batch, the watchlist and the top-user-rated list.
+
+- tconsts are de-duplicated and looked up in chunks of BATCH_CONFIG["chunk_size"]
+  so the IN (...) list never grows unbounded,
+- each card is cached per tconst, so a watchlist re-render only queries the
+  titles it hasn't seen recently; nothing in the API writes titles (only
+  imdb_import.py, in its own process), so changes show up once a card's
+  BATCH_CONFIG["cache_ttl"] runs out,
+- results come back in the order the caller asked for.
+"""
+from db import get_connection
+from cache import LRUBackend
+from genres import decode_mask
+
+BATCH_CONFIG = {
+    "max_batch": 500,      # most tconsts accepted by /api/titles/batch
+    "chunk_size": 100,     # tconsts per IN (...) query
+    "cache_ttl": 300,      # seconds a card stays cached
+    "cache_entries": 50000,
+}
+
+_cards = LRUBackend(max_entries=BATCH_CONFIG["cache_entries"])
+
+
+def _query_cards(conn, tconsts):
+    cur = conn.cursor(dictionary=True)
+    marks = ",".join(["%s"] * len(tconsts))
+    cur.execute(
+        f"""
+        SELECT
+          t.tconst,
+          t.primaryTitle AS title,
+          t.originalTitle,
+          t.startYear    AS year,
+          t.averageRating AS rating,
+          t.numVotes,
+          t.genre_mask
+        FROM Title t
+        WHERE t.tconst IN ({marks})
+        """,
+        tconsts,
+    )
+    rows = cur.fetchall()
+    cur.close()
+    return rows
+
+
+def get_title_cards(tconsts):
+    """Return {tconst: card} for every tconst that exists."""
+    wanted = list(dict.fromkeys(t for t in tconsts if t))
+    found = {}
+    missing = []
+    for tconst in wanted:
+        card = _cards.get(tconst)
+        if card is not None:
+            found[tconst] = card
+        else:
+            missing.append(tconst)
+
+    if missing:
+        conn = get_connection()
+        try:
+            chunk = BATCH_CONFIG["chunk_size"]
+            for i in range(0, len(missing), chunk):
+                for r in _query_cards(conn, missing[i:i + chunk]):
+                    card = {
+                        "tconst": r["tconst"],
+                        "title": r["title"],
+                        "originalTitle": r["originalTitle"],
+                        "year": r["year"],
+                        "genres": decode_mask(r["genre_mask"]),
+                        "rating": r["rating"],
+                        "numVotes": r["numVotes"],
+                    }
+                    _cards.set(card["tconst"], card, ttl=BATCH_CONFIG["cache_ttl"])
+                    found[card["tconst"]] = card
+        finally:
+            conn.close()
+    return found
+
+
+def title_cards(tconsts):
+    """Cards in the same order as `tconsts` (duplicates and unknowns dropped)."""
+    found = get_title_cards(tconsts)
+    return [found[t] for t in dict.fromkeys(tconsts) if t in found]
@@ -0,0 +1,267 @@
+# tokens.py
+"""
+Signed, expiring session tokens, so protected endpoints can authorize a
+request without reading the users row.
+
+/api/login and /api/register add a token pair to the user object they return:
+  access_token  - carries user_id / is_admin / is_active, valid for
+                  TOKEN_CONFIG["access_ttl"] seconds
+  refresh_token - carries only user_id, valid for refresh_ttl seconds.
+                  POST /api/token/refresh swaps it for a new pair. This is the
+                  one place the users row is read again, so a changed
+                  is_admin / is_active or a deleted user takes effect there.
+Tokens are itsdangerous signatures (HMAC, ships with Flask) over a small JSON
+payload, sent as `Authorization: Bearer <access_token>`.
+
+Revocation: admin_update_user / admin_delete_user / a password change call
+revoke(user_id). It stores the time in users.tokens_valid_after
+(migrations/0006) and rejects every access and refresh token the user got
+before that moment. A demoted, disabled or re-passworded user therefore
+can't mint new pairs from an old refresh token. The revoking process knows
+at once. Other workers read the column when refreshing, and for access
+tokens at most every TOKEN_CONFIG["revocation_check_ttl"] seconds per user,
+so the access path still doesn't read the users row on every request.
+Without the migration only the in-process record is used.
+
+TOKEN_CONFIG["enforce"] = True (default) requires a valid token on every
+protected endpoint. Setting it to False is only meant for local development
+against old clients: requests without a token are then let through, but a
+token that is sent must still verify and match the user_id it acts on.
+require_admin(always=True) ignores the setting (bulk exports).
+
+The signing key comes from the TOKEN_SECRET environment variable; importing
+this module without it raises, so the API refuses to start with a guessable
+key.
+"""
+import logging
+import os
+import threading
+import time
+from functools import wraps
+
+from flask import g, jsonify, request
+from itsdangerous import BadSignature, SignatureExpired, URLSafeTimedSerializer
+from mysql.connector import errorcode
+from mysql.connector.errors import ProgrammingError
+
+from db import get_connection, query_all
+
+log = logging.getLogger(__name__)
+
+TOKEN_CONFIG = {
+    "secret": os.environ.get("TOKEN_SECRET"),
+    "access_ttl": 15 * 60,           # seconds
+    "refresh_ttl": 7 * 24 * 3600,    # seconds
+    "revocation_check_ttl": 30,      # seconds an access check trusts its cached users.tokens_valid_after
+    "enforce": True,                 # require a token on protected endpoints
+}
+
+if not TOKEN_CONFIG["secret"]:
+    raise RuntimeError(
+        "TOKEN_SECRET is not set; export a long random value "
+        "(e.g. python -c \"import secrets; print(secrets.token_urlsafe(32))\")"
+    )
+
+_ACCESS_SALT = "access"
+_REFRESH_SALT = "refresh"
+
+_serializer = URLSafeTimedSerializer(TOKEN_CONFIG["secret"])
+_revoked = {}      # user_id -> time.time() of a revocation made in this process
+_valid_after = {}  # user_id -> (users.tokens_valid_after, monotonic time it was read)
+_revoked_lock = threading.Lock()
+_missing_column = False   # set once migration 0006 turns out not to be applied
+
+
+class TokenError(Exception):
+    """Missing, malformed, expired or revoked token."""
+
+
+# ---------- issuing ----------
+
+def issue_tokens(user):
+    """Token pair for a user dict shaped like auth.row_to_user()."""
+    now = time.time()
+    access = _serializer.dumps(
+        {
+            "user_id": user["user_id"],
+            "is_admin": bool(user["is_admin"]),
+            "is_active": bool(user["is_active"]),
+            "iat": now,
+        },
+        salt=_ACCESS_SALT,
+    )
+    refresh = _serializer.dumps({"user_id": user["user_id"], "iat": now}, salt=_REFRESH_SALT)
+    return {
+        "access_token": access,
+        "refresh_token": refresh,
+        "expires_in": TOKEN_CONFIG["access_ttl"],
+    }
+
+
+# ---------- verifying ----------
+
+def _load(token, salt, max_age):
+    try:
+        return _serializer.loads(token, salt=salt, max_age=max_age)
+    except SignatureExpired:
+        raise TokenError("token expired")
+    except BadSignature:
+        raise TokenError("invalid token")
+
+
+def _no_column(e):
+    global _missing_column
+    if not (isinstance(e, ProgrammingError) and e.errno == errorcode.ER_BAD_FIELD_ERROR):
+        return False
+    if not _missing_column:
+        _missing_column = True
+        log.warning("users.tokens_valid_after missing (migration 0006), "
+                    "revocations only apply in the revoking process")
+    return True
+
+
+def _stored_cutoff(user_id, fresh):
+    """users.tokens_valid_after, cached for revocation_check_ttl unless fresh."""
+    if _missing_column:
+        return None
+    now = time.monotonic()
+    if not fresh:
+        with _revoked_lock:
+            hit = _valid_after.get(user_id)
+        if hit is not None and now - hit[1] < TOKEN_CONFIG["revocation_check_ttl"]:
+            return hit[0]
+    try:
+        rows = query_all("SELECT tokens_valid_after FROM users WHERE user_id = %s", [user_id])
+    except ProgrammingError as e:
+        if not _no_column(e):
+            raise
+        return None
+    cutoff = rows[0]["tokens_valid_after"] if rows else None
+    with _revoked_lock:
+        _valid_after[user_id] = (cutoff, now)
+    return cutoff
+
+
+def _is_revoked(user_id, issued_at, fresh=False):
+    with _revoked_lock:
+        cutoff = _revoked.get(user_id)
+    if cutoff is not None and issued_at < cutoff:
+        return True
+    stored = _stored_cutoff(user_id, fresh)
+    return stored is not None and issued_at < stored
+
+
+def verify_access(token):
+    claims = _load(token, _ACCESS_SALT, TOKEN_CONFIG["access_ttl"])
+    if _is_revoked(claims["user_id"], claims["iat"]):
+        raise TokenError("token revoked")
+    return claims
+
+
+def verify_refresh(token):
+    """user_id of a valid, unrevoked refresh token (the caller re-reads the
+    user row). Checks users.tokens_valid_after directly, not the cache."""
+    claims = _load(token, _REFRESH_SALT, TOKEN_CONFIG["refresh_ttl"])
+    if _is_revoked(claims["user_id"], claims["iat"], fresh=True):
+        raise TokenError("token revoked")
+    return claims["user_id"]
+
+
+def revoke(user_id):
+    """Reject this user's access and refresh tokens issued up to now, in
+    every process (users.tokens_valid_after) and at once in this one."""
+    now = time.time()
+    with _revoked_lock:
+        _revoked[user_id] = now
+        _valid_after.pop(user_id, None)
+        # refresh tokens outlive access tokens, so keep entries for refresh_ttl
+        horizon = now - TOKEN_CONFIG["refresh_ttl"]
+        for uid in [u for u, t in _revoked.items() if t < horizon]:
+            del _revoked[uid]
+    if _missing_column:
+        return
+    conn = get_connection()
+    try:
+        cur = conn.cursor()
+        cur.execute(
+            "UPDATE users SET tokens_valid_after = %s WHERE user_id = %s",
+            (now, user_id),
+        )
+        conn.commit()
+        cur.close()
+    except ProgrammingError as e:
+        if not _no_column(e):
+            raise
+    finally:
+        conn.close()
+
+
+def current_claims():
+    """Claims of the request's bearer token, or None when none was sent.
+    Raises TokenError for a token that doesn't verify."""
+    if "token_claims" in g:
+        return g.token_claims
+    header = request.headers.get("Authorization", "")
+    claims = None
+    if header:
+        scheme, _, token = header.partition(" ")
+        if scheme.lower() != "bearer" or not token.strip():
+            raise TokenError("expected 'Authorization: Bearer <token>'")
+        claims = verify_access(token.strip())
+    g.token_claims = claims
+    return claims
+
+
+# ---------- endpoint decorators ----------
+
+def _deny(message, status):
+    return jsonify({"error": message}), status
+
+
+def _check(admin, owner_of, always=False):
+    """None if the request may proceed, else an error response."""
+    try:
+        claims = current_claims()
+    except TokenError as e:
+        return _deny(str(e), 401)
+    if claims is None:
+        if always or TOKEN_CONFIG["enforce"]:
+            return _deny("authentication required", 401)
+        return None
+    if not claims["is_active"]:
+        return _deny("account is disabled", 403)
+    if claims["is_admin"]:
+        return None
+    if admin:
+        return _deny("admin only", 403)
+    if owner_of is not None:
+        user_id = owner_of()
+        if user_id is not None and str(user_id) != str(claims["user_id"]):
+            return _deny("not allowed for this user", 403)
+    return None
+
+
+def require_user(owner_of=None):
+    """Endpoint acts on one user's data. owner_of() returns that user_id
+    (default: the `user_id` URL argument); admins may act on anyone."""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            owner = owner_of or (lambda: kwargs.get("user_id"))
+            denied = _check(False, owner)
+            return denied if denied is not None else view(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def require_admin(view=None, always=False):
+    """Admin-only endpoint. With always=True an admin token is required even
+    when TOKEN_CONFIG["enforce"] is off. Use as @require_admin or
+    @require_admin(always=True)."""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            denied = _check(True, None, always)
+            return denied if denied is not None else view(*args, **kwargs)
+        return wrapper
+    return decorator(view) if view is not None else decorator
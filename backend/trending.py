@@ -0,0 +1,128 @@
+# trending.py
+"""
+Trending searches from pre-aggregated, time-bucketed counters.
+
+Instead of $group-ing every raw search_logs document per request, each search
+bumps two counters in `search_trends` with an upserted $inc:
+
+    { g: "m", bucket: 2025-11-29T10:41:00, q: "matrix", count: 3, expires_at: ... }
+    { g: "h", bucket: 2025-11-29T10:00:00, q: "matrix", count: 17, expires_at: ... }
+
+Minute buckets serve the 1h window, hour buckets the 24h / 7d windows. A
+window query only touches (distinct queries x buckets in window) documents,
+regardless of how many raw searches were logged. Old buckets expire through a
+TTL index on expires_at.
+
+Scores can decay exponentially with bucket age (half-life per window), so a
+burst of searches in the last few minutes outranks the same count spread over
+the whole window.
+"""
+import math
+from collections import Counter
+from datetime import datetime, timedelta
+
+from pymongo import ASCENDING, UpdateOne
+
+from mongo import search_trends_col, ensure_index, op_ms, reading, writing
+
+# window name -> (length, bucket granularity, default decay half-life)
+WINDOWS = {
+    "1h": (timedelta(hours=1), "m", timedelta(minutes=15)),
+    "24h": (timedelta(hours=24), "h", timedelta(hours=6)),
+    "7d": (timedelta(days=7), "h", timedelta(days=2)),
+}
+DEFAULT_WINDOW = "24h"
+
+# how long each granularity is kept (a bit longer than the largest window using it)
+RETENTION = {"m": timedelta(hours=2), "h": timedelta(days=8)}
+
+MAX_QUERY_LEN = 200
+
+
+def normalize_query(q):
+    return " ".join((q or "").lower().split())[:MAX_QUERY_LEN]
+
+
+def _floor(ts, granularity):
+    if granularity == "m":
+        return ts.replace(second=0, microsecond=0)
+    return ts.replace(minute=0, second=0, microsecond=0)
+
+
+def ensure_indexes():
+    """Unique bucket key (the upserts rely on it) and the TTL on expires_at.
+    Called at app startup through nosql.ensure_indexes()."""
+    ensure_index(
+        search_trends_col,
+        [("g", ASCENDING), ("bucket", ASCENDING), ("q", ASCENDING)],
+        unique=True,
+        name="g_bucket_q",
+    )
+    ensure_index(search_trends_col, "expires_at", expireAfterSeconds=0)
+
+
+def record_many(searches):
+    """Count a batch of searches. searches: iterable of (q, ts)."""
+    counts = Counter()
+    for q, ts in searches:
+        q = normalize_query(q)
+        if not q:
+            continue
+        for g in RETENTION:
+            counts[(g, _floor(ts, g), q)] += 1
+
+    ops = [
+        UpdateOne(
+            {"g": g, "bucket": bucket, "q": q},
+            {
+                "$inc": {"count": n},
+                "$setOnInsert": {"expires_at": bucket + RETENTION[g]},
+            },
+            upsert=True,
+        )
+        for (g, bucket, q), n in counts.items()
+    ]
+    if ops:
+        writing(search_trends_col, "telemetry").bulk_write(ops, ordered=False)
+
+
+def record(q, ts=None):
+    record_many([(q, ts or datetime.utcnow())])
+
+
+def trending(window=DEFAULT_WINDOW, limit=10, min_count=1, decay=True, now=None):
+    """Top queries in a sliding window.
+
+    Returns [{"q", "count", "score"}]. With decay, score = sum over buckets of
+    count * 0.5 ** (age / half_life); without it, score == count.
+    """
+    length, g, half_life = WINDOWS[window]
+    now = now or datetime.utcnow()
+    since = _floor(now - length, g)
+
+    if decay:
+        # ln(2) / half-life in ms; $subtract of two dates gives milliseconds
+        rate = math.log(2) / (half_life.total_seconds() * 1000)
+        weight = {"$exp": {"$multiply": [-rate, {"$subtract": [now, "$bucket"]}]}}
+        score = {"$sum": {"$multiply": ["$count", weight]}}
+    else:
+        score = {"$sum": "$count"}
+
+    pipeline = [
+        {"$match": {"g": g, "bucket": {"$gte": since}}},
+        {"$group": {"_id": "$q", "count": {"$sum": "$count"}, "score": score}},
+        {"$match": {"count": {"$gte": min_count}}},
+        {"$sort": {"score": -1, "count": -1}},
+        {"$limit": limit},
+    ]
+    return [
+        {"q": d["_id"], "count": d["count"], "score": round(d["score"], 3)}
+        for d in reading(search_trends_col, "trending").aggregate(
+            pipeline, maxTimeMS=op_ms("aggregate")
+        )
+    ]
+
+
+if __name__ == "__main__":
+    ensure_indexes()
+    print("search_trends indexes ok")
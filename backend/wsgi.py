@@ -0,0 +1,44 @@
+# wsgi.py
+"""
+Production entry point: the Flask app under a standard multi-threaded WSGI
+server instead of Flask's development server from `python app.py` (threaded,
+but with the debugger/reloader and not meant for production).
+
+    cd backend
+    python wsgi.py                                       # waitress, any OS
+    gunicorn -w 4 --threads 20 -b 0.0.0.0:5000 wsgi:app  # Linux/macOS, one process per core
+
+Requests run on WSGI_CONFIG["threads"] threads per process. Those threads
+block on MySQL (through the shared connection pool in db.py) and MongoDB
+(pymongo's own pool), so one process keeps that many DB waits in flight at
+once. The default is POOL_CONFIG["size"] + ["max_overflow"], so threads
+don't queue for MySQL connections. Raise both together.
+
+This is a threaded server, not an asyncio one: there are no async drivers
+and routes stay synchronous. The cross-store endpoints (watchlist,
+top_user_rated) still query Mongo and then MySQL in sequence, because the
+MySQL lookup needs the tconsts the Mongo read returns. /api/title runs its
+independent Mongo part next to the SQL part on a thread pool.
+
+Route contracts are unchanged: this is the same Flask app. Pending search
+logs are flushed on exit by the atexit hook in nosql.py.
+"""
+import os
+
+from app import app
+from db import POOL_CONFIG
+
+WSGI_CONFIG = {
+    "host": os.environ.get("HOST", "0.0.0.0"),
+    "port": int(os.environ.get("PORT", 5000)),
+    "threads": int(os.environ.get(
+        "WSGI_THREADS", POOL_CONFIG["size"] + POOL_CONFIG["max_overflow"]
+    )),
+}
+
+
+if __name__ == "__main__":
+    from waitress import serve
+
+    serve(app, host=WSGI_CONFIG["host"], port=WSGI_CONFIG["port"],
+          threads=WSGI_CONFIG["threads"])
@@ -22,7 +22,7 @@ async function loadUsers() {
   tbody.innerHTML = "<tr><td colspan='7'>Loading...</td></tr>";
 
   try {
-    const res = await fetch(`${API_BASE}/api/admin/users`);
+    const res = await authFetch(`${API_BASE}/api/admin/users`);
     const data = await res.json().catch(() => []);
 
     if (!res.ok) {
@@ -97,7 +97,7 @@ tbody.addEventListener("click", async (e) => {
 async function updateUser(userId, patch) {
   msgEl.textContent = "";
   try {
-    const res = await fetch(`${API_BASE}/api/admin/users/${userId}`, {
+    const res = await authFetch(`${API_BASE}/api/admin/users/${userId}`, {
       method: "PUT",
       headers: { "Content-Type": "application/json" },
       body: JSON.stringify(patch),
@@ -119,7 +119,7 @@ async function updateUser(userId, patch) {
 async function deleteUser(userId) {
   msgEl.textContent = "";
   try {
-    const res = await fetch(`${API_BASE}/api/admin/users/${userId}`, {
+    const res = await authFetch(`${API_BASE}/api/admin/users/${userId}`, {
       method: "DELETE",
     });
 
@@ -306,7 +306,7 @@ async function fetchWatchlist() {
   if (!userId) return legacy;
 
   try {
-    const res = await fetch(`${API_BASE}/api/watchlist/${userId}`);
+    const res = await authFetch(`${API_BASE}/api/watchlist/${userId}`);
     if (!res.ok) {
       console.warn("Watchlist API error", res.status);
       return legacy;
@@ -392,7 +392,7 @@ async function addToWatchlist(movie) {
   if (!userId) return;
 
   try {
-    const res = await fetch(`${API_BASE}/api/watchlist/${userId}`, {
+    const res = await authFetch(`${API_BASE}/api/watchlist/${userId}`, {
       method: "POST",
       headers: { "Content-Type": "application/json" },
       body: JSON.stringify(payload),
@@ -445,7 +445,7 @@ async function removeFromWatchlistByKey(key) {
   if (!userId) return;
 
   try {
-    await fetch(`${API_BASE}/api/watchlist/${userId}`, {
+    await authFetch(`${API_BASE}/api/watchlist/${userId}`, {
       method: "DELETE",
       headers: { "Content-Type": "application/json" },
       body: JSON.stringify({ key, tconst }),
@@ -481,7 +481,7 @@ async function renderWatchlistModal() {
 
     if (userId) {
       try {
-        const res = await fetch(`${API_BASE}/api/watchlist/${userId}`);
+        const res = await authFetch(`${API_BASE}/api/watchlist/${userId}`);
         if (res.ok) {
           const serverItems = await res.json();
 
@@ -640,7 +640,7 @@ async function logSearch(query) {
   if (!q) return;              // don't log empty strings
 
   try {
-    await fetch(`${API_BASE}/api/search_logs/${userId}`, {
+    await authFetch(`${API_BASE}/api/search_logs/${userId}`, {
       method: "POST",
       headers: { "Content-Type": "application/json" },
       body: JSON.stringify({ q }),
@@ -1391,7 +1391,7 @@ async function renderMovieDetail(movie) {
         }
 
         try {
-          const res = await fetch(
+          const res = await authFetch(
             `${API_BASE}/api/reviews/${encodeURIComponent(tconst)}`,
             {
               method: "POST",
@@ -1433,7 +1433,7 @@ async function renderMovieDetail(movie) {
         const ok = confirm("Delete your review?");
         if (!ok) return;
         try {
-          await fetch(
+          await authFetch(
             `${API_BASE}/api/reviews/${encodeURIComponent(tconst)}/${myId2}`,
             { method: "DELETE" }
           );
@@ -1679,7 +1679,7 @@ async function renderSearchLogModal() {
 
   try {
     const [userRes, trendingRes] = await Promise.all([
-      fetch(`${API_BASE}/api/search_logs/${encodeURIComponent(userId)}`),
+      authFetch(`${API_BASE}/api/search_logs/${encodeURIComponent(userId)}`),
       fetch(`${API_BASE}/api/search_trending`),
     ]);
 
@@ -0,0 +1,31 @@
+// auth.js
+// Shared by index.html, admin.html and profile.html; load it before the
+// page script. Uses the page's API_BASE, which is read at call time.
+
+// Sends the stored access token (backend tokens.py); on 401 trades the
+// refresh token for a new pair once and retries.
+async function authFetch(url, options = {}) {
+  const withToken = () => {
+    const stored = JSON.parse(localStorage.getItem("user") || "null");
+    const headers = { ...(options.headers || {}) };
+    if (stored && stored.access_token) {
+      headers.Authorization = `Bearer ${stored.access_token}`;
+    }
+    return fetch(url, { ...options, headers });
+  };
+
+  let res = await withToken();
+  const stored = JSON.parse(localStorage.getItem("user") || "null");
+  if (res.status === 401 && stored && stored.refresh_token) {
+    const refreshed = await fetch(`${API_BASE}/api/token/refresh`, {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify({ refresh_token: stored.refresh_token }),
+    });
+    if (refreshed.ok) {
+      localStorage.setItem("user", JSON.stringify(await refreshed.json()));
+      res = await withToken();
+    }
+  }
+  return res;
+}
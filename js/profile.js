@@ -47,7 +47,7 @@ form.addEventListener("submit", async (e) => {
   submitBtn.textContent = "Saving...";
 
   try {
-    const res = await fetch(`${API_BASE}/api/users/${user.user_id}`, {
+    const res = await authFetch(`${API_BASE}/api/users/${user.user_id}`, {
       method: "PUT",
       headers: { "Content-Type": "application/json" },
       body: JSON.stringify(payload),
@@ -62,9 +62,11 @@ form.addEventListener("submit", async (e) => {
       return;
     }
 
-    // Update localStorage with latest user data
-    localStorage.setItem("user", JSON.stringify(data));
-    user = data;
+    // Update localStorage with latest user data (keeping the session tokens
+    // unless a password change issued new ones)
+    const stored = JSON.parse(localStorage.getItem("user") || "null") || {};
+    user = { ...stored, ...data };
+    localStorage.setItem("user", JSON.stringify(user));
     passwordInput.value = "";
     msgEl.textContent = "Profile updated successfully.";
     submitBtn.disabled = false;